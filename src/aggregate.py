@@ -0,0 +1,371 @@
+"""Estado parcial de agregação compartilhado entre as soluções."""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from histogram import histogram_mode, histogram_quantiles
+from quantile_sketch import QUANTILES, quantile_column_names, sketch_quantiles
+
+# Campos opcionais com uma matriz de contagens por estação, combinados somando as
+# contagens
+COUNT_MATRIX_FIELDS: Tuple[str, ...] = ("sketches", "histograms")
+
+
+def _min_identity(dtype: np.dtype):
+    """Retorna o elemento neutro de `np.minimum` para o tipo informado."""
+    if np.issubdtype(dtype, np.integer):
+        return np.iinfo(dtype).max
+    return np.inf
+
+
+def _max_identity(dtype: np.dtype):
+    """Retorna o elemento neutro de `np.maximum` para o tipo informado."""
+    if np.issubdtype(dtype, np.integer):
+        return np.iinfo(dtype).min
+    return -np.inf
+
+
+@dataclass
+class StationAggregate:
+    """
+    Agregados parciais (mínimo, máximo, soma e contagem) por estação.
+
+    Cada estação é identificada pela sua posição em `stations`, que é mantido
+    ordenado e sem repetições. As demais colunas são arrays NumPy alinhados com
+    esse identificador.
+
+    Attributes
+    ----------
+    stations : np.ndarray
+        Nomes das estações, ordenados e únicos (dtype `object`).
+    min_values : np.ndarray
+        Menor medição de cada estação.
+    max_values : np.ndarray
+        Maior medição de cada estação.
+    sums : np.ndarray
+        Soma das medições de cada estação.
+    counts : np.ndarray
+        Quantidade de medições de cada estação (int64).
+    scale : int
+        Fator entre os valores armazenados e os valores em graus. É 1 para
+        medições lidas como `float` e `fixed_point.SCALE` para medições lidas como
+        inteiros em décimos de grau.
+    sketches : np.ndarray, optional
+        Matriz `(estações, quantile_sketch.NUM_BUCKETS)` com o sketch de quantis
+        de cada estação, ou `None` se os quantis não forem calculados.
+    histograms : np.ndarray, optional
+        Matriz `(estações, histogram.NUM_TENTHS)` com o histograma exato de cada
+        estação, em décimos de grau, ou `None`.
+
+    Notes
+    -----
+    - Como guarda soma e contagem, e não a média, o estado pode ser combinado em
+      qualquer ordem e em várias rodadas sem que a média final dependa do
+      tamanho dos chunks.
+    - A média só é calculada em `to_columns`.
+    - Com medições inteiras em décimos de grau, mínimo e máximo usam int16 e a
+      soma usa int64, portanto a combinação é exata.
+    - Sketches e histogramas são combinados somando as contagens de cada bucket,
+      portanto também podem ser combinados em qualquer ordem.
+    """
+
+    stations: np.ndarray
+    min_values: np.ndarray
+    max_values: np.ndarray
+    sums: np.ndarray
+    counts: np.ndarray
+    scale: int = 1
+    sketches: Optional[np.ndarray] = None
+    histograms: Optional[np.ndarray] = None
+
+    @classmethod
+    def empty(cls) -> "StationAggregate":
+        """
+        Cria um agregado sem estações.
+
+        Returns
+        -------
+        StationAggregate
+            Agregado vazio, elemento neutro de `merge`.
+        """
+        return cls(
+            stations=np.array([], dtype=object),
+            min_values=np.array([], dtype=np.float64),
+            max_values=np.array([], dtype=np.float64),
+            sums=np.array([], dtype=np.float64),
+            counts=np.array([], dtype=np.int64),
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        stations: Iterable[str],
+        min_values: Iterable,
+        max_values: Iterable,
+        sums: Iterable,
+        counts: Iterable,
+        scale: int = 1,
+        sketches: Optional[np.ndarray] = None,
+        histograms: Optional[np.ndarray] = None,
+    ) -> "StationAggregate":
+        """
+        Cria um agregado a partir de colunas já agrupadas por estação.
+
+        Parameters
+        ----------
+        stations : Iterable[str]
+            Nomes das estações, sem repetições.
+        min_values, max_values, sums, counts : Iterable
+            Valores alinhados com `stations`.
+        scale : int, optional
+            Fator entre os valores informados e os valores em graus. O padrão é 1.
+        sketches : np.ndarray, optional
+            Sketches de quantis, uma linha por estação, alinhados com `stations`.
+        histograms : np.ndarray, optional
+            Histogramas exatos, uma linha por estação, alinhados com `stations`.
+
+        Returns
+        -------
+        StationAggregate
+            Agregado ordenado pelo nome da estação.
+        """
+        station_array = np.asarray(list(stations), dtype=object)
+        order = np.argsort(station_array, kind="stable")
+        return cls(
+            stations=station_array[order],
+            min_values=np.asarray(min_values)[order],
+            max_values=np.asarray(max_values)[order],
+            sums=np.asarray(sums)[order],
+            counts=np.asarray(counts, dtype=np.int64)[order],
+            scale=scale,
+            sketches=None if sketches is None else sketches[order],
+            histograms=None if histograms is None else histograms[order],
+        )
+
+    @classmethod
+    def from_mapping(
+        cls, stats: Mapping[str, Sequence[float]], scale: int = 1
+    ) -> "StationAggregate":
+        """
+        Cria um agregado a partir de um dicionário de estatísticas.
+
+        Parameters
+        ----------
+        stats : Mapping[str, Sequence[float]]
+            Dicionário com o nome da estação como chave e a sequência
+            `[mínimo, máximo, soma, contagem]` como valor, no formato usado pela
+            solução com `mmap`.
+        scale : int, optional
+            Fator entre os valores informados e os valores em graus. O padrão é 1.
+
+        Returns
+        -------
+        StationAggregate
+            Agregado equivalente ao dicionário.
+        """
+        if not stats:
+            return cls.empty()
+        columns = list(zip(*stats.values()))
+        if scale != 1:
+            # Valores inteiros: int16 para os extremos e int64 para a soma
+            return cls.from_columns(
+                stats.keys(),
+                np.asarray(columns[0], dtype=np.int16),
+                np.asarray(columns[1], dtype=np.int16),
+                np.asarray(columns[2], dtype=np.int64),
+                columns[3],
+                scale=scale,
+            )
+        return cls.from_columns(stats.keys(), *columns)
+
+    def __getstate__(self) -> Dict[str, object]:
+        """Serializa as matrizes de contagens de forma esparsa, entre processos."""
+        state: Dict[str, object] = dict(self.__dict__)
+        for field in COUNT_MATRIX_FIELDS:
+            matrix: Optional[np.ndarray] = getattr(self, field)
+            if matrix is not None:
+                flat = matrix.ravel()
+                nonzero = np.flatnonzero(flat)
+                state[field] = (matrix.shape, nonzero, flat[nonzero])
+        return state
+
+    def __setstate__(self, state: Dict[str, object]) -> None:
+        """Reconstrói as matrizes de contagens serializadas por `__getstate__`."""
+        for field in COUNT_MATRIX_FIELDS:
+            if state.get(field) is not None:
+                shape, nonzero, values = state[field]
+                matrix = np.zeros(shape, dtype=values.dtype)
+                matrix.ravel()[nonzero] = values
+                state[field] = matrix
+        self.__dict__.update(state)
+
+    def __len__(self) -> int:
+        """Retorna o número de estações."""
+        return len(self.stations)
+
+    def merge(self, other: "StationAggregate") -> "StationAggregate":
+        """
+        Combina este agregado com outro.
+
+        Parameters
+        ----------
+        other : StationAggregate
+            Agregado a ser combinado.
+
+        Returns
+        -------
+        StationAggregate
+            Novo agregado com a união das estações.
+
+        Notes
+        -----
+        A operação é associativa e comutativa, portanto os agregados podem ser
+        combinados em árvore ou em paralelo.
+        """
+        return StationAggregate.merge_all([self, other])
+
+    @staticmethod
+    def merge_all(aggregates: List["StationAggregate"]) -> "StationAggregate":
+        """
+        Combina vários agregados de uma só vez.
+
+        Parameters
+        ----------
+        aggregates : List[StationAggregate]
+            Agregados a serem combinados.
+
+        Returns
+        -------
+        StationAggregate
+            Agregado com a união das estações.
+
+        Raises
+        ------
+        ValueError
+            Se os agregados usarem escalas diferentes, ou se só alguns tiverem
+            sketches ou histogramas.
+
+        Notes
+        -----
+        - As colunas de todos os agregados são concatenadas e reduzidas com
+          `np.minimum.at`, `np.maximum.at` e `np.add.at` sobre o identificador da
+          estação, sem laços em Python por estação.
+        - Quando todos os agregados têm as mesmas estações, a redução é feita
+          elemento a elemento.
+        """
+        aggregates = [aggregate for aggregate in aggregates if len(aggregate)]
+        if not aggregates:
+            return StationAggregate.empty()
+
+        first = aggregates[0]
+        if any(aggregate.scale != first.scale for aggregate in aggregates[1:]):
+            raise ValueError(
+                "Não é possível combinar agregados com escalas diferentes."
+            )
+        matrix_fields: List[str] = [
+            field for field in COUNT_MATRIX_FIELDS if getattr(first, field) is not None
+        ]
+        if any(
+            [field for field in COUNT_MATRIX_FIELDS if getattr(a, field) is not None]
+            != matrix_fields
+            for a in aggregates[1:]
+        ):
+            raise ValueError(
+                "Não é possível combinar agregados com e sem sketches ou histogramas."
+            )
+        if len(aggregates) == 1:
+            return first
+
+        if all(
+            len(aggregate) == len(first)
+            and np.array_equal(aggregate.stations, first.stations)
+            for aggregate in aggregates[1:]
+        ):
+            return StationAggregate(
+                stations=first.stations,
+                min_values=np.minimum.reduce([a.min_values for a in aggregates]),
+                max_values=np.maximum.reduce([a.max_values for a in aggregates]),
+                sums=np.add.reduce([a.sums for a in aggregates]),
+                counts=np.add.reduce([a.counts for a in aggregates]),
+                scale=first.scale,
+                **{
+                    field: np.add.reduce([getattr(a, field) for a in aggregates])
+                    for field in matrix_fields
+                },
+            )
+
+        all_stations = np.concatenate([a.stations for a in aggregates])
+        stations, station_ids = np.unique(all_stations, return_inverse=True)
+
+        all_min = np.concatenate([a.min_values for a in aggregates])
+        all_max = np.concatenate([a.max_values for a in aggregates])
+        all_sums = np.concatenate([a.sums for a in aggregates])
+        all_counts = np.concatenate([a.counts for a in aggregates])
+
+        min_values = np.full(len(stations), _min_identity(all_min.dtype), all_min.dtype)
+        max_values = np.full(len(stations), _max_identity(all_max.dtype), all_max.dtype)
+        sums = np.zeros(len(stations), dtype=all_sums.dtype)
+        counts = np.zeros(len(stations), dtype=np.int64)
+
+        np.minimum.at(min_values, station_ids, all_min)
+        np.maximum.at(max_values, station_ids, all_max)
+        np.add.at(sums, station_ids, all_sums)
+        np.add.at(counts, station_ids, all_counts)
+
+        matrices: Dict[str, np.ndarray] = {}
+        for field in matrix_fields:
+            template: np.ndarray = getattr(first, field)
+            matrix = np.zeros((len(stations), template.shape[1]), template.dtype)
+            # As estações não se repetem dentro de um agregado, portanto cada
+            # matriz pode ser somada com indexação simples, sem `np.add.at`
+            offset: int = 0
+            for aggregate in aggregates:
+                positions = station_ids[offset : offset + len(aggregate)]
+                matrix[positions] += getattr(aggregate, field)
+                offset += len(aggregate)
+            matrices[field] = matrix
+
+        return StationAggregate(
+            stations=stations.astype(object),
+            min_values=min_values,
+            max_values=max_values,
+            sums=sums,
+            counts=counts,
+            scale=first.scale,
+            **matrices,
+        )
+
+    def to_columns(self) -> Dict[str, np.ndarray]:
+        """
+        Calcula o resultado final por estação.
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            Dicionário com as colunas `station`, `min`, `max` e `mean`, ordenadas
+            pelo nome da estação, e com as colunas de `quantile_sketch.QUANTILES`
+            (`p50`, `p95` e `p99`) se houver sketches ou histogramas. Com
+            histogramas, os quantis são exatos e a coluna `mode` traz a medição
+            mais frequente. Pode ser passado diretamente para os construtores de
+            DataFrame do pandas, Polars e datatable.
+        """
+        columns: Dict[str, np.ndarray] = {
+            "station": self.stations,
+            "min": self.min_values / self.scale,
+            "max": self.max_values / self.scale,
+            "mean": self.sums / (self.counts * self.scale),
+        }
+        # Os quantis exatos do histograma têm prioridade sobre os do sketch
+        estimates: Optional[np.ndarray] = None
+        if self.histograms is not None:
+            estimates = histogram_quantiles(self.histograms, QUANTILES)
+        elif self.sketches is not None:
+            estimates = sketch_quantiles(self.sketches, QUANTILES)
+        if estimates is not None:
+            for column, name in enumerate(quantile_column_names(QUANTILES).values()):
+                columns[name] = estimates[:, column]
+        if self.histograms is not None:
+            columns["mode"] = histogram_mode(self.histograms)
+        return columns
@@ -0,0 +1,399 @@
+"""Ajuste automático do tamanho dos chunks e do número de processos."""
+
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import time
+from multiprocessing import cpu_count
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmark_metrics import PAGE_SIZE, PeakMemoryMonitor
+from binary_format import is_binary_file
+from dataset_cache import CACHE_DIR
+from registry import Engine, get_engine, load_engines
+from settings import BASE_DIR, FILENAME_OUTPUT
+
+CONCURRENCY: int = cpu_count()
+
+PROFILE_FILE: Path = BASE_DIR / "../data/autotune_profile.json"
+
+# Linhas do início do arquivo usadas nos testes de cada configuração
+SAMPLE_ROWS: int = 2_000_000
+
+CHUNKSIZE_CANDIDATES: List[int] = [50_000, 100_000, 250_000, 500_000, 1_000_000]
+
+# Fração da memória física que uma configuração pode usar
+MEMORY_BUDGET_FRACTION: float = 0.5
+
+# Configurações com vazão até 5% menor que a melhor são consideradas empatadas, e
+# a que usa menos memória é escolhida
+THROUGHPUT_TOLERANCE: float = 0.05
+
+
+def machine_id() -> str:
+    """Retorna o identificador da máquina usado como chave do perfil."""
+    return f"{platform.node()}-{platform.machine()}-{CONCURRENCY}cpu"
+
+
+def memory_budget(fraction: float = MEMORY_BUDGET_FRACTION) -> int:
+    """
+    Calcula a memória disponível para cada configuração testada.
+
+    Parameters
+    ----------
+    fraction : float, optional
+        Fração da memória física. O padrão é `MEMORY_BUDGET_FRACTION`.
+
+    Return
+    -------
+    int
+        Limite de memória, em bytes.
+    """
+    return int(os.sysconf("SC_PHYS_PAGES") * PAGE_SIZE * fraction)
+
+
+def concurrency_candidates(cpus: int = CONCURRENCY) -> List[int]:
+    """
+    Lista os números de processos testados.
+
+    Parameters
+    ----------
+    cpus : int, optional
+        Número de CPUs disponíveis. O padrão é `CONCURRENCY`.
+
+    Return
+    -------
+    List[int]
+        Um processo, metade das CPUs e todas as CPUs, sem repetições.
+    """
+    return sorted({1, max(cpus // 2, 1), cpus})
+
+
+def candidate_configs(engine: Engine, sample_rows: int) -> List[Dict[str, Any]]:
+    """
+    Monta as combinações de parâmetros testadas para uma solução.
+
+    Parameters
+    ----------
+    engine : Engine
+        Solução ajustada.
+    sample_rows : int
+        Número de linhas da amostra.
+
+    Return
+    -------
+    List[Dict[str, Any]]
+        Uma configuração para cada combinação dos parâmetros em `engine.tunable`.
+        Chunks maiores que a amostra são descartados, pois se comportariam como
+        um único chunk.
+    """
+    values: Dict[str, List[int]] = {}
+    if "chunksize" in engine.tunable:
+        values["chunksize"] = [
+            chunksize for chunksize in CHUNKSIZE_CANDIDATES if chunksize < sample_rows
+        ] or [sample_rows]
+    if "concurrency" in engine.tunable:
+        values["concurrency"] = concurrency_candidates()
+
+    return [
+        dict(zip(values, combination))
+        for combination in itertools.product(*values.values())
+    ]
+
+
+def write_sample(filename: Path, sample_rows: int, sample_filename: Path) -> int:
+    """
+    Copia as primeiras linhas do arquivo de medições.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo de medições em texto.
+    sample_rows : int
+        Número máximo de linhas copiadas.
+    sample_filename : Path
+        Arquivo de destino.
+
+    Return
+    -------
+    int
+        Número de linhas copiadas.
+    """
+    rows: int = 0
+    with open(filename, "rb") as source, open(sample_filename, "wb") as target:
+        for line in itertools.islice(source, sample_rows):
+            target.write(line)
+            rows += 1
+    return rows
+
+
+def measure_config(
+    engine: Engine, filename: Path, rows: int, config: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Executa a solução uma vez com a configuração informada.
+
+    Parameters
+    ----------
+    engine : Engine
+        Solução testada.
+    filename : Path
+        Arquivo de medições.
+    rows : int
+        Número de linhas do arquivo.
+    config : Dict[str, Any]
+        Configuração testada.
+
+    Return
+    -------
+    Dict[str, Any]
+        Configuração, tempo, vazão (linhas por segundo) e pico de memória.
+    """
+    # `engine.run` não imprime o resultado (só `record_result` o faz), mas
+    # algumas soluções imprimem avisos, como os shards repetidos, que não
+    # interessam durante o ajuste
+    with contextlib.redirect_stdout(io.StringIO()):
+        with PeakMemoryMonitor() as monitor:
+            start_time: float = time.perf_counter()
+            engine.run(filename, rows, config)
+            took: float = time.perf_counter() - start_time
+
+    return {
+        "config": config,
+        "wall_s": took,
+        "rows_per_s": rows / took if took > 0 else None,
+        "peak_rss_bytes": monitor.peak_bytes,
+    }
+
+
+def choose_best(trials: List[Dict[str, Any]], budget_bytes: int) -> Dict[str, Any]:
+    """
+    Escolhe a melhor configuração testada.
+
+    Parameters
+    ----------
+    trials : List[Dict[str, Any]]
+        Resultados de `measure_config`.
+    budget_bytes : int
+        Pico de memória máximo aceito.
+
+    Return
+    -------
+    Dict[str, Any]
+        A configuração com maior vazão dentro do limite de memória. Entre as
+        configurações com vazão até `THROUGHPUT_TOLERANCE` menor que a melhor,
+        a de menor pico de memória é escolhida. Se nenhuma respeitar o limite,
+        retorna a de menor pico de memória.
+    """
+    within_budget = [
+        trial for trial in trials if trial["peak_rss_bytes"] <= budget_bytes
+    ]
+    if not within_budget:
+        return min(trials, key=lambda trial: trial["peak_rss_bytes"])
+
+    best_throughput: float = max(trial["rows_per_s"] or 0 for trial in within_budget)
+    tied = [
+        trial
+        for trial in within_budget
+        if (trial["rows_per_s"] or 0) >= best_throughput * (1 - THROUGHPUT_TOLERANCE)
+    ]
+    return min(tied, key=lambda trial: trial["peak_rss_bytes"])
+
+
+def load_profile(profile_file: Path = PROFILE_FILE) -> Dict[str, Dict[str, dict]]:
+    """
+    Lê o perfil de ajuste.
+
+    Parameters
+    ----------
+    profile_file : Path, optional
+        Arquivo do perfil. O padrão é `PROFILE_FILE`.
+
+    Return
+    -------
+    Dict[str, Dict[str, dict]]
+        Dicionário com o identificador de cada máquina como chave e, como valor,
+        o ajuste de cada solução. Vazio se o perfil não existir ou estiver
+        corrompido.
+    """
+    try:
+        with open(profile_file, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_profile(
+    profile: Dict[str, Dict[str, dict]], profile_file: Path = PROFILE_FILE
+) -> None:
+    """
+    Grava o perfil de ajuste de forma atômica.
+
+    Parameters
+    ----------
+    profile : Dict[str, Dict[str, dict]]
+        Perfil a ser gravado.
+    profile_file : Path, optional
+        Arquivo do perfil. O padrão é `PROFILE_FILE`.
+    """
+    temporary_file: Path = profile_file.with_suffix(".tmp")
+    with open(temporary_file, "w", encoding="utf-8") as file:
+        json.dump(profile, file, indent=2, sort_keys=True)
+    os.replace(temporary_file, profile_file)
+
+
+def load_tuned_config(
+    engine_name: str, rows: Optional[int] = None, profile_file: Path = PROFILE_FILE
+) -> Dict[str, Any]:
+    """
+    Retorna a configuração ajustada de uma solução nesta máquina.
+
+    Parameters
+    ----------
+    engine_name : str
+        Nome da solução.
+    rows : int, optional
+        Número de linhas do arquivo em que a configuração será usada. Se
+        informado, o `chunksize` ajustado é limitado a `rows // concurrency`.
+    profile_file : Path, optional
+        Arquivo do perfil. O padrão é `PROFILE_FILE`.
+
+    Return
+    -------
+    Dict[str, Any]
+        Configuração ajustada, ou vazio se a solução ainda não foi ajustada.
+
+    Notes
+    -----
+    O ajuste é feito em uma amostra de `sample_rows` linhas (gravado no
+    perfil). Em um arquivo menor, o `chunksize` escolhido poderia gerar menos
+    tarefas que processos, ou uma só, e a execução perderia o paralelismo; por
+    isso ele é reduzido para que cada processo receba pelo menos uma tarefa.
+    """
+    entry: Optional[dict] = (
+        load_profile(profile_file).get(machine_id(), {}).get(engine_name)
+    )
+    config: Dict[str, Any] = dict(entry["config"]) if entry else {}
+    if rows is not None and "chunksize" in config:
+        concurrency: int = max(config.get("concurrency", CONCURRENCY), 1)
+        config["chunksize"] = max(min(config["chunksize"], rows // concurrency), 1)
+    return config
+
+
+def autotune_engine(
+    engine: Engine,
+    filename: Path = FILENAME_OUTPUT,
+    sample_rows: int = SAMPLE_ROWS,
+    budget_bytes: Optional[int] = None,
+    profile_file: Path = PROFILE_FILE,
+) -> Dict[str, Any]:
+    """
+    Ajusta os parâmetros de uma solução e grava o resultado no perfil.
+
+    Parameters
+    ----------
+    engine : Engine
+        Solução ajustada.
+    filename : Path, optional
+        Arquivo de medições em texto. O padrão é `FILENAME_OUTPUT`.
+    sample_rows : int, optional
+        Número de linhas do início do arquivo usadas nos testes. O padrão é
+        `SAMPLE_ROWS`.
+    budget_bytes : int, optional
+        Pico de memória máximo aceito. O padrão é `memory_budget()`.
+    profile_file : Path, optional
+        Arquivo do perfil. O padrão é `PROFILE_FILE`.
+
+    Return
+    -------
+    Dict[str, Any]
+        Configuração escolhida. Vazio se a solução não tiver parâmetros
+        ajustáveis.
+
+    Raises
+    ------
+    ValueError
+        Se o arquivo estiver no formato binário colunar, que não usa chunks.
+
+    Notes
+    -----
+    - Depois de uma execução de aquecimento, cada configuração é executada uma
+      vez sobre uma amostra com as primeiras `sample_rows` linhas do arquivo,
+      gravada em `CACHE_DIR` e removida ao final.
+    - O perfil é indexado por `machine_id()`, portanto o mesmo arquivo pode
+      guardar ajustes de várias máquinas.
+    """
+    if not engine.tunable:
+        print(f"A solução {engine.name} não tem parâmetros ajustáveis.")
+        return {}
+    if is_binary_file(filename):
+        raise ValueError("O ajuste precisa de um arquivo de medições em texto.")
+
+    budget_bytes = memory_budget() if budget_bytes is None else budget_bytes
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    sample_filename: Path = CACHE_DIR / f"autotune_sample_{sample_rows}.txt"
+
+    try:
+        rows: int = write_sample(filename, sample_rows, sample_filename)
+        configs: List[Dict[str, Any]] = candidate_configs(engine, rows)
+        # Execução de aquecimento, para que a primeira configuração não pague o
+        # custo do cache de páginas e das importações
+        measure_config(engine, sample_filename, rows, configs[0])
+
+        trials: List[Dict[str, Any]] = []
+        for config in configs:
+            trial = measure_config(engine, sample_filename, rows, config)
+            print(
+                f"{engine.name} {config}: {trial['wall_s']:.3f}s, "
+                f"{trial['peak_rss_bytes'] / 1024**2:.0f} MiB"
+            )
+            trials.append(trial)
+    finally:
+        if sample_filename.exists():
+            sample_filename.unlink()
+
+    best: Dict[str, Any] = choose_best(trials, budget_bytes)
+
+    profile = load_profile(profile_file)
+    profile.setdefault(machine_id(), {})[engine.name] = {
+        "config": best["config"],
+        "rows_per_s": best["rows_per_s"],
+        "peak_rss_bytes": best["peak_rss_bytes"],
+        "sample_rows": rows,
+        "tuned_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+        "trials": trials,
+    }
+    save_profile(profile, profile_file)
+
+    print(f"Configuração escolhida para {engine.name}: {best['config']}")
+    return best["config"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        help="Soluções ajustadas (padrão: todas com parâmetros ajustáveis).",
+    )
+    parser.add_argument("--file", type=Path, default=FILENAME_OUTPUT)
+    parser.add_argument(
+        "--sample-rows",
+        type=lambda value: int(value.replace("_", "")),
+        default=SAMPLE_ROWS,
+    )
+    args = parser.parse_args()
+
+    engines = load_engines()
+    engine_names: List[str] = args.engines or [
+        name for name, engine in engines.items() if engine.tunable
+    ]
+
+    for engine_name in engine_names:
+        autotune_engine(get_engine(engine_name), args.file, args.sample_rows)
@@ -0,0 +1,191 @@
+"""Medição de CPU, memória e cache de páginas durante os testes."""
+
+import os
+import resource
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Intervalo entre as amostras de memória, em segundos
+MEMORY_SAMPLE_INTERVAL: float = 0.02
+
+PAGE_SIZE: int = os.sysconf("SC_PAGE_SIZE")
+
+# Bytes lidos de cada vez ao aquecer o cache de páginas
+WARM_READ_SIZE: int = 16 * 1024 * 1024
+
+
+def cpu_times() -> Dict[str, float]:
+    """
+    Retorna o tempo de CPU consumido até agora pelo processo e pelos filhos.
+
+    Return
+    -------
+    Dict[str, float]
+        Dicionário com os tempos `user` e `sys`, em segundos, somando o processo
+        atual e os processos filhos já finalizados (por exemplo, os workers de um
+        `multiprocessing.Pool`).
+    """
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "user": self_usage.ru_utime + children_usage.ru_utime,
+        "sys": self_usage.ru_stime + children_usage.ru_stime,
+    }
+
+
+def list_descendants(pid: int) -> List[int]:
+    """
+    Lista os processos descendentes de `pid` a partir do `/proc`.
+
+    Parameters
+    ----------
+    pid : int
+        Processo raiz.
+
+    Return
+    -------
+    List[int]
+        PIDs de todos os descendentes. Vazio fora do Linux.
+    """
+    parents: Dict[int, List[int]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except FileNotFoundError:
+        return []
+
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as file:
+                stat = file.read()
+        except OSError:
+            continue
+        # O nome do processo fica entre parênteses e pode conter espaços
+        ppid = int(stat[stat.rfind(b")") + 2 :].split()[1])
+        parents.setdefault(ppid, []).append(int(entry))
+
+    descendants: List[int] = []
+    pending: List[int] = [pid]
+    while pending:
+        children = parents.get(pending.pop(), [])
+        descendants.extend(children)
+        pending.extend(children)
+    return descendants
+
+
+def process_rss(pid: int) -> int:
+    """
+    Retorna a memória residente (RSS) de um processo, em bytes.
+
+    Parameters
+    ----------
+    pid : int
+        Processo consultado.
+
+    Return
+    -------
+    int
+        RSS do processo, ou 0 se não for possível lê-lo.
+    """
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as file:
+            return int(file.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+class PeakMemoryMonitor:
+    """
+    Mede o pico de memória residente do processo e dos seus descendentes.
+
+    Uma thread amostra, a cada `MEMORY_SAMPLE_INTERVAL` segundos, a soma do RSS do
+    processo atual e de todos os processos filhos (por exemplo, os workers de um
+    `Pool`). Fora do Linux, usa `ru_maxrss`, que considera apenas o maior processo.
+
+    Examples
+    --------
+    >>> with PeakMemoryMonitor() as monitor:
+    ...     executar_solucao()
+    >>> monitor.peak_bytes
+    """
+
+    def __init__(self, interval: float = MEMORY_SAMPLE_INTERVAL) -> None:
+        """Configura o intervalo entre as amostras, em segundos."""
+        self.interval: float = interval
+        self.peak_bytes: int = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        pid: int = os.getpid()
+        total: int = process_rss(pid) + sum(
+            process_rss(child) for child in list_descendants(pid)
+        )
+        self.peak_bytes = max(self.peak_bytes, total)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "PeakMemoryMonitor":
+        """Inicia a amostragem."""
+        if os.path.exists("/proc/self/statm"):
+            self._sample()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Encerra a amostragem."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+        else:
+            # ru_maxrss está em KiB no Linux e em bytes no macOS
+            self.peak_bytes = max(
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+            ) * (1 if os.uname().sysname == "Darwin" else 1024)
+
+
+def drop_page_cache(filename: Path) -> bool:
+    """
+    Pede ao sistema operacional que descarte o arquivo do cache de páginas.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo a ser descartado do cache.
+
+    Return
+    -------
+    bool
+        Verdadeiro se o pedido foi feito. O descarte é o melhor esforço do
+        sistema e não exige privilégios de administrador.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    fd = os.open(filename, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+def warm_page_cache(filename: Path) -> None:
+    """
+    Lê o arquivo inteiro para carregá-lo no cache de páginas.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo a ser carregado.
+    """
+    with open(filename, "rb", buffering=0) as file:
+        while file.read(WARM_READ_SIZE):
+            pass
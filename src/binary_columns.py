@@ -0,0 +1,497 @@
+"""Conversão e leitura do formato binário colunar com NumPy."""
+
+import mmap
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from aggregate import StationAggregate
+from binary_format import (
+    FILENAME_BINARY,
+    MAX_STATIONS,
+    column_offsets,
+    pack_header,
+    read_header,
+)
+from create_measurements import convert_bytes, format_elapsed_time
+from fixed_point import SCALE
+from histogram import HISTOGRAM_DTYPE, NUM_TENTHS, build_histograms
+from quantile_sketch import (
+    NUM_BUCKETS,
+    SKETCH_DTYPE,
+    bucket_index_tenths,
+    build_sketches,
+)
+from settings import FILENAME_OUTPUT
+
+# Tamanho dos blocos de texto convertidos de cada vez
+CONVERT_BLOCK_SIZE: int = 8 * 1024 * 1024
+
+# Número de linhas agregadas de cada vez na leitura do formato binário
+AGGREGATE_BLOCK_ROWS: int = 16 * 1024 * 1024
+
+NEWLINE: int = ord("\n")
+SEMICOLON: int = ord(";")
+DOT: int = ord(".")
+MINUS: int = ord("-")
+ZERO: int = ord("0")
+
+# Base do hash polinomial dos nomes. Por ser ímpar, é invertível módulo 2**64.
+HASH_BASE: int = 0x100000001B3
+HASH_BASE_INVERSE: int = pow(HASH_BASE, -1, 2**64)
+
+# Potências de `HASH_BASE` e do seu inverso já calculadas neste processo
+_HASH_POWERS: Tuple[np.ndarray, np.ndarray] = (
+    np.ones(1, dtype=np.uint64),
+    np.ones(1, dtype=np.uint64),
+)
+
+
+class BinaryMeasurements(NamedTuple):
+    """
+    Colunas de um arquivo binário mapeadas em memória.
+
+    Attributes
+    ----------
+    stations : List[str]
+        Dicionário de estações.
+    station_ids : np.ndarray
+        Coluna uint16 com o identificador da estação de cada medição.
+    tenths : np.ndarray
+        Coluna int16 com a medição em décimos de grau.
+    """
+
+    stations: List[str]
+    station_ids: np.ndarray
+    tenths: np.ndarray
+
+
+def split_lines(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Localiza o início, o separador e o fim de cada linha de um bloco.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Bloco de texto como array uint8, contendo somente linhas completas.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        Posições do início de cada linha, do `;` e do fim de cada linha.
+
+    Raises
+    ------
+    ValueError
+        Se alguma linha não tiver exatamente um `;`.
+    """
+    newlines = np.flatnonzero(data == NEWLINE)
+    if len(data) and data[-1] != NEWLINE:
+        newlines = np.append(newlines, len(data))
+
+    starts = np.empty_like(newlines)
+    starts[:1] = 0
+    starts[1:] = newlines[:-1] + 1
+
+    # Descarta linhas vazias
+    non_empty = newlines > starts
+    starts, newlines = starts[non_empty], newlines[non_empty]
+
+    semicolons = np.flatnonzero(data == SEMICOLON)
+    if len(semicolons) != len(newlines):
+        raise ValueError("Todas as linhas devem ter o formato <estação>;<medição>.")
+
+    return starts, semicolons, newlines
+
+
+def decode_tenths(
+    data: np.ndarray, semicolons: np.ndarray, newlines: np.ndarray
+) -> np.ndarray:
+    """
+    Lê as medições de um bloco como inteiros em décimos de grau.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Bloco de texto como array uint8.
+    semicolons : np.ndarray
+        Posição do `;` de cada linha.
+    newlines : np.ndarray
+        Posição do fim de cada linha.
+
+    Returns
+    -------
+    np.ndarray
+        Medições em décimos de grau (int16).
+
+    Raises
+    ------
+    ValueError
+        Se alguma medição não tiver exatamente uma casa decimal.
+
+    Notes
+    -----
+    Os dígitos são lidos pela posição relativa ao fim da linha (`d.d`, `dd.d`,
+    com sinal opcional), sem conversão para `float`.
+    """
+    if not np.all(data[newlines - 2] == DOT):
+        raise ValueError("Todas as medições devem ter exatamente uma casa decimal.")
+
+    negative = data[semicolons + 1] == MINUS
+    num_digits = newlines - semicolons - 1 - negative
+
+    values = (data[newlines - 1].astype(np.int16) - ZERO) + 10 * (
+        data[newlines - 3].astype(np.int16) - ZERO
+    )
+    values += np.where(
+        num_digits >= 4, 100 * (data[newlines - 4].astype(np.int16) - ZERO), 0
+    ).astype(np.int16)
+
+    return np.where(negative, -values, values).astype(np.int16)
+
+
+def hash_powers(size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Retorna as potências de `HASH_BASE` e do seu inverso, de 0 até `size`.
+
+    Parameters
+    ----------
+    size : int
+        Maior expoente necessário.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        Arrays uint64 com pelo menos `size + 1` potências de `HASH_BASE` e de
+        `HASH_BASE_INVERSE`, módulo 2**64.
+
+    Notes
+    -----
+    As potências só dependem do tamanho do bloco, portanto são calculadas uma
+    vez por processo e ampliadas quando aparece um bloco maior.
+    """
+    global _HASH_POWERS
+    if len(_HASH_POWERS[0]) <= size:
+        powers = np.empty(size + 1, dtype=np.uint64)
+        powers[0] = 1
+        np.cumprod(np.full(size, HASH_BASE, dtype=np.uint64), out=powers[1:])
+
+        inverse_powers = np.empty(size + 1, dtype=np.uint64)
+        inverse_powers[0] = 1
+        np.cumprod(
+            np.full(size, HASH_BASE_INVERSE, dtype=np.uint64), out=inverse_powers[1:]
+        )
+        _HASH_POWERS = (powers, inverse_powers)
+    return _HASH_POWERS
+
+
+def hash_names(
+    data: np.ndarray, starts: np.ndarray, semicolons: np.ndarray
+) -> np.ndarray:
+    """
+    Calcula um hash de 64 bits do nome da estação de cada linha.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Bloco de texto como array uint8.
+    starts : np.ndarray
+        Posição do início de cada linha.
+    semicolons : np.ndarray
+        Posição do `;` de cada linha.
+
+    Returns
+    -------
+    np.ndarray
+        Hash (uint64) de cada nome.
+
+    Notes
+    -----
+    O hash é polinomial (`sum(byte_k * HASH_BASE**k)`, módulo 2**64) e é
+    calculado para todas as linhas de uma vez com somas acumuladas: o hash de
+    um trecho é a diferença de dois prefixos multiplicada pelo inverso de
+    `HASH_BASE` elevado à posição do início do trecho. As potências são
+    reaproveitadas entre blocos (`hash_powers`).
+    """
+    size: int = len(data)
+    powers, inverse_powers = hash_powers(size)
+
+    prefix = np.zeros(size + 1, dtype=np.uint64)
+    np.cumsum(data.astype(np.uint64) * powers[:size], out=prefix[1:])
+
+    return (prefix[semicolons] - prefix[starts]) * inverse_powers[starts]
+
+
+def iter_text_blocks(
+    mm: mmap.mmap,
+    block_size: int = CONVERT_BLOCK_SIZE,
+    start: int = 0,
+    end: Optional[int] = None,
+):
+    """
+    Percorre o arquivo de texto em blocos com linhas completas.
+
+    Parameters
+    ----------
+    mm : mmap.mmap
+        Arquivo de texto mapeado em memória.
+    block_size : int, optional
+        Tamanho aproximado de cada bloco. O padrão é `CONVERT_BLOCK_SIZE`.
+    start : int, optional
+        Deslocamento inicial, no início de uma linha. O padrão é 0.
+    end : int, optional
+        Deslocamento final, logo após uma quebra de linha. O padrão é o fim do
+        arquivo.
+
+    Yields
+    ------
+    np.ndarray
+        Cada bloco como array uint8.
+    """
+    size: int = len(mm) if end is None else end
+    position: int = start
+    while position < size:
+        block_end: int = min(position + block_size, size)
+        if block_end < size:
+            newline: int = mm.find(b"\n", block_end - 1, size)
+            block_end = size if newline == -1 else newline + 1
+        yield np.frombuffer(mm[position:block_end], dtype=np.uint8)
+        position = block_end
+
+
+def convert_to_binary(
+    filename: Path = FILENAME_OUTPUT, binary_filename: Path = FILENAME_BINARY
+) -> Path:
+    """
+    Gera o arquivo binário colunar a partir do arquivo de medições em texto.
+
+    Parameters
+    ----------
+    filename : Path, optional
+        Arquivo de texto no formato `<estação>;<medição>`. O padrão é
+        `FILENAME_OUTPUT`.
+    binary_filename : Path, optional
+        Arquivo binário gerado. O padrão é `FILENAME_BINARY`.
+
+    Return
+    -------
+    Path
+        O caminho do arquivo binário.
+
+    Raises
+    ------
+    ValueError
+        Se o arquivo tiver mais estações que `MAX_STATIONS`, linhas mal formatadas
+        ou nomes de estações diferentes com o mesmo hash.
+
+    Notes
+    -----
+    - Uma primeira passada conta as linhas para reservar as colunas, que depois
+      são preenchidas diretamente no arquivo de saída mapeado em memória.
+    - Em cada bloco, os nomes são codificados por hash vetorizado e só os nomes
+      distintos do bloco são decodificados em Python.
+    """
+    start_time: float = time.time()
+    station_index: Dict[int, int] = {}
+    stations: List[str] = []
+
+    with open(filename, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            num_rows: int = sum(
+                len(split_lines(block)[0]) for block in iter_text_blocks(mm)
+            )
+            station_ids_offset, tenths_offset, dictionary_offset = column_offsets(
+                num_rows
+            )
+
+            with open(binary_filename, "wb") as output:
+                output.truncate(dictionary_offset)
+            station_ids = np.memmap(
+                binary_filename,
+                dtype="<u2",
+                mode="r+",
+                offset=station_ids_offset,
+                shape=(num_rows,),
+            )
+            tenths = np.memmap(
+                binary_filename,
+                dtype="<i2",
+                mode="r+",
+                offset=tenths_offset,
+                shape=(num_rows,),
+            )
+
+            row: int = 0
+            for block in iter_text_blocks(mm):
+                starts, semicolons, newlines = split_lines(block)
+                hashes = hash_names(block, starts, semicolons)
+                unique_hashes, first_rows, inverse = np.unique(
+                    hashes, return_index=True, return_inverse=True
+                )
+
+                block_ids = np.empty(len(unique_hashes), dtype=np.uint16)
+                for i, (name_hash, first_row) in enumerate(
+                    zip(unique_hashes.tolist(), first_rows.tolist())
+                ):
+                    name: str = bytes(
+                        block[starts[first_row] : semicolons[first_row]]
+                    ).decode("utf-8")
+                    station_id = station_index.get(name_hash)
+                    if station_id is None:
+                        if len(stations) == MAX_STATIONS:
+                            raise ValueError(
+                                f"O formato binário suporta até {MAX_STATIONS} estações."
+                            )
+                        station_id = station_index[name_hash] = len(stations)
+                        stations.append(name)
+                    elif stations[station_id] != name:
+                        raise ValueError(
+                            f"Colisão de hash entre {name} e {stations[station_id]}."
+                        )
+                    block_ids[i] = station_id
+
+                num_block_rows: int = len(starts)
+                station_ids[row : row + num_block_rows] = block_ids[inverse]
+                tenths[row : row + num_block_rows] = decode_tenths(
+                    block, semicolons, newlines
+                )
+                row += num_block_rows
+
+            station_ids.flush()
+            tenths.flush()
+            del station_ids, tenths
+
+    dictionary: bytes = "\n".join(stations).encode("utf-8")
+    with open(binary_filename, "r+b") as output:
+        output.write(pack_header(len(stations), num_rows, len(dictionary)))
+        output.seek(dictionary_offset)
+        output.write(dictionary)
+
+    elapsed_time: float = time.time() - start_time
+    print(f"Arquivo binário escrito com sucesso: {binary_filename}")
+    print(f"Tamanho final:  {convert_bytes(binary_filename.stat().st_size)}")
+    print(f"Tempo decorrido: {format_elapsed_time(elapsed_time)}")
+
+    return binary_filename
+
+
+def open_binary(binary_filename: Path = FILENAME_BINARY) -> BinaryMeasurements:
+    """
+    Mapeia as colunas de um arquivo binário como arrays NumPy, sem cópia.
+
+    Parameters
+    ----------
+    binary_filename : Path, optional
+        Arquivo binário. O padrão é `FILENAME_BINARY`.
+
+    Return
+    -------
+    BinaryMeasurements
+        Dicionário de estações e colunas mapeadas em memória (somente leitura).
+    """
+    header = read_header(binary_filename)
+    if header.num_rows == 0:
+        return BinaryMeasurements(
+            header.stations, np.empty(0, np.uint16), np.empty(0, np.int16)
+        )
+
+    station_ids = np.memmap(
+        binary_filename,
+        dtype="<u2",
+        mode="r",
+        offset=header.station_ids_offset,
+        shape=(header.num_rows,),
+    )
+    tenths = np.memmap(
+        binary_filename,
+        dtype="<i2",
+        mode="r",
+        offset=header.tenths_offset,
+        shape=(header.num_rows,),
+    )
+    return BinaryMeasurements(header.stations, station_ids, tenths)
+
+
+def aggregate_binary(
+    binary_filename: Path,
+    block_rows: int = AGGREGATE_BLOCK_ROWS,
+    sketch: bool = False,
+    histogram: bool = False,
+) -> StationAggregate:
+    """
+    Agrega as medições de um arquivo binário por estação.
+
+    Parameters
+    ----------
+    binary_filename : Path
+        Arquivo binário.
+    block_rows : int, optional
+        Número de linhas agregadas de cada vez. O padrão é `AGGREGATE_BLOCK_ROWS`.
+    sketch : bool, optional
+        Se verdadeiro, também monta o sketch de quantis de cada estação. O padrão
+        é falso.
+    histogram : bool, optional
+        Se verdadeiro, também monta o histograma exato de cada estação. O padrão
+        é falso.
+
+    Return
+    -------
+    StationAggregate
+        Agregado em décimos de grau (`scale = fixed_point.SCALE`).
+
+    Notes
+    -----
+    - Contagem e soma usam `np.bincount`; mínimo e máximo usam `np.minimum.at` e
+      `np.maximum.at` sobre o identificador da estação.
+    - As colunas são lidas em blocos para limitar a memória temporária.
+    """
+    measurements = open_binary(binary_filename)
+    num_stations: int = len(measurements.stations)
+
+    min_values = np.full(num_stations, np.iinfo(np.int16).max, dtype=np.int16)
+    max_values = np.full(num_stations, np.iinfo(np.int16).min, dtype=np.int16)
+    sums = np.zeros(num_stations, dtype=np.int64)
+    counts = np.zeros(num_stations, dtype=np.int64)
+    sketches: Optional[np.ndarray] = (
+        np.zeros((num_stations, NUM_BUCKETS), dtype=SKETCH_DTYPE) if sketch else None
+    )
+    histograms: Optional[np.ndarray] = (
+        np.zeros((num_stations, NUM_TENTHS), dtype=HISTOGRAM_DTYPE)
+        if histogram
+        else None
+    )
+
+    for start in range(0, len(measurements.tenths), block_rows):
+        station_ids = np.asarray(measurements.station_ids[start : start + block_rows])
+        tenths = np.asarray(measurements.tenths[start : start + block_rows])
+
+        counts += np.bincount(station_ids, minlength=num_stations)
+        sums += np.bincount(station_ids, weights=tenths, minlength=num_stations).astype(
+            np.int64
+        )
+        np.minimum.at(min_values, station_ids, tenths)
+        np.maximum.at(max_values, station_ids, tenths)
+        if sketches is not None:
+            sketches += build_sketches(
+                station_ids, bucket_index_tenths(tenths), num_stations
+            )
+        if histograms is not None:
+            histograms += build_histograms(station_ids, tenths, num_stations)
+
+    present = counts > 0
+    return StationAggregate.from_columns(
+        np.asarray(measurements.stations, dtype=object)[present],
+        min_values[present],
+        max_values[present],
+        sums[present],
+        counts[present],
+        scale=SCALE,
+        sketches=None if sketches is None else sketches[present],
+        histograms=None if histograms is None else histograms[present],
+    )
+
+
+if __name__ == "__main__":
+    convert_to_binary(FILENAME_OUTPUT, FILENAME_BINARY)
@@ -0,0 +1,162 @@
+"""Especificação do formato binário colunar das medições."""
+
+import struct
+from pathlib import Path
+from typing import List, NamedTuple
+
+from settings import BASE_DIR
+
+FILENAME_BINARY: Path = BASE_DIR / "../data/measurements.bin"
+
+MAGIC: bytes = b"1BRCCOL\x00"
+VERSION: int = 1
+
+# magic, versão, número de estações, número de linhas, deslocamento e tamanho do
+# dicionário de estações
+HEADER_STRUCT = struct.Struct("<8sIIQQQ")
+HEADER_SIZE: int = 64
+
+# Alinhamento, em bytes, do início de cada coluna
+ALIGNMENT: int = 64
+
+# As colunas usam uint16 (estação) e int16 (décimos de grau)
+ITEM_SIZE: int = 2
+MAX_STATIONS: int = 2**16
+
+
+class BinaryHeader(NamedTuple):
+    """
+    Cabeçalho de um arquivo no formato binário colunar.
+
+    Attributes
+    ----------
+    stations : List[str]
+        Dicionário de estações. O identificador de cada estação é a sua posição.
+    num_rows : int
+        Número de medições no arquivo.
+    station_ids_offset : int
+        Deslocamento, em bytes, da coluna de identificadores (uint16).
+    tenths_offset : int
+        Deslocamento, em bytes, da coluna de temperaturas em décimos de grau
+        (int16).
+    """
+
+    stations: List[str]
+    num_rows: int
+    station_ids_offset: int
+    tenths_offset: int
+
+
+def align(offset: int) -> int:
+    """Arredonda `offset` para cima até o próximo múltiplo de `ALIGNMENT`."""
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def column_offsets(num_rows: int) -> List[int]:
+    """
+    Calcula a posição das colunas e do dicionário no arquivo.
+
+    Parameters
+    ----------
+    num_rows : int
+        Número de medições no arquivo.
+
+    Return
+    -------
+    List[int]
+        Deslocamentos, em bytes, da coluna de identificadores, da coluna de
+        temperaturas e do dicionário de estações.
+
+    Notes
+    -----
+    O layout do arquivo é::
+
+        [cabeçalho][station_id uint16 * N][tenths int16 * N][dicionário]
+
+    com cada coluna alinhada em `ALIGNMENT` bytes. O dicionário é gravado depois
+    das colunas, pois só é conhecido ao final da conversão, e o cabeçalho guarda
+    a sua posição e o seu tamanho.
+    """
+    station_ids_offset: int = HEADER_SIZE
+    tenths_offset: int = align(station_ids_offset + num_rows * ITEM_SIZE)
+    dictionary_offset: int = align(tenths_offset + num_rows * ITEM_SIZE)
+    return [station_ids_offset, tenths_offset, dictionary_offset]
+
+
+def pack_header(num_stations: int, num_rows: int, dictionary_size: int) -> bytes:
+    """
+    Monta os bytes do cabeçalho.
+
+    Parameters
+    ----------
+    num_stations : int
+        Número de estações no dicionário.
+    num_rows : int
+        Número de medições no arquivo.
+    dictionary_size : int
+        Tamanho, em bytes, do dicionário de estações.
+
+    Return
+    -------
+    bytes
+        Cabeçalho com `HEADER_SIZE` bytes.
+    """
+    dictionary_offset: int = column_offsets(num_rows)[2]
+    header: bytes = HEADER_STRUCT.pack(
+        MAGIC, VERSION, num_stations, num_rows, dictionary_offset, dictionary_size
+    )
+    return header.ljust(HEADER_SIZE, b"\x00")
+
+
+def is_binary_file(filename: Path) -> bool:
+    """
+    Verifica se o arquivo está no formato binário colunar.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho do arquivo.
+
+    Return
+    -------
+    bool
+        Verdadeiro se o arquivo começar com `MAGIC`.
+    """
+    with open(filename, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def read_header(filename: Path) -> BinaryHeader:
+    """
+    Lê o cabeçalho e o dicionário de estações de um arquivo binário.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho do arquivo.
+
+    Return
+    -------
+    BinaryHeader
+        Cabeçalho com o dicionário de estações e a posição das colunas.
+
+    Raises
+    ------
+    ValueError
+        Se o arquivo não estiver no formato esperado.
+    """
+    with open(filename, "rb") as file:
+        magic, version, num_stations, num_rows, dictionary_offset, dictionary_size = (
+            HEADER_STRUCT.unpack(file.read(HEADER_STRUCT.size))
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Arquivo binário inválido: {filename}")
+        file.seek(dictionary_offset)
+        dictionary: bytes = file.read(dictionary_size)
+
+    stations: List[str] = dictionary.decode("utf-8").split("\n") if num_stations else []
+    if len(stations) != num_stations:
+        raise ValueError(f"Dicionário de estações corrompido: {filename}")
+
+    station_ids_offset, tenths_offset, _ = column_offsets(num_rows)
+    return BinaryHeader(stations, num_rows, station_ids_offset, tenths_offset)
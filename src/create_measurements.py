@@ -2,17 +2,116 @@
 
 import os
 import random
+import shutil
+import sys
 import time
+from itertools import chain
+from multiprocessing import Pool, cpu_count
 from pathlib import Path
-from typing import List
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
-# Parâmetros para Criação do Arquivo Teste
-NUM_ROWS_TO_CREATE: int = 1_000_000_000
+import numpy as np
 
-BASE_DIR: Path = Path(__file__).parent.resolve()
+from settings import FILENAME_INPUT, FILENAME_OUTPUT, NUM_ROWS_TO_CREATE
 
-FILENAME_INPUT: Path = BASE_DIR / "../data/weather_stations.csv"
-FILENAME_OUTPUT: Path = BASE_DIR / "../data/measurements.txt"
+# Parâmetros do gerador paralelo
+SEED: int = 42
+CONCURRENCY: int = cpu_count()
+SEGMENT_ROWS: int = 5_000_000
+GENERATOR_BATCH_SIZE: int = 500_000
+COLDEST_TENTHS: int = -999
+HOTTEST_TENTHS: int = 999
+SAMPLED_STATIONS: int = 10_000
+
+# Expoente da distribuição de Zipf: a estação de posição k aparece com
+# frequência proporcional a 1 / k**ZIPF_EXPONENT
+ZIPF_EXPONENT: float = 1.1
+
+# Tamanho médio das rajadas de linhas seguidas da mesma estação
+BURST_MEAN_ROWS: int = 100
+
+# Tamanho máximo do nome das estações, em bytes, pelas regras do desafio
+MAX_NAME_BYTES: int = 100
+LONG_NAME_SUFFIX: str = (
+    " · Ñandú-Øresund-Þórshöfn-Ærøskøbing-Ğümüşhane-Χανιά-Дніпро-東京都"
+)
+
+
+class DatasetProfile(NamedTuple):
+    """
+    Distribuição das linhas de um arquivo de medições.
+
+    Attributes
+    ----------
+    stations : str
+        `"sample"` sorteia `SAMPLED_STATIONS` estações (com repetição), como o
+        gerador original, e `"all"` usa todos os nomes distintos.
+    distribution : str
+        Frequência das estações: `"uniform"` ou `"zipf"` (poucas estações com
+        a maior parte das linhas).
+    names : str
+        `"original"` ou `"long"`, com os nomes estendidos por caracteres UTF-8
+        de vários bytes até `MAX_NAME_BYTES`.
+    order : str
+        Ordem das linhas: `"random"`, `"sorted"` (agrupadas por estação, em
+        ordem alfabética) ou `"bursty"` (rajadas de `BURST_MEAN_ROWS` linhas
+        seguidas, em média, da mesma estação).
+    """
+
+    stations: str = "sample"
+    distribution: str = "uniform"
+    names: str = "original"
+    order: str = "random"
+
+
+# Perfis usados nos testes: cada um altera um aspecto do arquivo original, e
+# `stress` combina todos
+DATASET_PROFILES: Dict[str, DatasetProfile] = {
+    "uniform": DatasetProfile(),
+    "zipf": DatasetProfile(distribution="zipf"),
+    "all_stations": DatasetProfile(stations="all"),
+    "long_names": DatasetProfile(names="long"),
+    "sorted": DatasetProfile(order="sorted"),
+    "bursty": DatasetProfile(order="bursty"),
+    "stress": DatasetProfile("all", "zipf", "long", "bursty"),
+}
+DEFAULT_DATASET: str = "uniform"
+
+
+class SegmentTask(NamedTuple):
+    """
+    Segmento do arquivo gerado por um processo.
+
+    Attributes
+    ----------
+    segment_file : Path
+        Arquivo temporário do segmento.
+    num_rows : int
+        Número de linhas do segmento.
+    seed_sequence : np.random.SeedSequence
+        Semente do segmento.
+    station_names : List[str]
+        Estações sorteáveis.
+    order : str
+        Ordem das linhas, como em `DatasetProfile.order`.
+    cumulative_weights : np.ndarray, optional
+        Probabilidade acumulada de cada estação. Se não for informada, as
+        estações são equiprováveis.
+    first_row : int
+        Posição da primeira linha do segmento no arquivo.
+    station_ends : np.ndarray, optional
+        Com `order="sorted"`, posição no arquivo da linha seguinte à última
+        linha de cada estação.
+    """
+
+    segment_file: Path
+    num_rows: int
+    seed_sequence: np.random.SeedSequence
+    station_names: List[str]
+    order: str = "random"
+    cumulative_weights: Optional[np.ndarray] = None
+    first_row: int = 0
+    station_ends: Optional[np.ndarray] = None
 
 
 def check_args(file_args: List[str]) -> None:
@@ -241,8 +340,340 @@ def build_test_data(weather_station_names: List[str], num_rows_to_create: int) -
     print(f"Tempo decorrido: {format_elapsed_time(elapsed_time)}")
 
 
+def long_station_name(station: str) -> str:
+    """
+    Estende o nome de uma estação com caracteres UTF-8 de vários bytes.
+
+    Parameters
+    ----------
+    station : str
+        Nome original.
+
+    Returns
+    -------
+    str
+        Nome seguido de `LONG_NAME_SUFFIX`, cortado em um limite de caractere
+        para ter no máximo `MAX_NAME_BYTES` bytes. Nomes que já passam do limite
+        são mantidos.
+    """
+    name: str = station
+    for character in LONG_NAME_SUFFIX:
+        if len((name + character).encode("utf-8")) > MAX_NAME_BYTES:
+            break
+        name += character
+    return name
+
+
+def profile_stations(
+    weather_station_names: List[str],
+    profile: DatasetProfile,
+    num_rows_to_create: int,
+    rng: np.random.Generator,
+) -> Tuple[List[str], Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Escolhe as estações de um perfil e a frequência de cada uma.
+
+    Parameters
+    ----------
+    weather_station_names : List[str]
+        Lista com os nomes das estações meteorológicas.
+    profile : DatasetProfile
+        Perfil do arquivo.
+    num_rows_to_create : int
+        Número de registros do arquivo.
+    rng : np.random.Generator
+        Gerador usado nos sorteios.
+
+    Returns
+    -------
+    Tuple[List[str], Optional[np.ndarray], Optional[np.ndarray]]
+        Estações sorteáveis, a probabilidade acumulada de cada uma (`None` se
+        forem equiprováveis) e, com `order="sorted"`, a posição no arquivo do
+        fim das linhas de cada estação.
+
+    Notes
+    -----
+    - O perfil padrão consome o gerador exatamente como as versões anteriores,
+      portanto a mesma semente continua gerando o mesmo arquivo.
+    - Na distribuição de Zipf, a posição de cada estação no ranking é sorteada,
+      para que as estações mais frequentes não sejam as primeiras em ordem
+      alfabética.
+    - Com `order="sorted"`, o número de linhas de cada estação é sorteado uma
+      vez para o arquivo todo, e cada segmento gera somente as suas posições.
+    """
+    station_names: List[str] = sorted(weather_station_names)
+    if profile.stations == "sample":
+        station_names = [
+            station_names[i]
+            for i in rng.integers(0, len(station_names), SAMPLED_STATIONS)
+        ]
+    if profile.names == "long":
+        station_names = [long_station_name(station) for station in station_names]
+    if profile.order == "sorted":
+        station_names.sort()
+
+    weights: Optional[np.ndarray] = None
+    if profile.distribution == "zipf":
+        ranks = rng.permutation(len(station_names)) + 1
+        weights = 1.0 / ranks.astype(np.float64) ** ZIPF_EXPONENT
+        weights /= weights.sum()
+
+    station_ends: Optional[np.ndarray] = None
+    if profile.order == "sorted":
+        counts = rng.multinomial(
+            num_rows_to_create,
+            (
+                weights
+                if weights is not None
+                else np.full(len(station_names), 1 / len(station_names))
+            ),
+        )
+        station_ends = np.cumsum(counts)
+
+    return (
+        station_names,
+        None if weights is None else np.cumsum(weights),
+        station_ends,
+    )
+
+
+def draw_station_ids(
+    rng: np.random.Generator,
+    size: int,
+    num_stations: int,
+    cumulative_weights: Optional[np.ndarray],
+) -> np.ndarray:
+    """Sorteia `size` índices de estações, com as probabilidades informadas."""
+    if cumulative_weights is None:
+        return rng.integers(0, num_stations, size)
+    # O último valor acumulado pode ficar um pouco abaixo de 1 por arredondamento
+    return np.minimum(
+        np.searchsorted(cumulative_weights, rng.random(size), side="right"),
+        num_stations - 1,
+    )
+
+
+def segment_station_ids(
+    task: SegmentTask, rng: np.random.Generator, row: int, size: int
+) -> np.ndarray:
+    """
+    Gera os índices das estações de um lote do segmento.
+
+    Parameters
+    ----------
+    task : SegmentTask
+        Segmento sendo gerado.
+    rng : np.random.Generator
+        Gerador do segmento.
+    row : int
+        Posição do lote no segmento.
+    size : int
+        Número de linhas do lote.
+
+    Returns
+    -------
+    np.ndarray
+        Índice em `task.station_names` de cada linha do lote, na ordem do perfil.
+    """
+    num_stations: int = len(task.station_names)
+    if task.order == "sorted":
+        positions = np.arange(task.first_row + row, task.first_row + row + size)
+        return np.searchsorted(task.station_ends, positions, side="right")
+    if task.order == "bursty":
+        # Rajadas com tamanho geométrico; a última é cortada no fim do lote
+        station_ids: List[np.ndarray] = []
+        remaining: int = size
+        while remaining > 0:
+            num_bursts: int = remaining // BURST_MEAN_ROWS + 1
+            lengths = rng.geometric(1 / BURST_MEAN_ROWS, num_bursts)
+            stations = draw_station_ids(
+                rng, num_bursts, num_stations, task.cumulative_weights
+            )
+            station_ids.append(np.repeat(stations, lengths)[:remaining])
+            remaining -= len(station_ids[-1])
+        return np.concatenate(station_ids)
+    return draw_station_ids(rng, size, num_stations, task.cumulative_weights)
+
+
+def write_test_data_segment(args: SegmentTask) -> Path:
+    """
+    Gera e escreve um segmento do arquivo de dados de teste.
+
+    Parameters
+    ----------
+    args : SegmentTask
+        Caminho, número de linhas, semente e estações sorteáveis do segmento,
+        com a ordem e as frequências do perfil.
+
+    Return
+    -------
+    Path
+        O caminho do segmento escrito.
+
+    Notes
+    -----
+    - Os índices das estações e as temperaturas em décimos de grau são sorteados
+      com NumPy em lotes de `GENERATOR_BATCH_SIZE` linhas.
+    - As linhas são montadas em bloco a partir de tabelas pré-formatadas com o
+      texto de cada estação e de cada temperatura possível, sem f-strings por
+      linha.
+    """
+    rng = np.random.default_rng(args.seed_sequence)
+
+    station_prefixes = np.array(
+        [f"{station};".encode("utf-8") for station in args.station_names],
+        dtype=object,
+    )
+    temperatures = np.array(
+        [
+            f"{tenths / 10:.1f}\n".encode("utf-8")
+            for tenths in range(COLDEST_TENTHS, HOTTEST_TENTHS + 1)
+        ],
+        dtype=object,
+    )
+
+    with open(args.segment_file, "wb") as file:
+        for batch_start in range(0, args.num_rows, GENERATOR_BATCH_SIZE):
+            size: int = min(GENERATOR_BATCH_SIZE, args.num_rows - batch_start)
+            station_ids = segment_station_ids(args, rng, batch_start, size)
+            temperature_ids = rng.integers(0, len(temperatures), size)
+            file.write(
+                b"".join(
+                    chain.from_iterable(
+                        zip(
+                            station_prefixes[station_ids],
+                            temperatures[temperature_ids],
+                        )
+                    )
+                )
+            )
+
+    return args.segment_file
+
+
+def build_test_data_parallel(
+    weather_station_names: List[str],
+    num_rows_to_create: int,
+    seed: int = SEED,
+    workers: int = CONCURRENCY,
+    filename: Path = FILENAME_OUTPUT,
+    dataset: str = DEFAULT_DATASET,
+) -> None:
+    """
+    Gera o arquivo de dados de teste com NumPy e múltiplos processos.
+
+    Parameters
+    ----------
+    weather_station_names : List[str]
+        Lista com os nomes das estações meteorológicas.
+    num_rows_to_create : int
+        Número de registros a serem criados no arquivo.
+    seed : int, optional
+        Semente do gerador. A mesma semente gera sempre o mesmo arquivo,
+        independentemente do número de processos. O padrão é `SEED`.
+    workers : int, optional
+        Número de processos usados. O padrão é o número de CPUs disponíveis.
+    filename : Path, optional
+        Caminho do arquivo gerado. O padrão é `FILENAME_OUTPUT`.
+    dataset : str, optional
+        Nome do perfil em `DATASET_PROFILES`. O padrão, `"uniform"`, segue a
+        mesma distribuição de `build_test_data` (10 mil estações sorteadas com
+        reposição e temperaturas uniformes entre -99.9 e 99.9, com uma casa
+        decimal), mas usa o gerador do NumPy, portanto os arquivos não são
+        iguais byte a byte.
+
+    Return
+    -------
+    None
+        Não retorna nada, mas cria o arquivo com os dados gerados.
+
+    Raises
+    ------
+    ValueError
+        Se `dataset` não for um dos perfis.
+
+    Notes
+    -----
+    - No perfil padrão, como em `build_test_data`, são sorteadas até 10 mil
+      estações equiprováveis. Em todos os perfis, as temperaturas ficam entre
+      -99.9 e 99.9 com uma casa decimal.
+    - O arquivo é dividido em segmentos de `SEGMENT_ROWS` linhas, cada um com a sua
+      própria semente derivada de `seed`. Os segmentos são escritos em paralelo em
+      arquivos separados e concatenados em ordem ao final.
+    """
+    if dataset not in DATASET_PROFILES:
+        raise ValueError(
+            f"Perfil desconhecido: {dataset}. Disponíveis: "
+            f"{', '.join(DATASET_PROFILES)}."
+        )
+    profile: DatasetProfile = DATASET_PROFILES[dataset]
+
+    start_time: float = time.time()
+    rng = np.random.default_rng(seed)
+    station_names, cumulative_weights, station_ends = profile_stations(
+        weather_station_names, profile, num_rows_to_create, rng
+    )
+
+    num_segments: int = max(-(-num_rows_to_create // SEGMENT_ROWS), 1)
+    seed_sequences = np.random.SeedSequence(seed).spawn(num_segments)
+    tasks = [
+        SegmentTask(
+            Path(f"{filename}.part{segment:05d}"),
+            min(SEGMENT_ROWS, num_rows_to_create - segment * SEGMENT_ROWS),
+            seed_sequences[segment],
+            station_names,
+            profile.order,
+            cumulative_weights,
+            segment * SEGMENT_ROWS,
+            station_ends,
+        )
+        for segment in range(num_segments)
+    ]
+    print(f"Criando o arquivo ({dataset}) com {workers} processos...")
+
+    try:
+        with open(filename, "wb") as file:
+            with Pool(workers) as pool:
+                # Concatena os segmentos em ordem, à medida que ficam prontos
+                for segment_file in pool.imap(write_test_data_segment, tasks):
+                    with open(segment_file, "rb") as segment:
+                        shutil.copyfileobj(segment, file, 16 * 1024 * 1024)
+                    os.remove(segment_file)
+    except FileNotFoundError:
+        print(  # noqa (evitar conflito do black e do autopep8)
+            "Verifique se o ambiente virtual está ativo. "
+            "Para isso, use o comando 'poetry env activate' "
+            "antes de iniciar a execução do programa."
+        )
+        exit()
+    except Exception as e:
+        print("Ocorreu um erro ao criar o arquivo:")
+        print(e)
+        exit()
+
+    elapsed_time: float = time.time() - start_time
+    file_size: int = os.path.getsize(filename)
+    human_file_size: str = convert_bytes(file_size)
+
+    print(f"Arquivo escrito com sucesso: {filename}")
+    print(f"Tamanho final:  {human_file_size}")
+    print(f"Tempo decorrido: {format_elapsed_time(elapsed_time)}")
+    print(f"Vazão: {num_rows_to_create / elapsed_time:,.0f} linhas/s")
+
+
 if __name__ == "__main__":
     weather_station_names: List[str] = build_weather_station_name_list()
     print(estimate_file_size(weather_station_names, NUM_ROWS_TO_CREATE))
-    build_test_data(weather_station_names, NUM_ROWS_TO_CREATE)
+    if "--parallel" in sys.argv:
+        # Perfil opcional: `--parallel --dataset zipf`
+        dataset: str = (
+            sys.argv[sys.argv.index("--dataset") + 1]
+            if "--dataset" in sys.argv
+            else DEFAULT_DATASET
+        )
+        build_test_data_parallel(
+            weather_station_names, NUM_ROWS_TO_CREATE, dataset=dataset
+        )
+    else:
+        build_test_data(weather_station_names, NUM_ROWS_TO_CREATE)
     print("Arquivo de teste finalizado.")
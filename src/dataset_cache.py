@@ -0,0 +1,288 @@
+"""Cache dos arquivos de medições gerados para os testes."""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from create_measurements import (
+    DEFAULT_DATASET,
+    SEED,
+    build_test_data_parallel,
+    build_weather_station_name_list,
+    convert_bytes,
+    estimate_file_size,
+)
+from settings import BASE_DIR
+
+CACHE_DIR: Path = BASE_DIR / "../data/cache"
+MANIFEST_FILENAME: str = "manifest.json"
+
+# Espaço máximo em disco ocupado pelos arquivos do cache
+CACHE_BUDGET_BYTES: int = 64 * 1024**3
+
+# Bytes lidos em cada amostra da soma de verificação
+CHECKSUM_SAMPLE_SIZE: int = 1024 * 1024
+CHECKSUM_SAMPLES: int = 16
+
+
+def station_list_hash(weather_station_names: List[str]) -> str:
+    """
+    Calcula um hash da lista de estações, independente da ordem.
+
+    Parameters
+    ----------
+    weather_station_names : List[str]
+        Lista com os nomes das estações meteorológicas.
+
+    Return
+    -------
+    str
+        Os 16 primeiros caracteres do SHA-256 dos nomes ordenados.
+    """
+    digest = hashlib.sha256()
+    for station in sorted(weather_station_names):
+        digest.update(station.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()[:16]
+
+
+def file_checksum(filename: Path) -> str:
+    """
+    Calcula uma soma de verificação amostrada do arquivo.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho do arquivo.
+
+    Return
+    -------
+    str
+        SHA-256 do tamanho do arquivo e de `CHECKSUM_SAMPLES` blocos de
+        `CHECKSUM_SAMPLE_SIZE` bytes distribuídos uniformemente, incluindo o início e
+        o fim do arquivo.
+
+    Notes
+    -----
+    Ler o arquivo inteiro levaria quase o mesmo tempo que processá-lo. As amostras
+    bastam para detectar arquivos truncados, sobrescritos ou gerados com outros
+    parâmetros.
+    """
+    file_size: int = os.path.getsize(filename)
+    digest = hashlib.sha256(str(file_size).encode())
+    last_offset: int = max(file_size - CHECKSUM_SAMPLE_SIZE, 0)
+
+    with open(filename, "rb") as file:
+        for sample in range(CHECKSUM_SAMPLES):
+            file.seek(last_offset * sample // max(CHECKSUM_SAMPLES - 1, 1))
+            digest.update(file.read(CHECKSUM_SAMPLE_SIZE))
+
+    return digest.hexdigest()
+
+
+def load_manifest(cache_dir: Path = CACHE_DIR) -> Dict[str, dict]:
+    """
+    Lê o manifesto do cache.
+
+    Parameters
+    ----------
+    cache_dir : Path, optional
+        Diretório do cache. O padrão é `CACHE_DIR`.
+
+    Return
+    -------
+    Dict[str, dict]
+        Dicionário com o nome de cada arquivo do cache como chave e os seus
+        metadados (linhas, semente, hash das estações, tamanho, soma de verificação
+        e último uso) como valor. Vazio se o manifesto não existir ou estiver
+        corrompido.
+    """
+    try:
+        with open(cache_dir / MANIFEST_FILENAME, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(manifest: Dict[str, dict], cache_dir: Path = CACHE_DIR) -> None:
+    """
+    Grava o manifesto do cache de forma atômica.
+
+    Parameters
+    ----------
+    manifest : Dict[str, dict]
+        Manifesto a ser gravado.
+    cache_dir : Path, optional
+        Diretório do cache. O padrão é `CACHE_DIR`.
+    """
+    temporary_file: Path = cache_dir / f"{MANIFEST_FILENAME}.tmp"
+    with open(temporary_file, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    os.replace(temporary_file, cache_dir / MANIFEST_FILENAME)
+
+
+def is_valid_entry(entry: dict, filename: Path) -> bool:
+    """
+    Verifica se o arquivo do cache corresponde ao registrado no manifesto.
+
+    Parameters
+    ----------
+    entry : dict
+        Metadados do arquivo no manifesto.
+    filename : Path
+        Caminho do arquivo.
+
+    Return
+    -------
+    bool
+        Verdadeiro se o arquivo existir e tiver o tamanho e a soma de verificação
+        registrados.
+    """
+    try:
+        if os.path.getsize(filename) != entry["size"]:
+            return False
+    except (FileNotFoundError, KeyError):
+        return False
+    return file_checksum(filename) == entry.get("checksum")
+
+
+def evict_datasets(
+    manifest: Dict[str, dict],
+    budget_bytes: int = CACHE_BUDGET_BYTES,
+    keep: Optional[str] = None,
+    cache_dir: Path = CACHE_DIR,
+) -> List[str]:
+    """
+    Remove os arquivos usados há mais tempo até o cache caber no orçamento.
+
+    Parameters
+    ----------
+    manifest : Dict[str, dict]
+        Manifesto do cache. É alterado no lugar.
+    budget_bytes : int, optional
+        Espaço máximo ocupado pelo cache. O padrão é `CACHE_BUDGET_BYTES`.
+    keep : str, optional
+        Nome de um arquivo que nunca deve ser removido (o que acabou de ser
+        usado).
+    cache_dir : Path, optional
+        Diretório do cache. O padrão é `CACHE_DIR`.
+
+    Return
+    -------
+    List[str]
+        Nomes dos arquivos removidos.
+    """
+    removed: List[str] = []
+    total_size: int = sum(entry["size"] for entry in manifest.values())
+    by_last_use = sorted(manifest.items(), key=lambda item: item[1]["last_used"])
+
+    for name, entry in by_last_use:
+        if total_size <= budget_bytes:
+            break
+        if name == keep:
+            continue
+        try:
+            os.remove(cache_dir / name)
+        except FileNotFoundError:
+            pass
+        total_size -= entry["size"]
+        del manifest[name]
+        removed.append(name)
+
+    return removed
+
+
+def get_dataset(
+    num_rows: int,
+    seed: int = SEED,
+    weather_station_names: Optional[List[str]] = None,
+    budget_bytes: int = CACHE_BUDGET_BYTES,
+    cache_dir: Path = CACHE_DIR,
+    dataset: str = DEFAULT_DATASET,
+) -> Path:
+    """
+    Retorna o arquivo de medições do cache, gerando-o somente se necessário.
+
+    Parameters
+    ----------
+    num_rows : int
+        Número de linhas do arquivo.
+    seed : int, optional
+        Semente do gerador. O padrão é `SEED`.
+    weather_station_names : List[str], optional
+        Lista com os nomes das estações. Se não for informada, é lida de
+        `weather_stations.csv`.
+    budget_bytes : int, optional
+        Espaço máximo ocupado pelo cache. O padrão é `CACHE_BUDGET_BYTES`.
+    cache_dir : Path, optional
+        Diretório do cache. O padrão é `CACHE_DIR`.
+    dataset : str, optional
+        Perfil do arquivo, em `create_measurements.DATASET_PROFILES`. O padrão
+        é `"uniform"`.
+
+    Return
+    -------
+    Path
+        Caminho do arquivo de medições.
+
+    Notes
+    -----
+    - A chave do cache é formada pelo número de linhas, pela semente, pelo hash da
+      lista de estações e pelo perfil. O nome dos arquivos do perfil padrão não
+      inclui o perfil, para aproveitar os arquivos já gerados.
+    - Arquivos ausentes, truncados ou alterados são detectados pelo tamanho e pela
+      soma de verificação amostrada e gerados novamente.
+    - Após gerar um arquivo, os arquivos usados há mais tempo são removidos até o
+      cache caber em `budget_bytes`.
+    """
+    if weather_station_names is None:
+        weather_station_names = build_weather_station_name_list()
+
+    stations_hash: str = station_list_hash(weather_station_names)
+    suffix: str = "" if dataset == DEFAULT_DATASET else f"_{dataset}"
+    name: str = f"measurements_{num_rows}_{seed}_{stations_hash}{suffix}.txt"
+    filename: Path = cache_dir / name
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest: Dict[str, dict] = load_manifest(cache_dir)
+    entry: Optional[dict] = manifest.get(name)
+
+    if entry is not None and is_valid_entry(entry, filename):
+        print(f"Usando o arquivo do cache: {filename}")
+    else:
+        if entry is not None:
+            print(f"Arquivo do cache inválido, gerando novamente: {filename}")
+        print(estimate_file_size(weather_station_names, num_rows))
+        build_test_data_parallel(
+            weather_station_names,
+            num_rows,
+            seed=seed,
+            filename=filename,
+            dataset=dataset,
+        )
+        entry = {
+            "rows": num_rows,
+            "seed": seed,
+            "dataset": dataset,
+            "stations_hash": stations_hash,
+            "size": os.path.getsize(filename),
+            "checksum": file_checksum(filename),
+        }
+        manifest[name] = entry
+
+    entry["last_used"] = time.time()
+
+    for removed in evict_datasets(
+        manifest, budget_bytes, keep=name, cache_dir=cache_dir
+    ):
+        print(f"Removido do cache: {removed}")
+
+    save_manifest(manifest, cache_dir)
+
+    total_size: int = sum(item["size"] for item in manifest.values())
+    print(f"Tamanho do cache: {convert_bytes(total_size)}")
+
+    return filename
@@ -0,0 +1,63 @@
+"""Leitura das temperaturas como inteiros em décimos de grau."""
+
+from typing import Dict
+
+# Fator entre o valor em décimos de grau e o valor em graus
+SCALE: int = 10
+
+# Limites das temperaturas geradas por `build_test_data`, em décimos de grau
+MIN_TENTHS: int = -999
+MAX_TENTHS: int = 999
+
+
+def build_tenths_table() -> Dict[bytes, int]:
+    """
+    Monta a tabela de conversão do texto da medição para décimos de grau.
+
+    Returns
+    -------
+    Dict[bytes, int]
+        Dicionário com todas as representações possíveis de uma medição com uma
+        casa decimal entre `MIN_TENTHS` e `MAX_TENTHS` (incluindo `-0.0`) e o valor
+        correspondente em décimos de grau.
+
+    Notes
+    -----
+    Como o gerador escreve as medições com `:.1f`, existem apenas 1999 valores
+    possíveis e a conversão pode ser feita com uma única consulta ao dicionário,
+    mais rápida que `float`.
+    """
+    table: Dict[bytes, int] = {
+        f"{tenths / SCALE:.1f}".encode(): tenths
+        for tenths in range(MIN_TENTHS, MAX_TENTHS + 1)
+    }
+    table[b"-0.0"] = 0
+    return table
+
+
+TENTHS_TABLE: Dict[bytes, int] = build_tenths_table()
+
+
+def parse_tenths(measure: bytes) -> int:
+    """
+    Lê o texto de uma medição como inteiro em décimos de grau.
+
+    Parameters
+    ----------
+    measure : bytes
+        Texto da medição, por exemplo `b"-12.3"`.
+
+    Returns
+    -------
+    int
+        Medição em décimos de grau, por exemplo `-123`.
+
+    Notes
+    -----
+    Medições fora do formato esperado (mais casas decimais ou fora dos limites)
+    são convertidas com `float` e arredondadas para o décimo mais próximo.
+    """
+    tenths = TENTHS_TABLE.get(measure)
+    if tenths is None:
+        tenths = round(float(measure) * SCALE)
+    return tenths
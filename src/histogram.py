@@ -0,0 +1,202 @@
+"""Histogramas exatos por estação, com um contador por décimo de grau."""
+
+from typing import Sequence
+
+import numpy as np
+
+from fixed_point import MAX_TENTHS, MIN_TENTHS, SCALE
+from quantile_sketch import QUANTILES, count_matrix
+
+# Número de temperaturas possíveis entre `MIN_TENTHS` e `MAX_TENTHS`
+NUM_TENTHS: int = MAX_TENTHS - MIN_TENTHS + 1
+
+HISTOGRAM_DTYPE = np.uint32
+
+# Temperatura, em graus, de cada posição do histograma
+TENTH_VALUES: np.ndarray = np.arange(MIN_TENTHS, MAX_TENTHS + 1) / SCALE
+
+
+def measures_to_tenths(measures: np.ndarray) -> np.ndarray:
+    """
+    Arredonda medições em graus para décimos de grau.
+
+    Parameters
+    ----------
+    measures : np.ndarray
+        Medições em graus, com uma casa decimal.
+
+    Returns
+    -------
+    np.ndarray
+        Medições em décimos de grau (int16).
+    """
+    return np.rint(np.asarray(measures, dtype=np.float64) * SCALE).astype(np.int16)
+
+
+def build_histograms(
+    station_ids: np.ndarray, tenths: np.ndarray, num_stations: int
+) -> np.ndarray:
+    """
+    Conta as medições de cada estação em cada décimo de grau.
+
+    Parameters
+    ----------
+    station_ids : np.ndarray
+        Identificador da estação de cada medição, entre 0 e `num_stations - 1`.
+    tenths : np.ndarray
+        Medições em décimos de grau.
+    num_stations : int
+        Número de estações.
+
+    Returns
+    -------
+    np.ndarray
+        Matriz `(num_stations, NUM_TENTHS)` com as contagens (`HISTOGRAM_DTYPE`).
+
+    Raises
+    ------
+    ValueError
+        Se alguma medição estiver fora de `[MIN_TENTHS, MAX_TENTHS]`, pois o
+        histograma deixaria de ser exato.
+    """
+    tenths = np.asarray(tenths)
+    if len(tenths) and (tenths.min() < MIN_TENTHS or tenths.max() > MAX_TENTHS):
+        raise ValueError(
+            f"Medição fora do intervalo [{MIN_TENTHS / SCALE}, {MAX_TENTHS / SCALE}]."
+        )
+    return count_matrix(
+        station_ids,
+        tenths.astype(np.intp) - MIN_TENTHS,
+        num_stations,
+        NUM_TENTHS,
+        HISTOGRAM_DTYPE,
+    )
+
+
+def histogram_quantiles(
+    histograms: np.ndarray, quantiles: Sequence[float] = QUANTILES
+) -> np.ndarray:
+    """
+    Calcula os quantis exatos de cada estação a partir dos histogramas.
+
+    Parameters
+    ----------
+    histograms : np.ndarray
+        Matriz `(estações, NUM_TENTHS)` de contagens.
+    quantiles : Sequence[float], optional
+        Quantis calculados, entre 0 e 1. O padrão é `quantile_sketch.QUANTILES`.
+
+    Returns
+    -------
+    np.ndarray
+        Matriz `(estações, len(quantiles))` com os quantis em graus, com
+        interpolação linear entre as medições vizinhas (como
+        `pl.col(...).quantile(q, interpolation="linear")` e `median()`).
+        Estações sem medições resultam em `nan`.
+
+    Notes
+    -----
+    A posição de cada quantil é encontrada na soma acumulada do histograma,
+    sem ordenar as medições.
+    """
+    cumulative = np.cumsum(histograms, axis=1, dtype=np.int64)
+    totals = cumulative[:, -1]
+    result = np.full((len(histograms), len(quantiles)), np.nan)
+
+    present = totals > 0
+    present_cumulative = cumulative[present]
+    for column, quantile in enumerate(quantiles):
+        positions = quantile * (totals[present] - 1)
+        lower = np.floor(positions)
+        fraction = positions - lower
+        lower_values = TENTH_VALUES[
+            np.argmax(present_cumulative > lower[:, None], axis=1)
+        ]
+        upper_values = TENTH_VALUES[
+            np.argmax(present_cumulative > np.ceil(positions)[:, None], axis=1)
+        ]
+        result[present, column] = lower_values + fraction * (
+            upper_values - lower_values
+        )
+    return result
+
+
+def histogram_mode(histograms: np.ndarray) -> np.ndarray:
+    """
+    Retorna a medição mais frequente de cada estação.
+
+    Parameters
+    ----------
+    histograms : np.ndarray
+        Matriz `(estações, NUM_TENTHS)` de contagens.
+
+    Returns
+    -------
+    np.ndarray
+        Moda de cada estação, em graus. Em caso de empate, a menor temperatura.
+        Estações sem medições resultam em `nan`.
+    """
+    modes = TENTH_VALUES[np.argmax(histograms, axis=1)]
+    return np.where(histograms.any(axis=1), modes, np.nan)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from pathlib import Path
+
+    import polars as pl
+
+    from quantile_sketch import quantile_column_names
+    from solution_pandas import create_df_with_pandas_pipeline
+
+    # Compara os quantis e a moda dos histogramas com as expressões do Polars
+    filename = Path(sys.argv[1])
+    rows: int = int(sys.argv[2])
+    chunksize: int = int(sys.argv[3]) if len(sys.argv) > 3 else rows
+
+    start_time: float = time.perf_counter()
+    result = create_df_with_pandas_pipeline(filename, rows, chunksize, histogram=True)
+    histogram_took: float = time.perf_counter() - start_time
+
+    names = quantile_column_names(QUANTILES)
+    start_time = time.perf_counter()
+    exact = (
+        pl.scan_csv(
+            filename,
+            separator=";",
+            has_header=False,
+            new_columns=["station", "measure"],
+            schema={"station": pl.String, "measure": pl.Float64},
+        )
+        .group_by("station")
+        .agg(
+            [
+                pl.col("measure").quantile(quantile, "linear").alias(name)
+                for quantile, name in names.items()
+            ]
+            + [
+                pl.col("measure").median().alias("median"),
+                # Em caso de empate, a menor temperatura, como `histogram_mode`
+                pl.col("measure").mode().min().alias("mode"),
+            ]
+        )
+        .sort("station")
+        .collect()
+    )
+    polars_took: float = time.perf_counter() - start_time
+
+    for name in list(names.values()) + ["mode"]:
+        difference = np.abs(result[name].to_numpy() - exact[name].to_numpy())
+        print(f"{name}: diferença máxima para o Polars {difference.max():.2e}")
+    difference = np.abs(result["p50"].to_numpy() - exact["median"].to_numpy())
+    print(f"p50 x median(): diferença máxima {difference.max():.2e}")
+
+    print(
+        f"Memória do histograma: {NUM_TENTHS * np.dtype(HISTOGRAM_DTYPE).itemsize:,} "
+        f"bytes por estação ({NUM_TENTHS} contadores)."
+    )
+    print(
+        f"Tempo com histogramas: {histogram_took:.3f}s; "
+        f"quantis com o Polars: {polars_took:.3f}s."
+    )
@@ -0,0 +1,488 @@
+"""Agregação incremental de um arquivo de medições que só cresce."""
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import time
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from aggregate import StationAggregate
+from binary_format import is_binary_file
+from fixed_point import SCALE
+from phase_timer import phase, worker_function, worker_result
+from registry import register_engine
+from settings import BASE_DIR, FILENAME_OUTPUT
+from solution_mmap import find_chunk_boundaries, merge_results, process_byte_range
+
+CONCURRENCY: int = cpu_count()
+
+STATE_DIR: Path = BASE_DIR / "../data/incremental"
+STATE_VERSION: int = 1
+
+# Bytes do início e do fim do trecho já processado usados na impressão digital
+FINGERPRINT_BLOCK_SIZE: int = 1024 * 1024
+
+# Fração final do arquivo acrescentada em `benchmark_append`
+APPEND_FRACTION: float = 0.01
+REPETITIONS: int = 3
+
+
+class IncrementalState(NamedTuple):
+    """
+    Estado salvo entre duas execuções incrementais.
+
+    Attributes
+    ----------
+    offset : int
+        Deslocamento, em bytes, até onde o arquivo já foi agregado. Fica sempre
+        logo após uma quebra de linha.
+    fingerprint : str
+        Impressão digital dos primeiros `offset` bytes do arquivo.
+    aggregate : StationAggregate
+        Agregado das medições até `offset`, em décimos de grau.
+    """
+
+    offset: int
+    fingerprint: str
+    aggregate: StationAggregate
+
+
+def default_state_file(filename: Path) -> Path:
+    """
+    Retorna o arquivo de estado padrão de um arquivo de medições.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo de medições.
+
+    Return
+    -------
+    Path
+        Arquivo em `STATE_DIR`, identificado pelo nome e pelo caminho absoluto do
+        arquivo de medições.
+    """
+    path_hash: str = hashlib.sha256(
+        str(Path(filename).resolve()).encode("utf-8")
+    ).hexdigest()[:12]
+    return STATE_DIR / f"{Path(filename).stem}-{path_hash}.json"
+
+
+def prefix_fingerprint(filename: Path, offset: int) -> str:
+    """
+    Calcula a impressão digital dos primeiros `offset` bytes do arquivo.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo de medições.
+    offset : int
+        Tamanho do trecho considerado.
+
+    Return
+    -------
+    str
+        Hash SHA-256 do tamanho do trecho, do seu primeiro bloco e do seu último
+        bloco de `FINGERPRINT_BLOCK_SIZE` bytes.
+
+    Notes
+    -----
+    O custo não depende do tamanho do arquivo. Uma reescrita no meio do trecho
+    que preserve o início, o fim e o tamanho não é detectada; para o caso de uso
+    (arquivo que só recebe linhas no final), isso basta para identificar
+    arquivos truncados, substituídos ou recriados.
+    """
+    digest = hashlib.sha256(str(offset).encode("ascii"))
+    with open(filename, "rb") as file:
+        digest.update(file.read(min(offset, FINGERPRINT_BLOCK_SIZE)))
+        tail_start: int = max(offset - FINGERPRINT_BLOCK_SIZE, 0)
+        file.seek(tail_start)
+        digest.update(file.read(offset - tail_start))
+    return digest.hexdigest()
+
+
+def complete_lines_end(filename: Path) -> int:
+    """
+    Retorna o deslocamento logo após a última linha completa do arquivo.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo de medições.
+
+    Return
+    -------
+    int
+        Posição logo após a última quebra de linha, ou 0 se não houver nenhuma.
+        Uma linha ainda sendo escrita no final do arquivo fica para a próxima
+        execução.
+    """
+    if os.path.getsize(filename) == 0:
+        return 0
+    with open(filename, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm.rfind(b"\n") + 1
+
+
+def load_state(state_file: Path) -> Optional[IncrementalState]:
+    """
+    Lê o estado salvo.
+
+    Parameters
+    ----------
+    state_file : Path
+        Arquivo de estado.
+
+    Return
+    -------
+    IncrementalState, optional
+        O estado salvo, ou `None` se o arquivo não existir, estiver corrompido
+        ou for de outra versão.
+    """
+    try:
+        with open(state_file, "r", encoding="utf-8") as file:
+            data: Dict[str, Any] = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if data.get("version") != STATE_VERSION:
+        return None
+
+    aggregate = StationAggregate.from_columns(
+        data["stations"],
+        np.asarray(data["min"], dtype=np.int16),
+        np.asarray(data["max"], dtype=np.int16),
+        np.asarray(data["sum"], dtype=np.int64),
+        data["count"],
+        scale=data["scale"],
+    )
+    return IncrementalState(data["offset"], data["fingerprint"], aggregate)
+
+
+def save_state(state: IncrementalState, state_file: Path) -> None:
+    """
+    Grava o estado de forma atômica.
+
+    Parameters
+    ----------
+    state : IncrementalState
+        Estado a ser gravado.
+    state_file : Path
+        Arquivo de estado.
+    """
+    aggregate: StationAggregate = state.aggregate
+    data: Dict[str, Any] = {
+        "version": STATE_VERSION,
+        "offset": state.offset,
+        "fingerprint": state.fingerprint,
+        "scale": aggregate.scale,
+        "stations": aggregate.stations.tolist(),
+        "min": aggregate.min_values.tolist(),
+        "max": aggregate.max_values.tolist(),
+        "sum": aggregate.sums.tolist(),
+        "count": aggregate.counts.tolist(),
+    }
+
+    os.makedirs(state_file.parent, exist_ok=True)
+    temporary_file: Path = state_file.with_suffix(".tmp")
+    with open(temporary_file, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+    os.replace(temporary_file, state_file)
+
+
+def aggregate_byte_range(
+    filename: Path, start: int, end: int, concurrency: int = CONCURRENCY
+) -> StationAggregate:
+    """
+    Agrega as medições de um intervalo de bytes em décimos de grau.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo de medições.
+    start : int
+        Deslocamento inicial, no início de uma linha.
+    end : int
+        Deslocamento final, logo após uma quebra de linha ou no fim do arquivo.
+    concurrency : int, optional
+        Número de processos usados. O padrão é o número de CPUs disponíveis.
+
+    Return
+    -------
+    StationAggregate
+        Agregado do intervalo, com `scale=SCALE`.
+    """
+    boundaries = find_chunk_boundaries(filename, concurrency, start, end)
+    tasks = [
+        (filename, chunk_start, chunk_end, True)
+        for chunk_start, chunk_end in boundaries
+    ]
+    with Pool(concurrency) as pool, phase("wait"):
+        partials = [
+            worker_result(result)
+            for result in pool.map(worker_function(process_byte_range), tasks)
+        ]
+    with phase("merge"):
+        merged = merge_results(partials)
+
+    return StationAggregate.from_mapping(
+        {station.decode("utf-8"): stats for station, stats in merged.items()},
+        scale=SCALE,
+    )
+
+
+def update_incremental(
+    filename: Path,
+    state_file: Optional[Path] = None,
+    concurrency: int = CONCURRENCY,
+    through_eof: bool = False,
+) -> StationAggregate:
+    """
+    Agrega somente as linhas adicionadas desde a última execução.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo de medições em texto.
+    state_file : Path, optional
+        Arquivo de estado. O padrão é `default_state_file(filename)`.
+    concurrency : int, optional
+        Número de processos usados. O padrão é o número de CPUs disponíveis.
+    through_eof : bool, optional
+        Se verdadeiro, o fim do arquivo também encerra a última linha, mesmo sem
+        quebra de linha, como nas demais soluções. O padrão é falso: uma linha
+        final sem quebra pode ainda estar sendo escrita e fica para a próxima
+        atualização.
+
+    Return
+    -------
+    StationAggregate
+        Agregado de todas as linhas completas do arquivo (ou de todas as linhas,
+        com `through_eof`), em décimos de grau.
+
+    Raises
+    ------
+    ValueError
+        Se o arquivo estiver no formato binário colunar, cujo cabeçalho impede
+        acrescentar linhas.
+
+    Notes
+    -----
+    - O estado guarda o agregado, o deslocamento alcançado e a impressão digital
+      do trecho já processado. Se o arquivo foi truncado ou substituído, a
+      impressão digital não confere e o arquivo é processado desde o início.
+    - As somas são inteiras (décimos de grau), portanto o resultado incremental é
+      idêntico ao de uma execução completa.
+    - O custo de cada atualização depende apenas do tamanho do trecho novo.
+    """
+    if is_binary_file(filename):
+        raise ValueError("O modo incremental aceita apenas arquivos de texto.")
+
+    state_file = default_state_file(filename) if state_file is None else state_file
+    state: Optional[IncrementalState] = load_state(state_file)
+    end: int = (
+        os.path.getsize(filename) if through_eof else complete_lines_end(filename)
+    )
+
+    if (
+        state is not None
+        and state.offset <= end
+        and prefix_fingerprint(filename, state.offset) == state.fingerprint
+    ):
+        start, aggregate = state.offset, state.aggregate
+    else:
+        if state is not None:
+            print("O arquivo mudou desde a última execução; processando do início.")
+        start, aggregate = 0, StationAggregate.empty()
+
+    print(f"Processando {end - start:,} bytes novos a partir do byte {start:,}.")
+    if end > start:
+        new_lines: StationAggregate = aggregate_byte_range(
+            filename, start, end, concurrency
+        )
+        with phase("merge"):
+            aggregate = aggregate.merge(new_lines)
+
+    save_state(
+        IncrementalState(end, prefix_fingerprint(filename, end), aggregate), state_file
+    )
+    return aggregate
+
+
+def create_df_with_incremental(
+    filename: Path,
+    state_file: Optional[Path] = None,
+    concurrency: int = CONCURRENCY,
+    through_eof: bool = False,
+) -> Dict[str, Tuple[float, float, float]]:
+    """
+    Executa `update_incremental` e retorna o resultado no formato da solução `mmap`.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo de medições em texto.
+    state_file : Path, optional
+        Arquivo de estado. O padrão é `default_state_file(filename)`.
+    concurrency : int, optional
+        Número de processos usados. O padrão é o número de CPUs disponíveis.
+    through_eof : bool, optional
+        Se verdadeiro, processa também uma linha final sem quebra de linha. O
+        padrão é falso.
+
+    Returns
+    -------
+    Dict[str, Tuple[float, float, float]]
+        Dicionário ordenado pelo nome da estação com a tupla
+        `(mínimo, máximo, média)` de cada estação.
+    """
+    aggregate: StationAggregate = update_incremental(
+        filename, state_file, concurrency, through_eof
+    )
+    with phase("output"):
+        columns = aggregate.to_columns()
+        final_results: Dict[str, Tuple[float, float, float]] = {
+            station: (float(min_value), float(max_value), float(mean_value))
+            for station, min_value, max_value, mean_value in zip(
+                columns["station"], columns["min"], columns["max"], columns["mean"]
+            )
+        }
+
+    return final_results
+
+
+@register_engine(
+    "mmap_incremental", streaming=True, parallel=True, tunable=("concurrency",)
+)
+def run_incremental(
+    filename: Path, rows: int, config: Dict[str, Any]
+) -> Dict[str, Tuple[float, float, float]]:
+    """
+    Executa `create_df_with_incremental` com a assinatura do registro.
+
+    Notes
+    -----
+    Sem `state_file` em `config`, cada execução usa um estado temporário novo,
+    portanto a medição é a de um processamento completo, e não a de uma
+    atualização sem linhas novas a partir do estado da execução anterior. O
+    custo de acrescentar linhas é medido por `benchmark_append`. Como esse
+    estado é descartado, o arquivo é processado até o fim, inclusive uma linha
+    final sem quebra de linha, e o resultado é igual ao das demais soluções.
+    """
+    concurrency: int = config.get("concurrency", CONCURRENCY)
+    state_file: Optional[str] = config.get("state_file")
+    if state_file:
+        return create_df_with_incremental(filename, Path(state_file), concurrency)
+
+    with tempfile.TemporaryDirectory() as directory:
+        return create_df_with_incremental(
+            filename, Path(directory) / "state.json", concurrency, through_eof=True
+        )
+
+
+def benchmark_append(
+    filename: Path,
+    tail_fraction: float = APPEND_FRACTION,
+    repetitions: int = REPETITIONS,
+    concurrency: int = CONCURRENCY,
+) -> Dict[str, float]:
+    """
+    Mede a atualização incremental depois de acrescentar linhas ao arquivo.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo de medições em texto. Não é alterado.
+    tail_fraction : float, optional
+        Fração final do arquivo, alinhada com o fim de uma linha, tratada como
+        linhas acrescentadas. O padrão é `APPEND_FRACTION`.
+    repetitions : int, optional
+        Execuções de cada medição; o melhor tempo é mantido. O padrão é
+        `REPETITIONS`.
+    concurrency : int, optional
+        Número de processos usados. O padrão é o número de CPUs disponíveis.
+
+    Returns
+    -------
+    Dict[str, float]
+        `tail_bytes` (bytes acrescentados), `append_s` (atualização a partir do
+        estado salvo antes do acréscimo) e `full_s` (processamento completo, sem
+        estado), em segundos.
+
+    Notes
+    -----
+    Uma cópia do arquivo sem o trecho final é processada para gravar o estado
+    e o trecho é então acrescentado à cópia. Antes de cada medição de
+    `append_s`, o estado salvo é restaurado, portanto todas medem a leitura do
+    mesmo trecho novo, e não uma atualização sem linhas novas.
+    """
+    size: int = os.path.getsize(filename)
+    with open(filename, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            split: int = mm.find(b"\n", int(size * (1 - tail_fraction))) + 1 or size
+
+    with tempfile.TemporaryDirectory() as directory:
+        copy: Path = Path(directory) / Path(filename).name
+        state_file: Path = Path(directory) / "state.json"
+        checkpoint: Path = Path(directory) / "checkpoint.json"
+
+        with open(filename, "rb") as source, open(copy, "wb") as target:
+            target.write(source.read(split))
+        update_incremental(copy, state_file, concurrency)
+        shutil.copyfile(state_file, checkpoint)
+        with open(filename, "rb") as source, open(copy, "ab") as target:
+            source.seek(split)
+            shutil.copyfileobj(source, target)
+
+        append_times: List[float] = []
+        for _ in range(repetitions):
+            shutil.copyfile(checkpoint, state_file)
+            start_time: float = time.perf_counter()
+            update_incremental(copy, state_file, concurrency)
+            append_times.append(time.perf_counter() - start_time)
+
+        full_times: List[float] = []
+        for _ in range(repetitions):
+            state_file.unlink()
+            start_time = time.perf_counter()
+            update_incremental(copy, state_file, concurrency)
+            full_times.append(time.perf_counter() - start_time)
+
+    return {
+        "tail_bytes": size - split,
+        "append_s": min(append_times),
+        "full_s": min(full_times),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    from verification import preview_result
+
+    # Uso: python src/incremental.py [--benchmark [arquivo]]
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        timings = benchmark_append(
+            Path(sys.argv[2]) if len(sys.argv) > 2 else FILENAME_OUTPUT
+        )
+        print(
+            f"Acréscimo de {timings['tail_bytes']:,.0f} bytes: "
+            f"{timings['append_s']:.3f}s com o estado salvo, "
+            f"{timings['full_s']:.3f}s processando o arquivo inteiro "
+            f"({timings['full_s'] / timings['append_s']:.1f}x)."
+        )
+        sys.exit()
+
+    print("Iniciando o processamento incremental do arquivo.")
+    start_time: float = time.time()
+    results = create_df_with_incremental(FILENAME_OUTPUT)
+    took: float = time.time() - start_time
+
+    print(preview_result(results))
+    print(f"Atualização incremental demorou: {took:.2f} sec")
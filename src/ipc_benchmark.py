@@ -0,0 +1,197 @@
+"""Bytes serializados entre processos e tempo de cada transporte das soluções Pandas."""
+
+import pickle
+import time
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from autotune import concurrency_candidates
+from create_measurements import convert_bytes
+from shared_results import BYTES_PER_STATION, SharedResults
+from solution_mmap import find_chunk_boundaries
+from solution_pandas import (
+    CHUNKSIZE,
+    create_df_with_pandas,
+    create_df_with_pandas_pipeline,
+    create_df_with_pandas_shared,
+    process_byte_range,
+    process_byte_range_shared,
+    process_chunk,
+)
+from station_dictionary import DICTIONARY_FILE, load_station_dictionary
+
+# Soluções comparadas: chunks lidos pelo processo principal, intervalos lidos
+# pelos workers com o agregado serializado e intervalos com memória compartilhada
+TRANSPORTS: Dict[str, Callable[..., pd.DataFrame]] = {
+    "pandas": create_df_with_pandas,
+    "pandas_pipeline": create_df_with_pandas_pipeline,
+    "pandas_shared": create_df_with_pandas_shared,
+}
+
+REPETITIONS: int = 3
+
+
+def pickled_size(value: Any) -> int:
+    """Calcula o tamanho de um valor serializado como em `multiprocessing`."""
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def transport_bytes(
+    filename: Path,
+    rows: int,
+    chunksize: int = CHUNKSIZE,
+    dictionary_file: Path = DICTIONARY_FILE,
+) -> Dict[str, int]:
+    """
+    Calcula os bytes serializados entre os processos em cada transporte.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo de medições, em texto.
+    rows : int
+        Número de linhas do arquivo.
+    chunksize : int, optional
+        Número de linhas de cada tarefa. O padrão é `CHUNKSIZE`.
+    dictionary_file : Path, optional
+        Arquivo do dicionário de estações. O padrão é
+        `station_dictionary.DICTIONARY_FILE`.
+
+    Returns
+    -------
+    Dict[str, int]
+        Soma, em todas as tarefas, do tamanho serializado da função com os
+        argumentos enviados ao pool e do resultado devolvido, por transporte.
+
+    Notes
+    -----
+    As tarefas são executadas no processo atual, uma de cada vez, para que
+    cada mensagem seja medida exatamente como o pool a serializaria.
+    """
+    sizes: Dict[str, int] = dict.fromkeys(TRANSPORTS, 0)
+
+    function: Callable[..., Any] = partial(process_chunk, sketch=False, histogram=False)
+    with pd.read_csv(
+        filename,
+        sep=";",
+        header=None,
+        names=["station", "measure"],
+        chunksize=chunksize,
+    ) as reader:
+        for chunk in reader:
+            sizes["pandas"] += pickled_size((function, chunk))
+            sizes["pandas"] += pickled_size(function(chunk))
+
+    ranges: List[Tuple[int, int]] = find_chunk_boundaries(
+        filename, max(-(-rows // chunksize), 1)
+    )
+    function = partial(process_byte_range, sketch=False, histogram=False)
+    for start, end in ranges:
+        args = (filename, start, end)
+        sizes["pandas_pipeline"] += pickled_size((function, args))
+        sizes["pandas_pipeline"] += pickled_size(function(args))
+
+    dictionary = load_station_dictionary(dictionary_file)
+    function = partial(process_byte_range_shared, dictionary_file=dictionary_file)
+    with SharedResults(len(dictionary.stations), 1) as shared:
+        for start, end in ranges:
+            args = (filename, start, end, 0, shared.names[0])
+            result = function(args)
+            sizes["pandas_shared"] += pickled_size((function, args))
+            sizes["pandas_shared"] += pickled_size(result)
+            shared.reduce(0)
+
+    return sizes
+
+
+def time_transports(
+    filename: Path,
+    rows: int,
+    chunksize: int = CHUNKSIZE,
+    concurrency_values: Optional[List[int]] = None,
+    repetitions: int = REPETITIONS,
+) -> Dict[int, Dict[str, float]]:
+    """
+    Mede o tempo de cada transporte com diferentes números de processos.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo de medições.
+    rows : int
+        Número de linhas do arquivo.
+    chunksize : int, optional
+        Número de linhas de cada tarefa. O padrão é `CHUNKSIZE`.
+    concurrency_values : List[int], optional
+        Números de processos testados. O padrão é
+        `autotune.concurrency_candidates()`.
+    repetitions : int, optional
+        Execuções de cada ponto; o melhor tempo é mantido. O padrão é
+        `REPETITIONS`.
+
+    Returns
+    -------
+    Dict[int, Dict[str, float]]
+        Melhor tempo, em segundos, de cada transporte para cada número de
+        processos.
+    """
+    timings: Dict[int, Dict[str, float]] = {}
+    for concurrency in concurrency_values or concurrency_candidates():
+        timings[concurrency] = {}
+        for name, function in TRANSPORTS.items():
+            best: float = float("inf")
+            for _ in range(repetitions):
+                start_time: float = time.perf_counter()
+                function(filename, rows, chunksize, concurrency)
+                best = min(best, time.perf_counter() - start_time)
+            timings[concurrency][name] = best
+    return timings
+
+
+def format_report(
+    sizes: Dict[str, int], timings: Dict[int, Dict[str, float]], num_stations: int
+) -> str:
+    """Formata os bytes serializados e a tabela de tempos."""
+    lines: List[str] = [
+        "Bytes serializados entre os processos: "
+        + ", ".join(f"{name} {convert_bytes(size)}" for name, size in sizes.items()),
+        f"pandas_shared economiza {1 - sizes['pandas_shared'] / sizes['pandas']:.1%} "
+        f"em relação a pandas e "
+        f"{1 - sizes['pandas_shared'] / sizes['pandas_pipeline']:.1%} em relação a "
+        f"pandas_pipeline; cada tarefa grava "
+        f"{convert_bytes(num_stations * BYTES_PER_STATION)} na memória "
+        "compartilhada.",
+        f"{'processos':>9} "
+        + " ".join(f"{name:>16}" for name in TRANSPORTS)
+        + f" {'ganho x pandas':>15} {'ganho x pipeline':>17}",
+    ]
+    for concurrency, times in timings.items():
+        lines.append(
+            f"{concurrency:>9} "
+            + " ".join(f"{times[name]:>15.3f}s" for name in TRANSPORTS)
+            + f" {times['pandas'] / times['pandas_shared']:>14.2f}x"
+            + f" {times['pandas_pipeline'] / times['pandas_shared']:>16.2f}x"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Uso: python src/ipc_benchmark.py arquivo linhas [chunksize]
+    filename = Path(sys.argv[1])
+    rows: int = int(sys.argv[2].replace("_", ""))
+    chunksize: int = (
+        int(sys.argv[3].replace("_", "")) if len(sys.argv) > 3 else max(rows // 10, 1)
+    )
+
+    sizes = transport_bytes(filename, rows, chunksize)
+    timings = time_transports(filename, rows, chunksize)
+    print(
+        format_report(
+            sizes, timings, len(load_station_dictionary(DICTIONARY_FILE).stations)
+        )
+    )
@@ -0,0 +1,343 @@
+"""Cronômetros por fase e perfis opcionais das soluções."""
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    TypeVar,
+)
+
+from settings import BASE_DIR
+
+# Fases registradas pelas soluções. `dispatch` é a serialização e o envio das
+# tarefas para um pool e `wait` a espera pelos resultados dos workers
+PHASES = ("read", "parse", "aggregate", "merge", "output", "dispatch", "wait")
+
+# Prefixo das fases medidas dentro dos workers. Os tempos dos workers são
+# somados, portanto podem passar do tempo total com vários processos
+WORKER_PREFIX: str = "worker_"
+
+PROFILERS = ("cprofile", "sampling")
+PROFILE_DIR: Path = BASE_DIR / "../data/profiles"
+
+# Intervalo entre as amostras do perfil por amostragem, em segundos
+SAMPLE_INTERVAL: float = 0.005
+
+
+class _Recorders(threading.local):
+    """Registros ativos em cada thread; as fases são somadas no mais recente."""
+
+    def __init__(self) -> None:
+        self.stack: List[Dict[str, float]] = []
+
+
+# Cada thread tem os seus registros, portanto as threads de um pool usam
+# `worker_function` e `worker_result` como os processos
+_recorders = _Recorders()
+
+T = TypeVar("T")
+
+
+def is_recording() -> bool:
+    """Indica se há um registro de fases ativo nesta thread."""
+    return bool(_recorders.stack)
+
+
+def add_phases(phases: Mapping[str, float], prefix: str = "") -> None:
+    """
+    Soma tempos de fases ao registro ativo.
+
+    Parameters
+    ----------
+    phases : Mapping[str, float]
+        Tempo de cada fase, em segundos.
+    prefix : str, optional
+        Prefixo acrescentado ao nome das fases. O padrão é nenhum.
+    """
+    if _recorders.stack:
+        recorder = _recorders.stack[-1]
+        for name, seconds in phases.items():
+            recorder[prefix + name] = recorder.get(prefix + name, 0.0) + seconds
+
+
+@contextmanager
+def record_phases() -> Iterator[Dict[str, float]]:
+    """
+    Ativa um registro de fases durante o bloco.
+
+    Yields
+    ------
+    Dict[str, float]
+        Tempo acumulado de cada fase, em segundos, preenchido durante o bloco.
+
+    Examples
+    --------
+    >>> with record_phases() as phases:
+    ...     create_df_with_mmap(filename)
+    >>> phases["merge"]
+    """
+    recorder: Dict[str, float] = {}
+    _recorders.stack.append(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorders.stack.pop()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Mede o bloco como parte da fase `name`.
+
+    Parameters
+    ----------
+    name : str
+        Nome da fase, normalmente um dos `PHASES`.
+
+    Notes
+    -----
+    - Sem registro ativo, o bloco é executado sem medição, com o custo de uma
+      verificação.
+    - As fases não devem ser aninhadas: o tempo de uma fase interna também seria
+      contado na externa.
+    """
+    if not _recorders.stack:
+        yield
+        return
+    start_time: float = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phases({name: time.perf_counter() - start_time})
+
+
+def timed(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Retorna um decorador que mede cada chamada da função na fase `name`."""
+
+    def decorator(function: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with phase(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_iter(iterable: Iterable[T], name: str) -> Iterator[T]:
+    """
+    Percorre o iterável medindo a obtenção de cada item na fase `name`.
+
+    Parameters
+    ----------
+    iterable : Iterable[T]
+        Iterável, por exemplo o leitor em chunks de `pd.read_csv`.
+    name : str
+        Nome da fase.
+
+    Yields
+    ------
+    T
+        Os itens do iterável. O processamento de cada item pelo chamador não é
+        contado na fase.
+    """
+    iterator = iter(iterable)
+    while True:
+        with phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class WorkerResult(NamedTuple):
+    """Resultado de uma tarefa executada em um worker, com as fases medidas nele."""
+
+    result: Any
+    phases: Dict[str, float]
+
+
+class WorkerPhases:
+    """
+    Executa uma função em um worker registrando as suas fases.
+
+    O objeto é serializável, portanto pode ser enviado a um `Pool` no lugar da
+    função, e retorna um `WorkerResult`.
+    """
+
+    def __init__(self, function: Callable[..., Any]) -> None:
+        """Guarda a função executada nos workers."""
+        self.function = function
+
+    def __call__(self, *args: Any) -> WorkerResult:
+        """Executa a função com um registro de fases ativo."""
+        with record_phases() as phases:
+            result = self.function(*args)
+        return WorkerResult(result, phases)
+
+
+def worker_function(function: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Prepara uma função para ser executada por um pool de processos ou threads.
+
+    Parameters
+    ----------
+    function : Callable[..., Any]
+        Função executada nos workers.
+
+    Returns
+    -------
+    Callable[..., Any]
+        `WorkerPhases(function)` se houver um registro ativo, ou a própria
+        função, sem custo extra, quando as fases não são medidas. Os resultados
+        devem passar por `worker_result`.
+    """
+    return WorkerPhases(function) if _recorders.stack else function
+
+
+def worker_result(value: Any) -> Any:
+    """
+    Soma as fases de um resultado de `WorkerPhases` e retorna o resultado.
+
+    Parameters
+    ----------
+    value : Any
+        Valor retornado pelo pool.
+
+    Returns
+    -------
+    Any
+        O resultado da função. As fases medidas no worker são somadas ao
+        registro ativo com o prefixo `WORKER_PREFIX`.
+    """
+    if isinstance(value, WorkerResult):
+        add_phases(value.phases, WORKER_PREFIX)
+        return value.result
+    return value
+
+
+class SamplingProfiler:
+    """
+    Perfil por amostragem da thread principal, sem dependências externas.
+
+    Uma thread lê a pilha da thread principal a cada `SAMPLE_INTERVAL` segundos
+    com `sys._current_frames` e conta as pilhas iguais. O resultado é gravado no
+    formato "folded" (uma pilha por linha, com as funções separadas por `;` e o
+    número de amostras), aceito por ferramentas de flame graph.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL) -> None:
+        """Configura o intervalo entre as amostras, em segundos."""
+        self.interval: float = interval
+        self.stacks: Counter = Counter()
+        self._target: int = threading.main_thread().ident or 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self._target)
+        stack: List[str] = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+            frame = frame.f_back
+        if stack:
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "SamplingProfiler":
+        """Inicia a amostragem."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Encerra a amostragem."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write_folded(self, filename: Path) -> None:
+        """Grava as pilhas amostradas no formato "folded"."""
+        with open(filename, "w", encoding="utf-8") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+    def top_functions(self, limit: int = 10) -> str:
+        """Lista as funções em que a thread principal estava nas amostras."""
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total: int = sum(leaves.values()) or 1
+        return "\n".join(
+            f"{count / total:6.1%}  {function}"
+            for function, count in leaves.most_common(limit)
+        )
+
+
+@contextmanager
+def profile_run(profiler: str, filename: Path) -> Iterator[None]:
+    """
+    Captura o perfil do bloco e grava em `filename`.
+
+    Parameters
+    ----------
+    profiler : str
+        `"cprofile"` (perfil determinístico, arquivo do `pstats`) ou
+        `"sampling"` (`SamplingProfiler`, arquivo "folded").
+    filename : Path
+        Arquivo de saída.
+
+    Raises
+    ------
+    ValueError
+        Se `profiler` não for um dos `PROFILERS`.
+
+    Notes
+    -----
+    Os dois perfis observam somente o processo atual; o trabalho dos workers de
+    um pool aparece como espera. As 10 funções mais caras são impressas ao final.
+    """
+    if profiler not in PROFILERS:
+        raise ValueError(f"profiler deve ser um de {PROFILERS}.")
+    filename.parent.mkdir(parents=True, exist_ok=True)
+
+    if profiler == "cprofile":
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(filename)
+            output = io.StringIO()
+            pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(
+                10
+            )
+            print(output.getvalue())
+    else:
+        with SamplingProfiler() as sampler:
+            yield
+        sampler.write_folded(filename)
+        print(sampler.top_functions())
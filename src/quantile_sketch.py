@@ -0,0 +1,270 @@
+"""Sketch de quantis (DDSketch) por estação, com memória limitada."""
+
+import math
+from typing import Dict, Sequence
+
+import numpy as np
+
+from fixed_point import MAX_TENTHS, MIN_TENTHS, SCALE
+
+# Erro relativo máximo dos quantis estimados
+RELATIVE_ACCURACY: float = 0.01
+GAMMA: float = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA: float = math.log(GAMMA)
+
+# Valores absolutos menores que `MIN_INDEXABLE` caem no bucket do zero, e valores
+# maiores que `MAX_INDEXABLE` no bucket extremo. Com medições de uma casa decimal
+# até 99,9 graus, somente o zero cai fora da faixa indexada
+MIN_INDEXABLE: float = 0.05
+MAX_INDEXABLE: float = 100.0
+
+KEY_MIN: int = math.ceil(math.log(MIN_INDEXABLE) / LOG_GAMMA)
+KEY_MAX: int = math.ceil(math.log(MAX_INDEXABLE) / LOG_GAMMA)
+NUM_KEYS: int = KEY_MAX - KEY_MIN + 1
+
+# Buckets em ordem crescente de valor: negativos, zero e positivos
+ZERO_BUCKET: int = NUM_KEYS
+NUM_BUCKETS: int = 2 * NUM_KEYS + 1
+
+# uint32 comporta até ~4,3 bilhões de medições por bucket de uma estação
+SKETCH_DTYPE = np.uint32
+
+QUANTILES: Sequence[float] = (0.5, 0.95, 0.99)
+
+
+def bucket_index(values: np.ndarray) -> np.ndarray:
+    """
+    Calcula o bucket de cada valor.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Medições em graus.
+
+    Returns
+    -------
+    np.ndarray
+        Índice do bucket de cada medição, entre 0 e `NUM_BUCKETS - 1`. Valores
+        maiores em módulo ficam mais longe de `ZERO_BUCKET`.
+
+    Notes
+    -----
+    O bucket de chave `k` contém os valores em `(GAMMA**(k-1), GAMMA**k]`, como
+    no DDSketch. Como as chaves ficam entre `KEY_MIN` e `KEY_MAX`, cada estação
+    usa sempre `NUM_BUCKETS` contadores, qualquer que seja o número de medições.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    magnitude = np.abs(values)
+    indexable = magnitude >= MIN_INDEXABLE
+
+    keys = np.zeros(len(values), dtype=np.int64)
+    keys[indexable] = np.ceil(np.log(magnitude[indexable]) / LOG_GAMMA)
+    offsets = np.clip(keys, KEY_MIN, KEY_MAX) - KEY_MIN + 1
+
+    buckets = np.full(len(values), ZERO_BUCKET, dtype=np.intp)
+    buckets[indexable] = ZERO_BUCKET + np.where(
+        values[indexable] > 0, offsets[indexable], -offsets[indexable]
+    )
+    return buckets
+
+
+def bucket_values() -> np.ndarray:
+    """
+    Calcula o valor representativo de cada bucket.
+
+    Returns
+    -------
+    np.ndarray
+        Array com `NUM_BUCKETS` valores em graus. O valor do bucket de chave `k`
+        é `2 * GAMMA**k / (GAMMA + 1)`, cujo erro relativo para qualquer valor do
+        bucket é no máximo `RELATIVE_ACCURACY`.
+    """
+    keys = np.arange(KEY_MIN, KEY_MAX + 1)
+    positive = 2 * GAMMA**keys / (GAMMA + 1)
+    return np.concatenate([-positive[::-1], [0.0], positive])
+
+
+BUCKET_VALUES: np.ndarray = bucket_values()
+
+# Bucket de cada temperatura em décimos de grau entre `MIN_TENTHS` e `MAX_TENTHS`
+TENTHS_BUCKETS: np.ndarray = bucket_index(np.arange(MIN_TENTHS, MAX_TENTHS + 1) / SCALE)
+
+
+def bucket_index_tenths(tenths: np.ndarray) -> np.ndarray:
+    """
+    Calcula o bucket de medições em décimos de grau.
+
+    Parameters
+    ----------
+    tenths : np.ndarray
+        Medições em décimos de grau.
+
+    Returns
+    -------
+    np.ndarray
+        Índice do bucket de cada medição. Dentro de `[MIN_TENTHS, MAX_TENTHS]`,
+        usa a tabela `TENTHS_BUCKETS`, sem logaritmos.
+    """
+    tenths = np.asarray(tenths)
+    if len(tenths) and (tenths.min() < MIN_TENTHS or tenths.max() > MAX_TENTHS):
+        return bucket_index(tenths / SCALE)
+    return TENTHS_BUCKETS[tenths.astype(np.intp) - MIN_TENTHS]
+
+
+def build_sketches(
+    station_ids: np.ndarray, buckets: np.ndarray, num_stations: int
+) -> np.ndarray:
+    """
+    Conta as medições de cada estação em cada bucket.
+
+    Parameters
+    ----------
+    station_ids : np.ndarray
+        Identificador da estação de cada medição, entre 0 e `num_stations - 1`.
+    buckets : np.ndarray
+        Bucket de cada medição, calculado por `bucket_index`.
+    num_stations : int
+        Número de estações.
+
+    Returns
+    -------
+    np.ndarray
+        Matriz `(num_stations, NUM_BUCKETS)` com as contagens (`SKETCH_DTYPE`).
+
+    """
+    return count_matrix(station_ids, buckets, num_stations, NUM_BUCKETS, SKETCH_DTYPE)
+
+
+def count_matrix(
+    rows: np.ndarray,
+    columns: np.ndarray,
+    num_rows: int,
+    num_columns: int,
+    dtype: np.dtype,
+) -> np.ndarray:
+    """
+    Conta as ocorrências de cada par `(linha, coluna)` em uma matriz densa.
+
+    Parameters
+    ----------
+    rows, columns : np.ndarray
+        Linha (estação) e coluna (bucket) de cada ocorrência.
+    num_rows, num_columns : int
+        Dimensões da matriz.
+    dtype : np.dtype
+        Tipo dos contadores.
+
+    Returns
+    -------
+    np.ndarray
+        Matriz `(num_rows, num_columns)` com as contagens.
+
+    Notes
+    -----
+    Com poucas ocorrências em relação ao tamanho da matriz (chunks pequenos), as
+    contagens são obtidas com `np.unique`, evitando o array int64 temporário do
+    tamanho da matriz criado por `np.bincount`.
+    """
+    flat = np.asarray(rows, dtype=np.intp) * num_columns + columns
+    size: int = num_rows * num_columns
+    if len(flat) >= size:
+        counts = np.bincount(flat, minlength=size).astype(dtype)
+    else:
+        cells, cell_counts = np.unique(flat, return_counts=True)
+        counts = np.zeros(size, dtype=dtype)
+        counts[cells] = cell_counts
+    return counts.reshape(num_rows, num_columns)
+
+
+def sketch_quantiles(
+    sketches: np.ndarray, quantiles: Sequence[float] = QUANTILES
+) -> np.ndarray:
+    """
+    Estima os quantis de cada estação a partir dos sketches.
+
+    Parameters
+    ----------
+    sketches : np.ndarray
+        Matriz `(estações, NUM_BUCKETS)` de contagens.
+    quantiles : Sequence[float], optional
+        Quantis estimados, entre 0 e 1. O padrão é `QUANTILES`.
+
+    Returns
+    -------
+    np.ndarray
+        Matriz `(estações, len(quantiles))` com os quantis em graus. Para cada
+        quantil `q`, retorna o valor do bucket que contém a medição de posição
+        `floor(q * (n - 1))` na ordem crescente, portanto o erro relativo em
+        relação a essa medição é no máximo `RELATIVE_ACCURACY` (exceto para
+        valores fora de `[MIN_INDEXABLE, MAX_INDEXABLE]`). Estações sem medições
+        resultam em `nan`.
+    """
+    cumulative = np.cumsum(sketches, axis=1, dtype=np.int64)
+    totals = cumulative[:, -1]
+    result = np.full((len(sketches), len(quantiles)), np.nan)
+
+    present = totals > 0
+    for column, quantile in enumerate(quantiles):
+        ranks = np.floor(quantile * (totals[present] - 1))
+        buckets = np.argmax(cumulative[present] > ranks[:, None], axis=1)
+        result[present, column] = BUCKET_VALUES[buckets]
+    return result
+
+
+def quantile_column_names(quantiles: Sequence[float] = QUANTILES) -> Dict[float, str]:
+    """Retorna o nome da coluna de cada quantil, por exemplo `p99` para 0,99."""
+    return {quantile: f"p{quantile * 100:g}" for quantile in quantiles}
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from pathlib import Path
+
+    import pandas as pd
+
+    from solution_pandas import create_df_with_pandas_pipeline
+
+    # Compara os quantis do sketch com os quantis exatos em um arquivo pequeno
+    filename = Path(sys.argv[1])
+    rows: int = int(sys.argv[2])
+    chunksize: int = int(sys.argv[3]) if len(sys.argv) > 3 else rows
+
+    timings: Dict[bool, float] = {}
+    for with_sketch in (False, True):
+        start_time: float = time.perf_counter()
+        result = create_df_with_pandas_pipeline(
+            filename, rows, chunksize, sketch=with_sketch
+        )
+        timings[with_sketch] = time.perf_counter() - start_time
+
+    measurements = pd.read_csv(
+        filename, sep=";", header=None, names=["station", "measure"]
+    )
+    exact = (
+        measurements.groupby("station")["measure"]
+        .quantile(list(QUANTILES), interpolation="lower")
+        .unstack()
+    )
+    result = result.set_index("station")
+
+    for quantile, name in quantile_column_names(QUANTILES).items():
+        expected = exact[quantile].reindex(result.index).to_numpy()
+        estimated = result[name].to_numpy()
+        nonzero = np.abs(expected) >= MIN_INDEXABLE
+        relative_error = np.abs(estimated - expected)[nonzero] / np.abs(
+            expected[nonzero]
+        )
+        print(
+            f"{name}: erro relativo máximo {relative_error.max():.4f} "
+            f"(limite {RELATIVE_ACCURACY})"
+        )
+
+    print(
+        f"Memória do sketch: {NUM_BUCKETS * np.dtype(SKETCH_DTYPE).itemsize:,} bytes "
+        f"por estação ({NUM_BUCKETS} buckets)."
+    )
+    print(
+        f"Tempo sem sketch: {timings[False]:.3f}s; com sketch: {timings[True]:.3f}s "
+        f"({timings[True] / timings[False] - 1:+.0%})."
+    )
@@ -0,0 +1,257 @@
+"""Gerador de carga para o servidor de consultas."""
+
+import asyncio
+import json
+import random
+import statistics
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from query_server import DEFAULT_HOST, DEFAULT_PORT, MAX_LIMIT, NOT_FOUND, STREAM_LIMIT
+
+# Proporção de cada tipo de consulta gerada
+QUERY_MIX: Dict[str, float] = {"get": 0.8, "prefix": 0.1, "range": 0.1}
+
+# Número de estações pedidas nas consultas de prefixo e de intervalo
+QUERY_LIMIT: int = 20
+
+
+class QueryClient:
+    """
+    Conexão com o servidor de consultas.
+
+    Examples
+    --------
+    >>> client = await QueryClient.connect()
+    >>> await client.query({"op": "get", "station": "Abha"})
+    {'ok': True, 'result': {'station': 'Abha', ...}}
+    """
+
+    def __init__(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Guarda os fluxos de leitura e escrita da conexão."""
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(
+        cls,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        unix_socket: Optional[Path] = None,
+    ) -> "QueryClient":
+        """Abre uma conexão TCP, ou com o socket Unix se `unix_socket` for informado."""
+        if unix_socket is not None:
+            reader, writer = await asyncio.open_unix_connection(
+                unix_socket, limit=STREAM_LIMIT
+            )
+        else:
+            reader, writer = await asyncio.open_connection(
+                host, port, limit=STREAM_LIMIT
+            )
+        return cls(reader, writer)
+
+    async def query(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Envia uma consulta e espera a resposta."""
+        self.writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def close(self) -> None:
+        """Fecha a conexão."""
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def fetch_stations(client: QueryClient) -> List[str]:
+    """
+    Lê todas as estações do servidor, em páginas de `MAX_LIMIT` nomes.
+
+    Parameters
+    ----------
+    client : QueryClient
+        Conexão usada.
+
+    Returns
+    -------
+    List[str]
+        Estações do índice do servidor, em ordem alfabética.
+    """
+    stations: List[str] = []
+    while True:
+        response = await client.query(
+            {"op": "list", "offset": len(stations), "limit": MAX_LIMIT}
+        )
+        page: List[str] = response["result"]
+        stations.extend(page)
+        if len(page) < MAX_LIMIT:
+            return stations
+
+
+def random_request(rng: random.Random, stations: List[str]) -> Dict[str, Any]:
+    """
+    Sorteia uma consulta de acordo com `QUERY_MIX`.
+
+    Parameters
+    ----------
+    rng : random.Random
+        Gerador de números aleatórios.
+    stations : List[str]
+        Estações do servidor, em ordem alfabética.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Consulta no formato aceito pelo servidor.
+    """
+    op: str = rng.choices(list(QUERY_MIX), weights=list(QUERY_MIX.values()))[0]
+    station: str = rng.choice(stations)
+    if op == "get":
+        return {"op": "get", "station": station}
+    if op == "prefix":
+        return {"op": "prefix", "prefix": station[:2], "limit": QUERY_LIMIT}
+    position: int = bisect_left(stations, station)
+    end: str = stations[min(position + QUERY_LIMIT, len(stations) - 1)]
+    return {"op": "range", "start": station, "end": end, "limit": QUERY_LIMIT}
+
+
+async def client_worker(
+    client: QueryClient,
+    requests: List[Dict[str, Any]],
+    latencies: List[float],
+) -> Tuple[int, int]:
+    """
+    Envia as consultas em sequência e registra a latência de cada uma.
+
+    Parameters
+    ----------
+    client : QueryClient
+        Conexão usada.
+    requests : List[Dict[str, Any]]
+        Consultas enviadas.
+    latencies : List[float]
+        Lista onde as latências, em segundos, são acrescentadas.
+
+    Returns
+    -------
+    Tuple[int, int]
+        Número de respostas com erro e de consultas `get` de estações que o
+        servidor não tem, contadas à parte dos erros.
+    """
+    errors: int = 0
+    misses: int = 0
+    for request in requests:
+        start_time: float = time.perf_counter()
+        response = await client.query(request)
+        latencies.append(time.perf_counter() - start_time)
+        if response.get("error") == NOT_FOUND:
+            misses += 1
+        elif not response.get("ok"):
+            errors += 1
+    return errors, misses
+
+
+async def run_load(
+    clients: int = 32,
+    requests_per_client: int = 1_000,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    unix_socket: Optional[Path] = None,
+    seed: int = 42,
+) -> Dict[str, float]:
+    """
+    Gera carga com vários clientes simultâneos e mede a latência e a vazão.
+
+    Parameters
+    ----------
+    clients : int, optional
+        Número de conexões simultâneas. O padrão é 32.
+    requests_per_client : int, optional
+        Consultas enviadas por conexão. O padrão é 1.000.
+    host : str, optional
+        Endereço TCP do servidor.
+    port : int, optional
+        Porta TCP do servidor.
+    unix_socket : Path, optional
+        Socket Unix do servidor, usado no lugar de TCP se informado.
+    seed : int, optional
+        Semente das consultas sorteadas. O padrão é 42.
+
+    Returns
+    -------
+    Dict[str, float]
+        Número de consultas, erros, estações não encontradas, QPS e latências
+        p50, p99 e máxima, em milissegundos.
+
+    Notes
+    -----
+    - As consultas são sorteadas antes da medição, para que o custo do sorteio
+      não entre na latência.
+    - As estações são sorteadas de maneira uniforme entre todas as que o
+      servidor tem, lidas em páginas com a operação `list`, e não de um trecho
+      em ordem alfabética nem de uma lista com estações ausentes do arquivo.
+    - Consultas `get` de estações que o servidor não tem são contadas em
+      `misses`, e não como erros.
+    """
+    connections: List[QueryClient] = [
+        await QueryClient.connect(host, port, unix_socket) for _ in range(clients)
+    ]
+    try:
+        stations: List[str] = await fetch_stations(connections[0])
+        if not stations:
+            raise ValueError("O servidor não tem estações.")
+
+        rng = random.Random(seed)
+        workloads = [
+            [random_request(rng, stations) for _ in range(requests_per_client)]
+            for _ in range(clients)
+        ]
+
+        latencies: List[float] = []
+        start_time: float = time.perf_counter()
+        outcomes: List[Tuple[int, int]] = await asyncio.gather(
+            *(
+                client_worker(connection, workload, latencies)
+                for connection, workload in zip(connections, workloads)
+            )
+        )
+        took: float = time.perf_counter() - start_time
+    finally:
+        for connection in connections:
+            await connection.close()
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors for errors, _ in outcomes),
+        "misses": sum(misses for _, misses in outcomes),
+        "qps": len(latencies) / took,
+        "p50_ms": percentiles[49] * 1000,
+        "p99_ms": percentiles[98] * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1_000)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", type=Path, help="Caminho de um socket Unix.")
+    args = parser.parse_args()
+
+    report = asyncio.run(
+        run_load(args.clients, args.requests, args.host, args.port, args.unix)
+    )
+    print(
+        f"{report['requests']:,} consultas ({report['errors']} erros, "
+        f"{report['misses']:,} estações não encontradas): "
+        f"{report['qps']:,.0f} QPS, p50 {report['p50_ms']:.3f} ms, "
+        f"p99 {report['p99_ms']:.3f} ms, máx. {report['max_ms']:.3f} ms."
+    )
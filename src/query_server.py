@@ -0,0 +1,319 @@
+"""Servidor asyncio de consultas às estatísticas das estações."""
+
+import asyncio
+import json
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from registry import get_engine
+from settings import FILENAME_OUTPUT
+from verification import normalize_result
+
+DEFAULT_HOST: str = "127.0.0.1"
+DEFAULT_PORT: int = 8765
+
+# Número máximo de estações retornadas por uma consulta de prefixo ou intervalo
+DEFAULT_LIMIT: int = 100
+MAX_LIMIT: int = 10_000
+
+# Tamanho máximo de uma linha (consulta ou resposta) nos fluxos asyncio
+STREAM_LIMIT: int = 16 * 1024 * 1024
+
+# Erro de uma consulta `get` de estação sem medições no índice
+NOT_FOUND: str = "Estação não encontrada."
+
+# Maior caractere Unicode, usado como limite superior nas consultas por prefixo
+MAX_CHAR: str = chr(0x10FFFF)
+
+StationRow = Dict[str, Any]
+
+
+class StationIndex:
+    """
+    Índice ordenado das estatísticas de cada estação, mantido em memória.
+
+    As consultas usam busca binária (`bisect`) sobre a lista ordenada dos nomes,
+    portanto custam O(log n + k), em que k é o número de estações retornadas.
+
+    Examples
+    --------
+    >>> index = StationIndex(["Abha", "Accra"], [(-31.9, 41.4, 18.0), ...])
+    >>> index.get("Abha")
+    {'station': 'Abha', 'min': -31.9, 'max': 41.4, 'mean': 18.0}
+    """
+
+    def __init__(
+        self, stations: List[str], stats: List[Tuple[float, float, float]]
+    ) -> None:
+        """Ordena as estações e guarda as estatísticas alinhadas com os nomes."""
+        rows = sorted(zip(stations, stats))
+        self.stations: List[str] = [station for station, _ in rows]
+        self.stats: List[Tuple[float, float, float]] = [values for _, values in rows]
+
+    @classmethod
+    def from_result(cls, result: Any) -> "StationIndex":
+        """
+        Cria o índice a partir do resultado de qualquer solução.
+
+        Parameters
+        ----------
+        result : Any
+            Resultado de uma solução do registro, aceito por `normalize_result`.
+
+        Returns
+        -------
+        StationIndex
+            Índice com as estações do resultado.
+        """
+        columns = normalize_result(result)
+        return cls(
+            [str(station) for station in columns["station"]],
+            list(
+                zip(
+                    columns["min"].tolist(),
+                    columns["max"].tolist(),
+                    columns["mean"].tolist(),
+                )
+            ),
+        )
+
+    def __len__(self) -> int:
+        """Retorna o número de estações."""
+        return len(self.stations)
+
+    def _row(self, position: int) -> StationRow:
+        min_value, max_value, mean_value = self.stats[position]
+        return {
+            "station": self.stations[position],
+            "min": min_value,
+            "max": max_value,
+            "mean": round(mean_value, 1),
+        }
+
+    def get(self, station: str) -> Optional[StationRow]:
+        """Retorna as estatísticas de uma estação, ou `None` se ela não existir."""
+        position: int = bisect_left(self.stations, station)
+        if position < len(self.stations) and self.stations[position] == station:
+            return self._row(position)
+        return None
+
+    def range(
+        self, start: str, end: Optional[str] = None, limit: int = DEFAULT_LIMIT
+    ) -> List[StationRow]:
+        """
+        Retorna as estações com nome em `[start, end)`, em ordem alfabética.
+
+        Parameters
+        ----------
+        start : str
+            Primeiro nome do intervalo (inclusivo).
+        end : str, optional
+            Último nome do intervalo (exclusivo). Sem limite se `None`.
+        limit : int, optional
+            Número máximo de estações retornadas. O padrão é `DEFAULT_LIMIT`.
+
+        Returns
+        -------
+        List[StationRow]
+            Estatísticas das estações do intervalo.
+        """
+        first: int = bisect_left(self.stations, start)
+        last: int = (
+            len(self.stations) if end is None else bisect_left(self.stations, end)
+        )
+        last = min(last, first + max(limit, 0))
+        return [self._row(position) for position in range(first, last)]
+
+    def names(self, offset: int = 0, limit: int = DEFAULT_LIMIT) -> List[str]:
+        """Retorna até `limit` nomes de estações a partir da posição `offset`."""
+        offset = max(offset, 0)
+        return self.stations[offset : offset + max(limit, 0)]
+
+    def prefix(self, prefix: str, limit: int = DEFAULT_LIMIT) -> List[StationRow]:
+        """Retorna as estações cujo nome começa com `prefix`, em ordem alfabética."""
+        return self.range(prefix, prefix + MAX_CHAR if prefix else None, limit)
+
+
+def handle_request(index: StationIndex, request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Responde a uma consulta.
+
+    Parameters
+    ----------
+    index : StationIndex
+        Índice consultado.
+    request : Dict[str, Any]
+        Consulta com a operação `op` e os seus parâmetros:
+
+        - `{"op": "get", "station": nome}`
+        - `{"op": "prefix", "prefix": texto, "limit": n}`
+        - `{"op": "range", "start": nome, "end": nome, "limit": n}`
+        - `{"op": "list", "offset": n, "limit": n}`, com somente os nomes, em
+          páginas de até `MAX_LIMIT`
+        - `{"op": "info"}`
+
+    Returns
+    -------
+    Dict[str, Any]
+        Resposta com `ok` e o resultado, ou `ok: false` e a mensagem de erro.
+    """
+    op = request.get("op")
+    limit: int = min(int(request.get("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+
+    if op == "get":
+        row = index.get(str(request["station"]))
+        if row is None:
+            return {"ok": False, "error": NOT_FOUND}
+        return {"ok": True, "result": row}
+    if op == "prefix":
+        return {"ok": True, "result": index.prefix(str(request["prefix"]), limit)}
+    if op == "range":
+        end = request.get("end")
+        return {
+            "ok": True,
+            "result": index.range(
+                str(request["start"]), None if end is None else str(end), limit
+            ),
+        }
+    if op == "list":
+        return {
+            "ok": True,
+            "result": index.names(int(request.get("offset", 0)), limit),
+        }
+    if op == "info":
+        return {"ok": True, "result": {"stations": len(index)}}
+    return {"ok": False, "error": f"Operação desconhecida: {op}"}
+
+
+async def serve_client(
+    index: StationIndex, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    """
+    Atende um cliente até ele fechar a conexão.
+
+    Parameters
+    ----------
+    index : StationIndex
+        Índice consultado.
+    reader : asyncio.StreamReader
+        Fluxo de leitura da conexão. Cada linha é uma consulta em JSON.
+    writer : asyncio.StreamWriter
+        Fluxo de escrita da conexão. Cada resposta é uma linha em JSON.
+    """
+    try:
+        while line := await reader.readline():
+            try:
+                response = handle_request(index, json.loads(line))
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                response = {"ok": False, "error": f"Consulta inválida: {e}"}
+            writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8"))
+            writer.write(b"\n")
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def run_server(
+    index: StationIndex,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    unix_socket: Optional[Path] = None,
+) -> None:
+    """
+    Inicia o servidor e atende os clientes até ser interrompido.
+
+    Parameters
+    ----------
+    index : StationIndex
+        Índice consultado.
+    host : str, optional
+        Endereço TCP. O padrão é `DEFAULT_HOST`.
+    port : int, optional
+        Porta TCP. O padrão é `DEFAULT_PORT`.
+    unix_socket : Path, optional
+        Se informado, o servidor escuta neste socket Unix em vez de TCP.
+
+    Notes
+    -----
+    Cada consulta é respondida sem bloqueios nem E/S, portanto uma única thread
+    atende muitos clientes simultâneos.
+    """
+
+    async def client_connected(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        await serve_client(index, reader, writer)
+
+    if unix_socket is not None:
+        server = await asyncio.start_unix_server(
+            client_connected, path=unix_socket, limit=STREAM_LIMIT
+        )
+        address = str(unix_socket)
+    else:
+        server = await asyncio.start_server(
+            client_connected, host, port, limit=STREAM_LIMIT
+        )
+        address = f"{host}:{port}"
+
+    print(f"Servidor com {len(index):,} estações escutando em {address}.")
+    async with server:
+        await server.serve_forever()
+
+
+def load_index(
+    engine_name: str, filename: Path, rows: int, config: Dict[str, Any]
+) -> StationIndex:
+    """
+    Executa uma solução do registro e monta o índice com o resultado.
+
+    Parameters
+    ----------
+    engine_name : str
+        Nome da solução, por exemplo `polars` ou `mmap_incremental`.
+    filename : Path
+        Arquivo de medições.
+    rows : int
+        Número de linhas do arquivo, usado pelas soluções que precisam dele.
+    config : Dict[str, Any]
+        Parâmetros opcionais da solução.
+
+    Returns
+    -------
+    StationIndex
+        Índice com as estatísticas de todas as estações.
+    """
+    engine = get_engine(engine_name)
+    print(f"Calculando as estatísticas com {engine.name}...")
+    return StationIndex.from_result(engine.run(filename, rows, config))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from run_tests import parse_config
+    from settings import NUM_ROWS_TO_CREATE
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--engine", default="polars")
+    parser.add_argument("--file", type=Path, default=FILENAME_OUTPUT)
+    parser.add_argument(
+        "--rows",
+        type=lambda value: int(value.replace("_", "")),
+        default=NUM_ROWS_TO_CREATE,
+    )
+    parser.add_argument("--config", nargs="*", default=[])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", type=Path, help="Caminho de um socket Unix.")
+    args = parser.parse_args()
+
+    station_index = load_index(
+        args.engine, args.file, args.rows, parse_config(args.config)
+    )
+    try:
+        asyncio.run(run_server(station_index, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        print("Servidor encerrado.")
@@ -1,24 +1,181 @@
 """Gravação dos resultados do processamento."""
 
+import json
+import os
+import statistics
 import time
-from typing import Callable, Union
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
 
-from pandas import DataFrame
-from polars import LazyFrame
-
-from create_measurements import BASE_DIR, FILENAME_OUTPUT, NUM_ROWS_TO_CREATE
-from solution_pandas import CHUNKSIZE, create_df_with_pandas
-from solution_polars import create_polars_df_streaming
+from autotune import load_tuned_config
+from benchmark_metrics import (
+    PeakMemoryMonitor,
+    cpu_times,
+    drop_page_cache,
+    warm_page_cache,
+)
+from create_measurements import DEFAULT_DATASET
+from phase_timer import PROFILE_DIR, PROFILERS, profile_run, record_phases
+from registry import Engine, get_engine, load_engines
+from settings import BASE_DIR, FILENAME_OUTPUT, NUM_ROWS_TO_CREATE
+from verification import (
+    NormalizedResult,
+    VerificationResult,
+    compare_results,
+    normalize_result,
+    preview_result,
+)
 
+# Formato original: <biblioteca>;<linhas>;<início>;<tempo (s)>
 FILENAME_RESULTS = BASE_DIR / "../data/solution_results.csv"
 
-DataFrameType = Union[DataFrame, LazyFrame]
+# Formato detalhado: um objeto JSON por linha com o campo `schema_version`
+FILENAME_RESULTS_DETAILED = BASE_DIR / "../data/solution_results.jsonl"
+RESULTS_SCHEMA_VERSION: int = 2
+
+PAGE_CACHE_MODES = ("warm", "cold", "none")
+
+# pandas e Polars são importados somente pelas soluções que os usam
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    from polars import LazyFrame
+
+DataFrameType = Union["DataFrame", "LazyFrame", Dict[str, Tuple[float, float, float]]]
+
+
+def summarize_runs(
+    runs: List[Dict[str, float]], linhas_processadas: int, file_size: Optional[int]
+) -> Dict[str, Optional[float]]:
+    """
+    Resume as repetições de uma solução com mediana e dispersão.
+
+    Parameters
+    ----------
+    runs : List[Dict[str, float]]
+        Medições de cada repetição, com as chaves `wall_s`, `user_s`, `sys_s` e
+        `peak_rss_bytes`.
+    linhas_processadas : int
+        Número de linhas do arquivo processado.
+    file_size : int, optional
+        Tamanho do arquivo processado, em bytes.
+
+    Returns
+    -------
+    Dict[str, Optional[float]]
+        Mediana, mínimo, máximo e desvio padrão do tempo total, medianas dos
+        tempos de CPU, pico de memória e vazão em linhas/s e bytes/s (calculadas
+        com a mediana do tempo total).
+    """
+    wall = [run["wall_s"] for run in runs]
+    wall_median: float = statistics.median(wall)
+    return {
+        "wall_s_median": wall_median,
+        "wall_s_min": min(wall),
+        "wall_s_max": max(wall),
+        "wall_s_stdev": statistics.stdev(wall) if len(wall) > 1 else 0.0,
+        "user_s_median": statistics.median(run["user_s"] for run in runs),
+        "sys_s_median": statistics.median(run["sys_s"] for run in runs),
+        "peak_rss_bytes": max(run["peak_rss_bytes"] for run in runs),
+        "rows_per_s": linhas_processadas / wall_median if wall_median else None,
+        "bytes_per_s": (
+            file_size / wall_median if file_size is not None and wall_median else None
+        ),
+    }
+
+
+def summarize_phases(runs: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Resume o tempo de cada fase das repetições.
+
+    Parameters
+    ----------
+    runs : List[Dict[str, Any]]
+        Medições de cada repetição, com as fases em `phases`.
+
+    Returns
+    -------
+    Dict[str, float]
+        Mediana do tempo de cada fase, com a chave `phase_<fase>_s`, uma coluna
+        por fase registrada em alguma repetição (0 nas repetições sem ela).
+    """
+    names = sorted({name for run in runs for name in run.get("phases", {})})
+    return {
+        f"phase_{name}_s": statistics.median(
+            run.get("phases", {}).get(name, 0.0) for run in runs
+        )
+        for name in names
+    }
+
+
+def load_results(
+    filename_results: Path = FILENAME_RESULTS,
+    filename_detailed: Path = FILENAME_RESULTS_DETAILED,
+) -> List[dict]:
+    """
+    Lê os resultados gravados nos dois formatos.
+
+    Parameters
+    ----------
+    filename_results : Path, optional
+        Arquivo no formato original. O padrão é `FILENAME_RESULTS`.
+    filename_detailed : Path, optional
+        Arquivo no formato detalhado. O padrão é `FILENAME_RESULTS_DETAILED`.
+
+    Returns
+    -------
+    List[dict]
+        Registros do formato detalhado seguidos pelos registros do formato
+        original (com `schema_version` igual a 1 e apenas as chaves `library`,
+        `rows`, `started_at` e `wall_s_median`). Arquivos ausentes são ignorados.
+
+    Notes
+    -----
+    Cada execução gravada no formato detalhado também tem uma cópia no formato
+    original, sem configuração nem perfil do arquivo. Linhas do formato original
+    com a mesma `library`, `rows` e `started_at` de um registro detalhado são
+    descartadas, para que a mesma execução não seja contada duas vezes.
+    """
+    records: List[dict] = []
+
+    if os.path.exists(filename_detailed):
+        with open(filename_detailed, "r", encoding="utf-8") as file:
+            records.extend(json.loads(line) for line in file if line.strip())
+    detailed_runs = {
+        (record.get("library"), record.get("rows"), record.get("started_at"))
+        for record in records
+    }
+
+    if os.path.exists(filename_results):
+        with open(filename_results, "r", encoding="utf-8") as file:
+            for line in file:
+                fields = line.strip().split(";")
+                if len(fields) != 4:
+                    continue
+                if (fields[0], int(fields[1]), fields[2]) in detailed_runs:
+                    continue
+                records.append(
+                    {
+                        "schema_version": 1,
+                        "library": fields[0],
+                        "rows": int(fields[1]),
+                        "started_at": fields[2],
+                        "wall_s_median": float(fields[3]),
+                    }
+                )
+
+    return records
 
 
 def record_result(
     biblioteca: str,
     linhas_processadas: int,
     module_solution: Callable[..., DataFrameType],
+    repeticoes: int = 1,
+    page_cache: str = "none",
+    reference: Optional[NormalizedResult] = None,
+    startup_s: Optional[float] = None,
+    profile: Optional[str] = None,
+    dataset: str = DEFAULT_DATASET,
     **kwargs,
 ) -> DataFrameType:
     """
@@ -28,14 +185,37 @@ def record_result(
     ----------
     biblioteca : str
         Nome da biblioteca ou solução sendo utilizada.
+    linhas_processadas : int
+        Número de linhas do arquivo processado.
     module_solution : Callable[..., DataFrameType]
         Função que implementa a solução a ser executada.
         A função deve aceitar argumentos variados, conforme sua implementação.
+    repeticoes : int, optional
+        Número de execuções da solução. O padrão é 1.
+    page_cache : str, optional
+        Estado do cache de páginas antes de cada execução: `"warm"` lê o arquivo
+        antes de medir, `"cold"` pede ao sistema que o descarte e `"none"` não faz
+        nada (padrão).
+    reference : NormalizedResult, optional
+        Resultado normalizado de uma solução de referência. Se informado, o
+        resultado é comparado com ele e a verificação é registrada.
+    startup_s : float, optional
+        Tempo de importação da solução em um interpretador novo, medido por
+        `startup_time`. É registrado separado do tempo de processamento.
+    profile : str, optional
+        `"cprofile"` ou `"sampling"` para capturar o perfil da solução em uma
+        execução extra, depois das medições. O padrão é nenhum.
+    dataset : str, optional
+        Perfil do arquivo de medições (`create_measurements.DATASET_PROFILES`),
+        registrado para separar os resultados de cada distribuição. O padrão é
+        `"uniform"`.
     kwargs : dict
         Argumentos adicionais a serem passados para a função de solução.
 
     Raises
     ------
+    ValueError
+        Se `page_cache` não for um dos valores aceitos.
     FileNotFoundError
         Se o arquivo de resultados não puder ser encontrado.
     Exception
@@ -44,32 +224,144 @@ def record_result(
     Returns
     -------
     DataFrameType
-        DataFrame resultante do processamento.
+        DataFrame resultante do processamento (da última execução).
 
     Notes
     -----
-    - A função mede o tempo de execução da solução fornecida.
+    - A função mede o tempo total, os tempos de CPU de usuário e de sistema
+      (incluindo os processos filhos) e o pico de memória residente do processo
+      e dos seus filhos em cada execução.
     - Os resultados são registrados em um arquivo especificado por `FILENAME_RESULTS` no
     formato:
-        `<biblioteca>;<número de linhas>;<horário de início>;<tempo de execução (s)>`.
+        `<biblioteca>;<número de linhas>;<horário de início>;<tempo de execução (s)>`,
+      usando a mediana do tempo total.
+    - O registro completo, com mediana, dispersão, vazão e cada execução, é
+      gravado em `FILENAME_RESULTS_DETAILED` com `schema_version` igual a
+      `RESULTS_SCHEMA_VERSION`.
     - O horário de início é registrado em um formato legível por humanos (YYYY-MM-DD HH:MM:SS).
+    - A verificação compara apenas as tabelas finais (uma linha por estação) e
+      é feita fora do tempo medido.
+    - A solução já está importada quando a medição começa, portanto o tempo de
+      processamento não inclui a importação das bibliotecas (`startup_s`).
+    - As fases registradas pela solução com `phase_timer.phase` (leitura,
+      parsing, agregação, combinação, saída e a espera pelos workers) são
+      gravadas, com a mediana das repetições, nas colunas `phase_<fase>_s`. As
+      fases medidas nos workers têm o prefixo `worker_` e são somadas entre
+      os processos.
+    - As soluções não imprimem o resultado: as primeiras estações são impressas
+      depois da medição, e o tempo da impressão fica em `print_s`.
     """
+    if page_cache not in PAGE_CACHE_MODES:
+        raise ValueError(f"page_cache deve ser um de {PAGE_CACHE_MODES}.")
+    if profile is not None and profile not in PROFILERS:
+        raise ValueError(f"profile deve ser um de {PROFILERS}.")
+
     print(f"Iniciando o processamento do arquivo com {biblioteca}...")
 
-    start_time: float = time.time()
+    filename: Optional[Path] = kwargs.get("filename")
+    file_size: Optional[int] = (
+        os.path.getsize(filename) if filename is not None else None
+    )
     start_time_readable: str = time.strftime(
-        "%Y-%m-%d %H:%M:%S", time.localtime(start_time)
+        "%Y-%m-%d %H:%M:%S", time.localtime(time.time())
     )
-    df = module_solution(**kwargs)
-    took: float = time.time() - start_time
+    runs: List[Dict[str, float]] = []
+
+    for _ in range(repeticoes):
+        if filename is not None and page_cache == "warm":
+            warm_page_cache(filename)
+        elif filename is not None and page_cache == "cold":
+            drop_page_cache(filename)
+
+        cpu_before = cpu_times()
+        with PeakMemoryMonitor() as monitor, record_phases() as phases:
+            start_time: float = time.perf_counter()
+            df = module_solution(**kwargs)
+            took: float = time.perf_counter() - start_time
+        cpu_after = cpu_times()
+
+        runs.append(
+            {
+                "wall_s": took,
+                "user_s": cpu_after["user"] - cpu_before["user"],
+                "sys_s": cpu_after["sys"] - cpu_before["sys"],
+                "peak_rss_bytes": monitor.peak_bytes,
+                "phases": phases,
+            }
+        )
+        print(f"Processamento concluído com: {took:.4f}s.")
+
+    # A impressão do resultado fica fora do tempo medido
+    start_time = time.perf_counter()
+    print(preview_result(df))
+    print_s: float = time.perf_counter() - start_time
+
+    summary = summarize_runs(runs, linhas_processadas, file_size)
+    phase_summary = summarize_phases(runs)
+    took = summary["wall_s_median"]
+    if phase_summary:
+        print(
+            "Fases (mediana): "
+            + ", ".join(
+                f"{name[len('phase_') : -len('_s')]} {seconds:.3f}s"
+                for name, seconds in phase_summary.items()
+            )
+        )
+
+    profile_file: Optional[Path] = None
+    if profile is not None:
+        # Execução extra: o perfil deixa a solução mais lenta e não entra nas
+        # medições
+        extension: str = "prof" if profile == "cprofile" else "folded"
+        profile_file = PROFILE_DIR / (
+            f"{biblioteca}_{linhas_processadas}_"
+            f"{time.strftime('%Y%m%d_%H%M%S')}.{extension}"
+        )
+        with profile_run(profile, profile_file):
+            module_solution(**kwargs)
+        print(f"Perfil gravado em {profile_file}.")
+
+    if repeticoes > 1:
+        print(
+            f"Mediana de {repeticoes} execuções: {took:.4f}s "
+            f"(min {summary['wall_s_min']:.4f}s, max {summary['wall_s_max']:.4f}s)."
+        )
 
-    print(f"Processamento concluído com: {took:.4f}s.")
+    verification: Optional[VerificationResult] = None
+    if reference is not None:
+        verification = compare_results(reference, normalize_result(df))
+        print(f"Verificação com a referência: {verification.message}")
+
+    record = {
+        "schema_version": RESULTS_SCHEMA_VERSION,
+        "library": biblioteca,
+        "rows": linhas_processadas,
+        "dataset": dataset,
+        "started_at": start_time_readable,
+        "file_bytes": file_size,
+        "repetitions": repeticoes,
+        "page_cache": page_cache,
+        "config": kwargs.get("config"),
+        **summary,
+        **phase_summary,
+        "print_s": print_s,
+        "profile_file": None if profile_file is None else str(profile_file),
+        "startup_s": startup_s,
+        "verified": None if verification is None else verification.passed,
+        "mismatched_stations": (
+            None if verification is None else verification.mismatched_stations
+        ),
+        "max_abs_diff": None if verification is None else verification.max_abs_diff,
+        "runs": runs,
+    }
 
     try:
         with open(FILENAME_RESULTS, "a", encoding="utf-8") as file:
             file.write(
                 f"{biblioteca};{linhas_processadas};{start_time_readable};{took:.2f}\n"
             )
+        with open(FILENAME_RESULTS_DETAILED, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record) + "\n")
     except FileNotFoundError:
         print(  # noqa (evitar conflito do black e do autopep8)
             "Verifique se o ambiente virtual está ativo. "
@@ -84,29 +376,81 @@ def record_result(
         return df
 
 
-if __name__ == "__main__":
+def record_engine(
+    engine: Engine,
+    filename: Path,
+    linhas_processadas: int,
+    config: Optional[Dict[str, Any]] = None,
+    repeticoes: int = 1,
+    page_cache: str = "none",
+    reference: Optional[NormalizedResult] = None,
+    use_profile: bool = True,
+    startup_s: Optional[float] = None,
+    profile: Optional[str] = None,
+    dataset: str = DEFAULT_DATASET,
+) -> DataFrameType:
+    """
+    Executa uma solução do registro com `record_result`.
 
-    record_result(
-        "pandas",
-        NUM_ROWS_TO_CREATE,
-        create_df_with_pandas,
-        filename=FILENAME_OUTPUT,
-        total_linhas=NUM_ROWS_TO_CREATE,
-        chunksize=CHUNKSIZE,
-    )
+    Parameters
+    ----------
+    engine : Engine
+        Solução registrada.
+    filename : Path
+        Arquivo de medições.
+    linhas_processadas : int
+        Número de linhas do arquivo.
+    config : Dict[str, Any], optional
+        Parâmetros opcionais da solução (por exemplo, `chunksize`).
+    repeticoes : int, optional
+        Número de execuções da solução. O padrão é 1.
+    page_cache : str, optional
+        Estado do cache de páginas antes de cada execução. O padrão é `"none"`.
+    reference : NormalizedResult, optional
+        Resultado normalizado da solução de referência.
+    use_profile : bool, optional
+        Se verdadeiro (padrão), parte da configuração ajustada pelo `autotune`
+        para esta máquina, com o `chunksize` limitado ao número de linhas (veja
+        `autotune.load_tuned_config`). Os valores de `config` têm prioridade.
+    startup_s : float, optional
+        Tempo de importação da solução, registrado separado do processamento.
+    profile : str, optional
+        Perfil capturado em uma execução extra (`"cprofile"` ou `"sampling"`).
+    dataset : str, optional
+        Perfil do arquivo de medições. O padrão é `"uniform"`.
 
-    record_result(
-        "polars",
-        NUM_ROWS_TO_CREATE,
-        create_polars_df_streaming,
-        filename=FILENAME_OUTPUT,
-        chunksize=CHUNKSIZE,
-    )
+    Returns
+    -------
+    DataFrameType
+        Resultado da solução.
+    """
+    if use_profile:
+        config = {
+            **load_tuned_config(engine.name, linhas_processadas),
+            **(config or {}),
+        }
 
-    record_result(
-        "datatable",
-        NUM_ROWS_TO_CREATE,
-        create_polars_df_streaming,
-        filename=FILENAME_OUTPUT,
-        chunksize=CHUNKSIZE,
+    return record_result(
+        engine.name,
+        linhas_processadas,
+        engine.run,
+        repeticoes=repeticoes,
+        page_cache=page_cache,
+        reference=reference,
+        startup_s=startup_s,
+        profile=profile,
+        dataset=dataset,
+        filename=filename,
+        rows=linhas_processadas,
+        config=config or {},
     )
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Executa as soluções informadas na linha de comando, ou todas as registradas
+    engine_names: List[str] = sys.argv[1:] or list(load_engines())
+
+    for engine_name in engine_names:
+        record_engine(get_engine(engine_name), FILENAME_OUTPUT, NUM_ROWS_TO_CREATE)
@@ -0,0 +1,229 @@
+"""Registro das soluções disponíveis para os testes."""
+
+import importlib
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Módulo que registra cada solução ao ser importado. Somente o módulo das
+# soluções escolhidas é importado, para não carregar bibliotecas desnecessárias
+ENGINE_MODULES: Dict[str, str] = {
+    "pandas": "solution_pandas",
+    "pandas_pipeline": "solution_pandas",
+    "pandas_shared": "solution_pandas",
+    "polars": "solution_polars",
+    "polars_new_streaming": "solution_polars",
+    "polars_threads": "solution_polars",
+    "polars_batched": "solution_polars",
+    "polars_enum": "solution_polars",
+    "datatable": "solution_datatable",
+    "datatable_offsets": "solution_datatable",
+    "mmap": "solution_mmap",
+    "mmap_fixed_point": "solution_mmap",
+    "mmap_incremental": "incremental",
+    "numpy_interned": "solution_numpy",
+    "numpy_threads": "solution_numpy",
+    "sharded": "sharded",
+}
+
+EngineFunction = Callable[[Path, int, Dict[str, Any]], Any]
+
+# Função `(path, início, fim, config) -> StationAggregate` que agrega somente um
+# intervalo de bytes do arquivo, sem calcular a média
+PartialFunction = Callable[[Path, int, int, Dict[str, Any]], Any]
+
+
+@dataclass(frozen=True)
+class Engine:
+    """
+    Solução registrada com assinatura uniforme.
+
+    Attributes
+    ----------
+    name : str
+        Nome usado na linha de comando e nos resultados.
+    run : EngineFunction
+        Função `(path, rows, config) -> resultado`. `config` é um dicionário com
+        parâmetros opcionais da solução (por exemplo, `chunksize`).
+    streaming : bool
+        Se a solução processa o arquivo em partes, sem carregá-lo inteiro.
+    parallel : bool
+        Se a solução usa vários processos ou threads.
+    needs_row_count : bool
+        Se a solução precisa do número de linhas do arquivo.
+    tunable : Tuple[str, ...]
+        Parâmetros de `config` que podem ser ajustados automaticamente
+        (`chunksize` e `concurrency`).
+    partial : PartialFunction, optional
+        Função que agrega um intervalo de bytes do arquivo e retorna o
+        `StationAggregate` parcial, que pode ser combinado com os de outros
+        intervalos. Registrada com `register_partial`; `None` se a solução não
+        aceita ser executada por partes.
+    """
+
+    name: str
+    run: EngineFunction
+    streaming: bool = False
+    parallel: bool = False
+    needs_row_count: bool = False
+    tunable: Tuple[str, ...] = ()
+    partial: Optional[PartialFunction] = None
+
+
+ENGINES: Dict[str, Engine] = {}
+
+
+def register_engine(
+    name: str,
+    streaming: bool = False,
+    parallel: bool = False,
+    needs_row_count: bool = False,
+    tunable: Tuple[str, ...] = (),
+) -> Callable[[EngineFunction], EngineFunction]:
+    """
+    Registra uma solução com o nome e as capacidades informadas.
+
+    Parameters
+    ----------
+    name : str
+        Nome da solução.
+    streaming : bool, optional
+        Se a solução processa o arquivo em partes. O padrão é falso.
+    parallel : bool, optional
+        Se a solução usa vários processos ou threads. O padrão é falso.
+    needs_row_count : bool, optional
+        Se a solução precisa do número de linhas do arquivo. O padrão é falso.
+    tunable : Tuple[str, ...], optional
+        Parâmetros de `config` ajustáveis pelo `autotune`. O padrão é nenhum.
+
+    Returns
+    -------
+    Callable[[EngineFunction], EngineFunction]
+        Decorador que registra a função e a retorna sem alterações.
+
+    Raises
+    ------
+    ValueError
+        Se já existir outra função registrada com o mesmo nome.
+
+    Notes
+    -----
+    O nome também deve ser incluído em `ENGINE_MODULES`, para que `get_engine`
+    encontre a solução sem importar os demais módulos.
+
+    Examples
+    --------
+    >>> @register_engine("pandas", streaming=True, parallel=True)
+    ... def run_pandas(path, rows, config):
+    ...     return create_df_with_pandas(path, rows, config.get("chunksize"))
+    """
+
+    def decorator(function: EngineFunction) -> EngineFunction:
+        registered = ENGINES.get(name)
+        # O mesmo módulo pode ser importado de novo como `__main__`
+        if registered is not None and (
+            registered.run.__qualname__ != function.__qualname__
+        ):
+            raise ValueError(f"Solução já registrada: {name}")
+        ENGINES[name] = Engine(
+            name, function, streaming, parallel, needs_row_count, tunable
+        )
+        return function
+
+    return decorator
+
+
+def register_partial(name: str) -> Callable[[PartialFunction], PartialFunction]:
+    """
+    Registra a função que agrega um intervalo de bytes para uma solução.
+
+    Parameters
+    ----------
+    name : str
+        Nome de uma solução já registrada com `register_engine`.
+
+    Returns
+    -------
+    Callable[[PartialFunction], PartialFunction]
+        Decorador que associa a função à solução e a retorna sem alterações.
+
+    Raises
+    ------
+    ValueError
+        Se a solução ainda não estiver registrada.
+
+    Notes
+    -----
+    Usada pela execução distribuída de `sharded.py`, em que cada worker agrega
+    um intervalo do arquivo e o coordenador combina os agregados parciais.
+    """
+
+    def decorator(function: PartialFunction) -> PartialFunction:
+        engine = ENGINES.get(name)
+        if engine is None:
+            raise ValueError(f"Solução não registrada: {name}")
+        ENGINES[name] = replace(engine, partial=function)
+        return function
+
+    return decorator
+
+
+def load_engines() -> Dict[str, Engine]:
+    """
+    Importa os módulos de `ENGINE_MODULES` e retorna as soluções registradas.
+
+    Returns
+    -------
+    Dict[str, Engine]
+        Soluções registradas, pelo nome.
+
+    Notes
+    -----
+    Módulos cujas bibliotecas não estão instaladas são ignorados com um aviso,
+    para que as demais soluções possam ser testadas. Para usar uma única
+    solução, `get_engine` importa apenas o módulo dela.
+    """
+    for module in dict.fromkeys(ENGINE_MODULES.values()):
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"Soluções de {module} indisponíveis: {e}")
+    return ENGINES
+
+
+def get_engine(name: str) -> Engine:
+    """
+    Retorna a solução registrada com o nome informado.
+
+    Parameters
+    ----------
+    name : str
+        Nome da solução.
+
+    Returns
+    -------
+    Engine
+        A solução registrada.
+
+    Raises
+    ------
+    ValueError
+        Se não houver solução com esse nome, ou se as bibliotecas que ela usa
+        não estiverem instaladas.
+
+    Notes
+    -----
+    Somente o módulo da solução, indicado em `ENGINE_MODULES`, é importado.
+    """
+    module = ENGINE_MODULES.get(name)
+    if name not in ENGINES and module is not None:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            raise ValueError(f"Solução {name} indisponível: {e}") from e
+    if name not in ENGINES:
+        available = sorted(set(ENGINE_MODULES) | set(ENGINES))
+        raise ValueError(
+            f"Solução desconhecida: {name}. Disponíveis: {', '.join(available)}."
+        )
+    return ENGINES[name]
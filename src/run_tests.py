@@ -1,57 +1,181 @@
 """Programa para teste com diferentes quantidade de linha."""
 
-from typing import List
+import argparse
+from typing import Any, Dict, List, Optional
 
 from create_measurements import (
-    FILENAME_OUTPUT,
-    build_test_data,
+    DATASET_PROFILES,
+    DEFAULT_DATASET,
     build_weather_station_name_list,
-    estimate_file_size,
 )
-from record_result import record_result
-from solution_datatable import create_df_with_datatable
-from solution_pandas import CHUNKSIZE, create_df_with_pandas
-from solution_polars import create_polars_df_streaming
+from dataset_cache import get_dataset
+from phase_timer import PROFILERS
+from record_result import PAGE_CACHE_MODES, record_engine
+from registry import get_engine, load_engines
+from startup_time import engine_startup_time, format_report
+from verification import NormalizedResult, normalize_result
 
 quantidade_linhas = [100_000 * 10**x for x in range(1, 5)]
 
+
+def parse_config(values: List[str]) -> Dict[str, Any]:
+    """
+    Lê pares `chave=valor` da linha de comando como um dicionário.
+
+    Parameters
+    ----------
+    values : List[str]
+        Pares no formato `chave=valor`. Valores inteiros (aceitando `_`) e
+        booleanos (`true`/`false`) são convertidos.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Configuração repassada às soluções.
+    """
+    config: Dict[str, Any] = {}
+    for item in values:
+        key, _, value = item.partition("=")
+        if value.lower() in ("true", "false"):
+            config[key] = value.lower() == "true"
+        else:
+            try:
+                config[key] = int(value)
+            except ValueError:
+                config[key] = value
+    return config
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Cria o parser da linha de comando."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        help="Soluções a serem testadas (padrão: todas as registradas).",
+    )
+    parser.add_argument(
+        "--rows",
+        nargs="+",
+        type=lambda value: int(value.replace("_", "")),
+        default=quantidade_linhas,
+        help="Quantidades de linhas testadas.",
+    )
+    parser.add_argument(
+        "--config",
+        nargs="*",
+        default=[],
+        help="Parâmetros das soluções no formato chave=valor (ex.: chunksize=1000).",
+    )
+    parser.add_argument(
+        "--reference",
+        help=(
+            "Solução cujo resultado é usado como referência na verificação "
+            "(padrão: a primeira solução testada)."
+        ),
+    )
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--page-cache", choices=PAGE_CACHE_MODES, default="none")
+    parser.add_argument(
+        "--no-profile",
+        action="store_true",
+        help="Ignora a configuração ajustada por `autotune.py`.",
+    )
+    parser.add_argument(
+        "--no-import-time",
+        action="store_true",
+        help="Não mede o tempo de importação das soluções (`startup_time.py`).",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROFILERS,
+        help=(
+            "Captura o perfil de cada solução em uma execução extra, gravado em "
+            "`data/profiles` (`cprofile` ou `sampling`)."
+        ),
+    )
+    parser.add_argument(
+        "--dataset",
+        choices=list(DATASET_PROFILES),
+        default=DEFAULT_DATASET,
+        help=(
+            "Perfil do arquivo gerado: distribuição das estações (`zipf`), "
+            "cardinalidade (`all_stations`), nomes longos (`long_names`), ordem "
+            "das linhas (`sorted`, `bursty`) ou todos juntos (`stress`)."
+        ),
+    )
+    parser.add_argument(
+        "--list", action="store_true", help="Lista as soluções registradas."
+    )
+    return parser
+
+
 if __name__ == "__main__":
 
-    weather_station_names: List[str] = build_weather_station_name_list()
+    args = build_parser().parse_args()
 
-    for quantidade_linha in quantidade_linhas:
-        # Gerando arquivos teste
-        print(estimate_file_size(weather_station_names, quantidade_linha))
-        build_test_data(weather_station_names, quantidade_linha)
+    if args.list:
+        for engine in load_engines().values():
+            print(
+                f"{engine.name}: streaming={engine.streaming} "
+                f"parallel={engine.parallel} needs_row_count={engine.needs_row_count}"
+            )
+        raise SystemExit()
 
-        print("Arquivo de teste finalizado...\n\n")
+    # Sem `--engines`, todas as soluções disponíveis são importadas; com
+    # `--engines`, somente os módulos das soluções escolhidas
+    engine_names: List[str] = args.engines or list(load_engines())
+    if args.reference:
+        # A referência é executada primeiro
+        engine_names = [args.reference] + [
+            name for name in engine_names if name != args.reference
+        ]
+    selected = [get_engine(name) for name in engine_names]
+    config: Dict[str, Any] = parse_config(args.config)
 
-        print(f"Iniciando testes com {quantidade_linha:,}...\n\n")
+    # Tempo de importação de cada solução, medido em um interpretador novo
+    startup: Dict[str, Optional[float]] = {}
+    for engine in selected:
+        startup[engine.name] = None
+        if not args.no_import_time:
+            try:
+                report = engine_startup_time(engine.name)
+            except (KeyError, RuntimeError) as e:
+                print(f"Tempo de importação de {engine.name} indisponível: {e}")
+            else:
+                print(format_report(report))
+                startup[engine.name] = report.import_s
 
-        record_result(
-            "pandas",
-            quantidade_linha,
-            create_df_with_pandas,
-            filename=FILENAME_OUTPUT,
-            total_linhas=quantidade_linha,
-            chunksize=CHUNKSIZE,
-        )
+    weather_station_names: List[str] = build_weather_station_name_list()
 
-        record_result(
-            "Polars",
+    for quantidade_linha in args.rows:
+        # Gerando arquivos teste (ou reaproveitando os do cache)
+        filename = get_dataset(
             quantidade_linha,
-            create_polars_df_streaming,
-            filename=FILENAME_OUTPUT,
-            chunksize=CHUNKSIZE,
+            weather_station_names=weather_station_names,
+            dataset=args.dataset,
         )
 
-        record_result(
-            "datatable",
-            quantidade_linha,
-            create_df_with_datatable,
-            filename=FILENAME_OUTPUT,
-            total_linhas=quantidade_linha,
-            chunksize=CHUNKSIZE,
-        )
+        print("Arquivo de teste finalizado...\n\n")
+
+        print(f"Iniciando testes com {quantidade_linha:,}...\n\n")
+
+        reference: Optional[NormalizedResult] = None
+        for engine in selected:
+            result = record_engine(
+                engine,
+                filename,
+                quantidade_linha,
+                config,
+                repeticoes=args.repeticoes,
+                page_cache=args.page_cache,
+                reference=reference,
+                use_profile=not args.no_profile,
+                startup_s=startup[engine.name],
+                profile=args.profile,
+                dataset=args.dataset,
+            )
+            if reference is None:
+                reference = normalize_result(result)
 
         print(f"Finalizando testes com {quantidade_linha:,}...\n\n")
@@ -0,0 +1,554 @@
+"""Curvas de escala das soluções e detecção de regressões com o histórico."""
+
+import contextlib
+import io
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from autotune import CHUNKSIZE_CANDIDATES, concurrency_candidates
+from create_measurements import (
+    DATASET_PROFILES,
+    DEFAULT_DATASET,
+    build_weather_station_name_list,
+)
+from dataset_cache import get_dataset
+from record_result import FILENAME_RESULTS_DETAILED, load_results, record_engine
+from registry import Engine, get_engine, load_engines
+from settings import BASE_DIR
+
+# Quantidades de linhas da curva de escala
+ROWS_CANDIDATES: List[int] = [100_000, 1_000_000, 10_000_000]
+
+REPETITIONS: int = 3
+
+# Número mínimo de medições anteriores para comparar um ponto com o histórico
+MIN_HISTORY: int = 3
+
+# Um ponto é uma regressão se estiver a mais de `Z_THRESHOLD` desvios robustos
+# acima da mediana do histórico e for pelo menos `MIN_SLOWDOWN` mais lento
+Z_THRESHOLD: float = 3.0
+MIN_SLOWDOWN: float = 0.10
+
+# Fator entre o desvio absoluto mediano e o desvio padrão de uma normal
+MAD_TO_STDEV: float = 1.4826
+
+# Desvio mínimo, como fração da mediana, para que históricos quase constantes
+# não transformem variações pequenas em regressões
+NOISE_FLOOR: float = 0.02
+
+REPORT_FILE: Path = BASE_DIR / "../data/scaling_report.json"
+
+
+class Comparison(NamedTuple):
+    """
+    Comparação de um ponto medido com o histórico.
+
+    Attributes
+    ----------
+    engine : str
+        Nome da solução.
+    rows : int
+        Número de linhas do arquivo.
+    config : Dict[str, Any]
+        Configuração da solução.
+    wall_s : float
+        Mediana do tempo das repetições, em segundos.
+    baseline_s : float, optional
+        Mediana do tempo no histórico. `None` sem histórico suficiente.
+    history : int
+        Número de medições anteriores com a mesma solução, linhas e configuração.
+    z_score : float, optional
+        Distância até `baseline_s` em desvios robustos.
+    slowdown : float, optional
+        Variação relativa do tempo (`0.1` é 10% mais lento).
+    status : str
+        `regressão`, `melhora`, `estável` ou `sem histórico`.
+    """
+
+    engine: str
+    rows: int
+    config: Dict[str, Any]
+    wall_s: float
+    baseline_s: Optional[float]
+    history: int
+    z_score: Optional[float]
+    slowdown: Optional[float]
+    status: str
+
+
+def sweep_points(
+    engine: Engine, rows_candidates: Sequence[int]
+) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    Lista os pontos medidos para uma solução.
+
+    Parameters
+    ----------
+    engine : Engine
+        Solução medida.
+    rows_candidates : Sequence[int]
+        Quantidades de linhas da curva de escala.
+
+    Returns
+    -------
+    List[Tuple[int, Dict[str, Any]]]
+        Pares `(linhas, config)`: cada quantidade de linhas com a configuração
+        padrão e, no maior arquivo, cada número de processos e cada tamanho de
+        chunk ajustáveis pela solução (`engine.tunable`), um parâmetro por vez.
+    """
+    largest: int = max(rows_candidates)
+    points: List[Tuple[int, Dict[str, Any]]] = [
+        (rows, {}) for rows in sorted(rows_candidates)
+    ]
+    if "concurrency" in engine.tunable:
+        points += [
+            (largest, {"concurrency": concurrency})
+            for concurrency in concurrency_candidates()
+        ]
+    if "chunksize" in engine.tunable:
+        points += [
+            (largest, {"chunksize": chunksize})
+            for chunksize in CHUNKSIZE_CANDIDATES
+            if chunksize < largest
+        ]
+    return points
+
+
+def last_detailed_record(filename: Path = FILENAME_RESULTS_DETAILED) -> dict:
+    """Lê o último registro gravado por `record_result` no formato detalhado."""
+    with open(filename, "r", encoding="utf-8") as file:
+        lines = [line for line in file if line.strip()]
+    return json.loads(lines[-1])
+
+
+def measure_point(
+    engine: Engine,
+    filename: Path,
+    rows: int,
+    config: Dict[str, Any],
+    repetitions: int = REPETITIONS,
+    dataset: str = DEFAULT_DATASET,
+) -> dict:
+    """
+    Mede um ponto com `record_engine`, acrescentando-o ao histórico.
+
+    Parameters
+    ----------
+    engine : Engine
+        Solução medida.
+    filename : Path
+        Arquivo de medições.
+    rows : int
+        Número de linhas do arquivo.
+    config : Dict[str, Any]
+        Configuração da solução. O perfil do `autotune` não é usado, para que os
+        pontos sejam comparáveis entre máquinas e execuções.
+    repetitions : int, optional
+        Número de execuções. O padrão é `REPETITIONS`.
+    dataset : str, optional
+        Perfil do arquivo de medições. O padrão é `"uniform"`.
+
+    Returns
+    -------
+    dict
+        Registro gravado em `FILENAME_RESULTS_DETAILED`.
+    """
+    # As soluções imprimem o resultado, o que não interessa na varredura
+    with contextlib.redirect_stdout(io.StringIO()):
+        record_engine(
+            engine,
+            filename,
+            rows,
+            config,
+            repeticoes=repetitions,
+            use_profile=False,
+            dataset=dataset,
+        )
+    return last_detailed_record()
+
+
+def history_times(
+    history: List[dict],
+    engine: str,
+    rows: int,
+    config: Dict[str, Any],
+    dataset: str = DEFAULT_DATASET,
+) -> List[float]:
+    """
+    Seleciona os tempos anteriores comparáveis com um ponto.
+
+    Parameters
+    ----------
+    history : List[dict]
+        Registros de `load_results`, lidos antes da varredura.
+    engine : str
+        Nome da solução. A comparação ignora maiúsculas, pois o formato original
+        de `solution_results.csv` usava nomes como `Polars`.
+    rows : int
+        Número de linhas.
+    config : Dict[str, Any]
+        Configuração. Registros do formato original não têm configuração e são
+        comparados somente com a configuração padrão (`{}`).
+    dataset : str, optional
+        Perfil do arquivo de medições. Registros sem perfil foram medidos com o
+        perfil padrão, `"uniform"`.
+
+    Returns
+    -------
+    List[float]
+        Mediana do tempo de cada registro anterior.
+    """
+    return [
+        record["wall_s_median"]
+        for record in history
+        if record["library"].lower() == engine.lower()
+        and record["rows"] == rows
+        and (record.get("config") or {}) == config
+        and record.get("dataset", DEFAULT_DATASET) == dataset
+        and record.get("wall_s_median") is not None
+    ]
+
+
+def compare_to_history(
+    engine: str,
+    rows: int,
+    config: Dict[str, Any],
+    runs: List[float],
+    history: List[float],
+) -> Comparison:
+    """
+    Compara as repetições de um ponto com os tempos anteriores.
+
+    Parameters
+    ----------
+    engine : str
+        Nome da solução.
+    rows : int
+        Número de linhas.
+    config : Dict[str, Any]
+        Configuração da solução.
+    runs : List[float]
+        Tempo de cada repetição do ponto, em segundos.
+    history : List[float]
+        Tempos anteriores do mesmo ponto, de `history_times`.
+
+    Returns
+    -------
+    Comparison
+        Resultado da comparação.
+
+    Notes
+    -----
+    - A referência é a mediana do histórico, e a dispersão é o maior valor
+      entre o desvio absoluto mediano do histórico (em escala de desvio padrão),
+      o desvio padrão das repetições atuais e `NOISE_FLOOR` da mediana. Medidas
+      robustas evitam que uma execução anômala no histórico esconda regressões.
+    - Uma regressão exige as duas condições: estar a mais de `Z_THRESHOLD`
+      desvios da mediana e ser pelo menos `MIN_SLOWDOWN` mais lenta, para que
+      variações pequenas em históricos estáveis não falhem a execução.
+    """
+    wall_s: float = statistics.median(runs)
+    if len(history) < MIN_HISTORY:
+        return Comparison(
+            engine,
+            rows,
+            config,
+            wall_s,
+            None,
+            len(history),
+            None,
+            None,
+            "sem histórico",
+        )
+
+    baseline: float = statistics.median(history)
+    mad: float = statistics.median(abs(value - baseline) for value in history)
+    spread: float = max(
+        MAD_TO_STDEV * mad,
+        statistics.stdev(runs) if len(runs) > 1 else 0.0,
+        NOISE_FLOOR * baseline,
+    )
+    z_score: float = (wall_s - baseline) / spread
+    slowdown: float = wall_s / baseline - 1
+
+    if z_score > Z_THRESHOLD and slowdown > MIN_SLOWDOWN:
+        status = "regressão"
+    elif z_score < -Z_THRESHOLD and slowdown < -MIN_SLOWDOWN:
+        status = "melhora"
+    else:
+        status = "estável"
+    return Comparison(
+        engine, rows, config, wall_s, baseline, len(history), z_score, slowdown, status
+    )
+
+
+def fit_row_scaling(points: List[Tuple[int, float]]) -> Dict[str, float]:
+    """
+    Ajusta a curva do tempo em função do número de linhas.
+
+    Parameters
+    ----------
+    points : List[Tuple[int, float]]
+        Pares `(linhas, tempo em segundos)` com a configuração padrão.
+
+    Returns
+    -------
+    Dict[str, float]
+        `ns_per_row` (inclinação da reta `tempo = overhead + custo * linhas`),
+        `overhead_s` (intercepto, custo fixo como importações e processos) e
+        `exponent` (inclinação em escala log-log; 1 é escala linear). Vazio com
+        menos de duas quantidades de linhas.
+    """
+    if len({rows for rows, _ in points}) < 2:
+        return {}
+    rows = np.array([rows for rows, _ in points], dtype=np.float64)
+    wall = np.array([wall for _, wall in points], dtype=np.float64)
+    slope, intercept = np.polyfit(rows, wall, 1)
+    exponent: float = np.polyfit(np.log(rows), np.log(wall), 1)[0]
+    return {
+        "ns_per_row": float(slope * 1e9),
+        "overhead_s": float(intercept),
+        "exponent": float(exponent),
+    }
+
+
+def parallel_efficiency(points: List[Tuple[int, float]]) -> Dict[int, float]:
+    """
+    Calcula a eficiência paralela de cada número de processos.
+
+    Parameters
+    ----------
+    points : List[Tuple[int, float]]
+        Pares `(processos, tempo em segundos)` no mesmo arquivo.
+
+    Returns
+    -------
+    Dict[int, float]
+        Aceleração em relação ao menor número de processos medido, dividida pelo
+        aumento do número de processos (1 é escala perfeita).
+    """
+    if not points:
+        return {}
+    base_concurrency, base_wall = min(points)
+    return {
+        concurrency: (base_wall / wall) / (concurrency / base_concurrency)
+        for concurrency, wall in sorted(points)
+    }
+
+
+def summarize_engine(comparisons: List[Comparison]) -> Dict[str, Any]:
+    """Resume as curvas de escala de uma solução a partir dos seus pontos."""
+    default = [(item.rows, item.wall_s) for item in comparisons if not item.config]
+    largest: int = max(item.rows for item in comparisons)
+    by_concurrency = [
+        (item.config["concurrency"], item.wall_s)
+        for item in comparisons
+        if item.rows == largest and set(item.config) == {"concurrency"}
+    ]
+    by_chunksize = [
+        (item.config["chunksize"], item.wall_s)
+        for item in comparisons
+        if item.rows == largest and set(item.config) == {"chunksize"}
+    ]
+    return {
+        "rows": fit_row_scaling(default),
+        "parallel_efficiency": parallel_efficiency(by_concurrency),
+        "best_chunksize": (
+            min(by_chunksize, key=lambda item: item[1])[0] if by_chunksize else None
+        ),
+    }
+
+
+def format_report(
+    comparisons: List[Comparison], curves: Dict[str, Dict[str, Any]]
+) -> str:
+    """
+    Formata o relatório como uma tabela de texto.
+
+    Parameters
+    ----------
+    comparisons : List[Comparison]
+        Pontos medidos e comparados.
+    curves : Dict[str, Dict[str, Any]]
+        Resultado de `summarize_engine` para cada solução.
+
+    Returns
+    -------
+    str
+        Uma linha por ponto e um resumo das curvas de cada solução.
+    """
+    header = (
+        f"{'solução':<22} {'linhas':>12} {'config':<22} {'tempo':>9} "
+        f"{'ns/linha':>9} {'histórico':>14} {'variação':>9} {'z':>6}  status"
+    )
+    lines: List[str] = [header, "-" * len(header)]
+    for item in comparisons:
+        config: str = ",".join(f"{key}={value}" for key, value in item.config.items())
+        history: str = (
+            f"{item.baseline_s:.3f}s (n={item.history})"
+            if item.baseline_s is not None
+            else f"n={item.history}"
+        )
+        slowdown: str = f"{item.slowdown:+.1%}" if item.slowdown is not None else "-"
+        z_score: str = f"{item.z_score:+.1f}" if item.z_score is not None else "-"
+        lines.append(
+            f"{item.engine:<22} {item.rows:>12,} {config or 'padrão':<22} "
+            f"{item.wall_s:>8.3f}s {item.wall_s / item.rows * 1e9:>9.0f} "
+            f"{history:>14} {slowdown:>9} {z_score:>6}  {item.status}"
+        )
+
+    lines.append("")
+    for engine, curve in curves.items():
+        parts: List[str] = []
+        if curve["rows"]:
+            parts.append(
+                f"{curve['rows']['ns_per_row']:.0f} ns/linha + "
+                f"{curve['rows']['overhead_s']:.3f}s fixo, "
+                f"expoente {curve['rows']['exponent']:.2f}"
+            )
+        if curve["parallel_efficiency"]:
+            parts.append(
+                "eficiência "
+                + ", ".join(
+                    f"{concurrency}p {efficiency:.0%}"
+                    for concurrency, efficiency in curve["parallel_efficiency"].items()
+                )
+            )
+        if curve["best_chunksize"] is not None:
+            parts.append(f"melhor chunksize {curve['best_chunksize']:,}")
+        lines.append(f"{engine}: {'; '.join(parts) or 'pontos insuficientes'}")
+    return "\n".join(lines)
+
+
+def run_benchmark(
+    engine_names: List[str],
+    rows_candidates: Sequence[int] = ROWS_CANDIDATES,
+    repetitions: int = REPETITIONS,
+    report_file: Path = REPORT_FILE,
+    dataset: str = DEFAULT_DATASET,
+) -> List[Comparison]:
+    """
+    Mede as curvas de escala das soluções e compara cada ponto com o histórico.
+
+    Parameters
+    ----------
+    engine_names : List[str]
+        Soluções medidas.
+    rows_candidates : Sequence[int], optional
+        Quantidades de linhas. O padrão é `ROWS_CANDIDATES`.
+    repetitions : int, optional
+        Execuções de cada ponto. O padrão é `REPETITIONS`.
+    report_file : Path, optional
+        Arquivo JSON do relatório. O padrão é `REPORT_FILE`.
+    dataset : str, optional
+        Perfil dos arquivos de medições, em `create_measurements.DATASET_PROFILES`.
+        Cada perfil tem o seu próprio histórico. O padrão é `"uniform"`.
+
+    Returns
+    -------
+    List[Comparison]
+        Comparação de cada ponto com o histórico.
+
+    Notes
+    -----
+    O histórico é lido antes da varredura, portanto os pontos medidos agora não
+    entram na sua própria referência, mas ficam gravados em
+    `solution_results.csv` e `solution_results.jsonl` para as próximas execuções.
+    """
+    history: List[dict] = load_results()
+    weather_station_names: List[str] = build_weather_station_name_list()
+    engines: List[Engine] = [get_engine(name) for name in engine_names]
+    comparisons: List[Comparison] = []
+
+    for rows in sorted(rows_candidates):
+        filename: Path = get_dataset(
+            rows, weather_station_names=weather_station_names, dataset=dataset
+        )
+        for engine in engines:
+            for point_rows, config in sweep_points(engine, rows_candidates):
+                if point_rows != rows:
+                    continue
+                record = measure_point(
+                    engine, filename, rows, config, repetitions, dataset
+                )
+                comparison = compare_to_history(
+                    engine.name,
+                    rows,
+                    config,
+                    [run["wall_s"] for run in record["runs"]],
+                    history_times(history, engine.name, rows, config, dataset),
+                )
+                print(
+                    f"{engine.name} {rows:,} {config or 'padrão'}: "
+                    f"{comparison.wall_s:.3f}s ({comparison.status})"
+                )
+                comparisons.append(comparison)
+
+    curves: Dict[str, Dict[str, Any]] = {
+        engine.name: summarize_engine(
+            [item for item in comparisons if item.engine == engine.name]
+        )
+        for engine in engines
+    }
+    print(format_report(comparisons, curves))
+
+    with open(report_file, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+                "dataset": dataset,
+                "z_threshold": Z_THRESHOLD,
+                "min_slowdown": MIN_SLOWDOWN,
+                "points": [item._asdict() for item in comparisons],
+                "curves": curves,
+            },
+            file,
+            indent=2,
+        )
+    return comparisons
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        help="Soluções medidas (padrão: todas as registradas).",
+    )
+    parser.add_argument(
+        "--rows",
+        nargs="+",
+        type=lambda value: int(value.replace("_", "")),
+        default=ROWS_CANDIDATES,
+        help="Quantidades de linhas da curva de escala.",
+    )
+    parser.add_argument("--repeticoes", type=int, default=REPETITIONS)
+    parser.add_argument(
+        "--dataset",
+        choices=list(DATASET_PROFILES),
+        default=DEFAULT_DATASET,
+        help="Perfil dos arquivos de medições (padrão: uniform).",
+    )
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        args.engines or list(load_engines()),
+        args.rows,
+        args.repeticoes,
+        dataset=args.dataset,
+    )
+    regressions = [item for item in results if item.status == "regressão"]
+    for item in regressions:
+        print(
+            f"Regressão: {item.engine} com {item.rows:,} linhas ({item.config or 'padrão'}): "
+            f"{item.slowdown:+.1%} em relação à mediana de {item.history} execuções."
+        )
+    # Código de saída diferente de zero quando alguma solução ficou mais lenta
+    raise SystemExit(1 if regressions else 0)
@@ -0,0 +1,10 @@
+"""Caminhos e parâmetros compartilhados, sem dependências externas."""
+
+from pathlib import Path
+
+# Parâmetros para Criação do Arquivo Teste
+NUM_ROWS_TO_CREATE: int = 1_000_000_000
+BASE_DIR: Path = Path(__file__).parent.resolve()
+
+FILENAME_INPUT: Path = BASE_DIR / "../data/weather_stations.csv"
+FILENAME_OUTPUT: Path = BASE_DIR / "../data/measurements.txt"
@@ -0,0 +1,615 @@
+"""Execução distribuída: um coordenador divide o arquivo em shards entre workers."""
+
+import os
+import random
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import cpu_count, get_context
+from multiprocessing.connection import Client, Listener
+from multiprocessing.context import AuthenticationError
+from pathlib import Path
+from queue import Queue
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from aggregate import StationAggregate
+from binary_format import is_binary_file
+from phase_timer import WorkerPhases, phase, worker_result
+from registry import get_engine, register_engine
+from settings import FILENAME_OUTPUT
+from solution_mmap import find_chunk_boundaries
+
+CONCURRENCY: int = cpu_count()
+
+# Solução executada em cada shard quando nenhuma é informada
+DEFAULT_ENGINE: str = "mmap_fixed_point"
+
+# Shards por worker: mais de um equilibra a carga entre workers de velocidades
+# diferentes e reduz o trabalho refeito quando um worker falha
+SHARDS_PER_WORKER: int = 4
+
+# Tentativas de cada shard antes de desistir da execução
+MAX_ATTEMPTS: int = 3
+
+# Variável de ambiente com a chave compartilhada entre o coordenador e os
+# workers remotos. As mensagens são serializadas com pickle, portanto os
+# workers só devem aceitar conexões de coordenadores confiáveis
+AUTHKEY_ENV: str = "SHARDED_AUTHKEY"
+
+# Tempo máximo de espera pelo início dos workers locais, em segundos
+STARTUP_TIMEOUT: float = 30.0
+
+# Endereço de um worker: caminho de um socket Unix ou `(host, porta)`
+Address = Union[str, Tuple[str, int]]
+
+
+class ShardTask(NamedTuple):
+    """
+    Shard enviado a um worker.
+
+    Attributes
+    ----------
+    shard : int
+        Índice do shard.
+    engine : str
+        Solução do registro executada no shard.
+    filename : str
+        Caminho do arquivo, visível pelo worker.
+    start, end : int
+        Intervalo de bytes do shard, alinhado com o fim das linhas.
+    config : Dict[str, Any]
+        Parâmetros da solução.
+    fail : bool
+        Se verdadeiro, o worker simula uma queda: o processo termina sem
+        responder.
+    """
+
+    shard: int
+    engine: str
+    filename: str
+    start: int
+    end: int
+    config: Dict[str, Any]
+    fail: bool = False
+
+
+def run_shard(task: ShardTask) -> StationAggregate:
+    """
+    Agrega um shard com a função parcial da solução escolhida.
+
+    Parameters
+    ----------
+    task : ShardTask
+        Shard a ser processado.
+
+    Returns
+    -------
+    StationAggregate
+        Agregado parcial do shard.
+
+    Raises
+    ------
+    ValueError
+        Se a solução não registrar uma função parcial com `register_partial`.
+    """
+    engine = get_engine(task.engine)
+    if engine.partial is None:
+        raise ValueError(f"A solução {task.engine} não aceita execução por shards.")
+    return engine.partial(Path(task.filename), task.start, task.end, task.config)
+
+
+def parse_address(text: str) -> Address:
+    """Lê um endereço `host:porta` ou o caminho de um socket Unix."""
+    host, separator, port = text.rpartition(":")
+    if separator and port.isdigit():
+        return host or "localhost", int(port)
+    return text
+
+
+def serve_worker(address: Address, authkey: bytes, threads: int = 1) -> None:
+    """
+    Atende shards enviados pelo coordenador até receber o pedido de parada.
+
+    Parameters
+    ----------
+    address : Address
+        Endereço em que o worker escuta.
+    authkey : bytes
+        Chave compartilhada com o coordenador.
+    threads : int, optional
+        Número de threads das bibliotecas usadas pelas soluções. O padrão é 1,
+        pois o paralelismo vem do número de workers.
+
+    Notes
+    -----
+    - Cada conexão traz um `ShardTask` e recebe `(True, WorkerResult)`, com o
+      agregado e as fases medidas no worker, ou `(False, mensagem de erro)`.
+      `None` encerra o worker.
+    - Um shard com `fail` faz o processo do worker terminar com `os._exit`, sem
+      responder, como se tivesse caído no meio do processamento; o coordenador
+      tira o worker da fila (ou o reinicia, se for local) e repete o shard.
+    - As soluções são importadas somente quando o primeiro shard chega, depois
+      de limitar os threads do Polars.
+    """
+    os.environ.setdefault("POLARS_MAX_THREADS", str(threads))
+    with Listener(address, authkey=authkey) as listener:
+        while True:
+            try:
+                connection = listener.accept()
+            except (AuthenticationError, EOFError, OSError):
+                continue
+            with connection:
+                try:
+                    task: Optional[ShardTask] = connection.recv()
+                except (EOFError, OSError):
+                    continue
+                if task is None:
+                    return
+                if task.fail:
+                    os._exit(1)
+                try:
+                    reply: Tuple[bool, Any] = (True, WorkerPhases(run_shard)(task))
+                except Exception as e:
+                    reply = (False, f"{type(e).__name__}: {e}")
+                connection.send(reply)
+
+
+def send_task(
+    address: Address, authkey: bytes, task: Optional[ShardTask]
+) -> Tuple[bool, Any]:
+    """Envia um shard (ou o pedido de parada) a um worker e espera a resposta."""
+    with Client(address, authkey=authkey) as connection:
+        connection.send(task)
+        if task is None:
+            return True, None
+        return connection.recv()
+
+
+def is_worker_alive(address: Address, authkey: bytes) -> bool:
+    """Verifica se o worker aceita conexões, sem enviar nenhum shard."""
+    try:
+        with Client(address, authkey=authkey):
+            return True
+    except (AuthenticationError, EOFError, OSError):
+        return False
+
+
+class WorkerRotation:
+    """
+    Fila dos workers livres, da qual os workers que caíram são retirados.
+
+    Parameters
+    ----------
+    addresses : List[Address]
+        Endereços dos workers.
+    replace : Callable[[Address], Optional[Address]], optional
+        Chamada com o endereço de um worker que falhou; retorna o endereço que
+        volta para a fila (o mesmo, se o worker ainda responde ou foi
+        reiniciado) ou `None` para retirá-lo. Por padrão, o worker é retirado.
+
+    Notes
+    -----
+    Quando o último worker é retirado, os threads que esperam por um worker
+    recebem um `RuntimeError` em vez de esperar para sempre.
+    """
+
+    def __init__(
+        self,
+        addresses: List[Address],
+        replace: Optional[Callable[[Address], Optional[Address]]] = None,
+    ) -> None:
+        """Coloca todos os workers na fila."""
+        self._queue: "Queue[Optional[Address]]" = Queue()
+        for address in addresses:
+            self._queue.put(address)
+        self._alive: int = len(addresses)
+        self._lock = threading.Lock()
+        self._replace = replace
+
+    def acquire(self) -> Address:
+        """Retira um worker livre da fila, esperando se necessário."""
+        address = self._queue.get()
+        if address is None:
+            self._queue.put(None)
+            raise RuntimeError("Nenhum worker disponível.")
+        return address
+
+    def release(self, address: Address) -> None:
+        """Devolve à fila um worker que respondeu."""
+        self._queue.put(address)
+
+    def fail(self, address: Address) -> None:
+        """Substitui ou retira da fila um worker que falhou."""
+        replacement = None if self._replace is None else self._replace(address)
+        if replacement is not None:
+            self._queue.put(replacement)
+            return
+        print(f"Worker {address} retirado da fila.")
+        with self._lock:
+            self._alive -= 1
+            if self._alive == 0:
+                self._queue.put(None)
+
+
+def run_remote_shard(
+    task: ShardTask, workers: WorkerRotation, authkey: bytes, failures: int
+) -> Tuple[StationAggregate, int]:
+    """
+    Processa um shard em um worker livre, repetindo-o em caso de falha.
+
+    Parameters
+    ----------
+    task : ShardTask
+        Shard a ser processado.
+    workers : WorkerRotation
+        Fila dos workers livres. O worker usado volta para a fila quando
+        responde; se a conexão falhar, ele é substituído ou retirado.
+    authkey : bytes
+        Chave compartilhada com os workers.
+    failures : int
+        Número de tentativas iniciais em que o worker deve simular uma falha.
+
+    Returns
+    -------
+    Tuple[StationAggregate, int]
+        Agregado parcial do shard e o número de tentativas usadas.
+
+    Raises
+    ------
+    RuntimeError
+        Se o shard falhar `MAX_ATTEMPTS` vezes, se não restar nenhum worker, ou
+        se a solução falhar no worker (um erro da solução se repetiria em
+        qualquer worker).
+    """
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        address = workers.acquire()
+        try:
+            ok, result = send_task(
+                address, authkey, task._replace(fail=attempt <= failures)
+            )
+        except (EOFError, OSError) as e:
+            print(
+                f"Shard {task.shard} falhou no worker {address} "
+                f"(tentativa {attempt}): {type(e).__name__}"
+            )
+            workers.fail(address)
+            continue
+        workers.release(address)
+        if not ok:
+            raise RuntimeError(f"Shard {task.shard} falhou no worker: {result}")
+        return worker_result(result), attempt
+    raise RuntimeError(f"Shard {task.shard} falhou {MAX_ATTEMPTS} vezes.")
+
+
+def plan_failures(num_shards: int, failure_rate: float, seed: int) -> List[int]:
+    """
+    Sorteia quantas falhas simuladas cada shard sofre antes de ser processado.
+
+    Parameters
+    ----------
+    num_shards : int
+        Número de shards.
+    failure_rate : float
+        Probabilidade de cada tentativa falhar, entre 0 e 1.
+    seed : int
+        Semente do sorteio, para execuções reproduzíveis.
+
+    Returns
+    -------
+    List[int]
+        Número de falhas de cada shard, no máximo `MAX_ATTEMPTS - 1`, para que a
+        última tentativa sempre chegue à solução.
+    """
+    rng = random.Random(seed)
+    failures: List[int] = []
+    for _ in range(num_shards):
+        count: int = 0
+        while count < MAX_ATTEMPTS - 1 and rng.random() < failure_rate:
+            count += 1
+        failures.append(count)
+    return failures
+
+
+def coordinate(
+    filename: Path,
+    addresses: List[Address],
+    authkey: bytes,
+    engine: str = DEFAULT_ENGINE,
+    num_shards: Optional[int] = None,
+    config: Optional[Dict[str, Any]] = None,
+    failure_rate: float = 0.0,
+    seed: int = 0,
+    replace: Optional[Callable[[Address], Optional[Address]]] = None,
+) -> StationAggregate:
+    """
+    Distribui os shards do arquivo entre os workers e combina os agregados.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho do arquivo de medições em texto, visível por todos os workers.
+    addresses : List[Address]
+        Endereços dos workers.
+    authkey : bytes
+        Chave compartilhada com os workers.
+    engine : str, optional
+        Solução executada em cada shard. O padrão é `DEFAULT_ENGINE`.
+    num_shards : int, optional
+        Número de shards. O padrão é `SHARDS_PER_WORKER` por worker.
+    config : Dict[str, Any], optional
+        Parâmetros da solução de cada shard.
+    failure_rate : float, optional
+        Probabilidade de cada tentativa simular a queda do worker. O padrão é 0.
+    seed : int, optional
+        Semente do sorteio das falhas. O padrão é 0.
+    replace : Callable[[Address], Optional[Address]], optional
+        Chamada com o endereço de um worker cuja conexão falhou (veja
+        `WorkerRotation`). O padrão é manter o worker somente se ele ainda
+        aceitar conexões.
+
+    Returns
+    -------
+    StationAggregate
+        Agregado de todo o arquivo.
+
+    Raises
+    ------
+    ValueError
+        Se o arquivo estiver no formato binário colunar, que não é dividido em
+        intervalos de bytes de texto.
+
+    Notes
+    -----
+    - Somente `(arquivo, início, fim)` é enviado aos workers, que leem o próprio
+      shard; de volta vem apenas o agregado parcial serializado.
+    - Um thread por worker envia os shards, portanto workers mais rápidos
+      recebem mais shards, e um shard que falhou é repetido no próximo worker
+      livre. Um worker que caiu não recebe mais shards, a menos que `replace`
+      o reinicie.
+    """
+    if is_binary_file(filename):
+        raise ValueError("A execução por shards aceita apenas arquivos de texto.")
+
+    shards = find_chunk_boundaries(
+        filename, num_shards or SHARDS_PER_WORKER * len(addresses)
+    )
+    failures = plan_failures(len(shards), failure_rate, seed)
+    tasks = [
+        ShardTask(
+            index, engine, str(Path(filename).resolve()), start, end, config or {}
+        )
+        for index, (start, end) in enumerate(shards)
+    ]
+
+    if replace is None:
+
+        def replace(address: Address) -> Optional[Address]:
+            return address if is_worker_alive(address, authkey) else None
+
+    workers = WorkerRotation(addresses, replace)
+    with ThreadPoolExecutor(len(addresses)) as executor, phase("wait"):
+        results = list(
+            executor.map(
+                lambda task: run_remote_shard(
+                    task, workers, authkey, failures[task.shard]
+                ),
+                tasks,
+            )
+        )
+
+    retries: int = sum(attempts - 1 for _, attempts in results)
+    print(
+        f"{len(shards)} shards em {len(addresses)} workers com {engine}; "
+        f"{retries} repetidos após falhas."
+    )
+    with phase("merge"):
+        return StationAggregate.merge_all([aggregate for aggregate, _ in results])
+
+
+def wait_for_workers(addresses: List[str], processes: List[Any]) -> None:
+    """Espera os sockets dos workers locais serem criados."""
+    deadline: float = time.monotonic() + STARTUP_TIMEOUT
+    for address, process in zip(addresses, processes):
+        while not os.path.exists(address):
+            if not process.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"O worker {address} não iniciou.")
+            time.sleep(0.01)
+
+
+def start_local_worker(context: Any, address: str, authkey: bytes) -> Any:
+    """
+    Inicia um worker local escutando no socket Unix `address`.
+
+    Parameters
+    ----------
+    context : Any
+        Contexto do `multiprocessing` usado para criar o processo.
+    address : str
+        Caminho do socket. Um socket deixado por um worker que caiu é removido.
+    authkey : bytes
+        Chave compartilhada com o coordenador.
+
+    Returns
+    -------
+    Any
+        Processo iniciado.
+    """
+    if os.path.exists(address):
+        os.unlink(address)
+    process = context.Process(target=serve_worker, args=(address, authkey))
+    process.start()
+    return process
+
+
+def create_df_with_shards(
+    filename: Path,
+    engine: str = DEFAULT_ENGINE,
+    num_workers: int = CONCURRENCY,
+    num_shards: Optional[int] = None,
+    config: Optional[Dict[str, Any]] = None,
+    failure_rate: float = 0.0,
+    seed: int = 0,
+    addresses: Optional[List[Address]] = None,
+) -> Dict[str, Tuple[float, float, float]]:
+    """
+    Processa o arquivo com um coordenador e workers que executam uma solução.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho do arquivo de medições em texto.
+    engine : str, optional
+        Solução do registro executada em cada shard (precisa de uma função
+        parcial). O padrão é `DEFAULT_ENGINE`.
+    num_workers : int, optional
+        Número de workers locais. O padrão é o número de CPUs disponíveis.
+        Ignorado quando `addresses` é informado.
+    num_shards : int, optional
+        Número de shards. O padrão é `SHARDS_PER_WORKER` por worker.
+    config : Dict[str, Any], optional
+        Parâmetros da solução de cada shard. Por padrão, cada worker usa um
+        thread (`concurrency = 1`).
+    failure_rate : float, optional
+        Probabilidade de cada tentativa simular a queda do worker. O padrão é 0.
+    seed : int, optional
+        Semente do sorteio das falhas. O padrão é 0.
+    addresses : List[Address], optional
+        Endereços de workers já iniciados com `python sharded.py worker`, que
+        usam a chave da variável `SHARDED_AUTHKEY`. Por padrão, os workers são
+        processos locais escutando em sockets Unix temporários.
+
+    Returns
+    -------
+    Dict[str, Tuple[float, float, float]]
+        Dicionário ordenado pelo nome da estação com a tupla
+        `(mínimo, máximo, média)` de cada estação.
+
+    Notes
+    -----
+    - O paralelismo vem de processos independentes, cada um com uma única
+      thread, e não do pool de threads de uma biblioteca. Os mesmos workers
+      podem rodar em outras máquinas com o arquivo em um sistema de arquivos
+      compartilhado.
+    - Um worker local que cai é reiniciado no mesmo socket; um worker remoto
+      que cai é retirado da fila.
+    """
+    config = {"concurrency": 1, **(config or {})}
+    if addresses:
+        authkey: bytes = os.environ[AUTHKEY_ENV].encode()
+        aggregate = coordinate(
+            filename, addresses, authkey, engine, num_shards, config, failure_rate, seed
+        )
+    else:
+        if get_engine(engine).partial is None:
+            raise ValueError(f"A solução {engine} não aceita execução por shards.")
+        authkey = secrets.token_bytes(16)
+        context = get_context("spawn")
+        with tempfile.TemporaryDirectory() as directory:
+            sockets: List[str] = [
+                os.path.join(directory, f"worker-{index}.sock")
+                for index in range(num_workers)
+            ]
+            processes = [
+                start_local_worker(context, address, authkey) for address in sockets
+            ]
+
+            def respawn(address: Address) -> Address:
+                index: int = sockets.index(str(address))
+                if is_worker_alive(address, authkey):
+                    return address
+                processes[index].terminate()
+                processes[index].join()
+                print(f"Reiniciando o worker {address}.")
+                processes[index] = start_local_worker(context, sockets[index], authkey)
+                wait_for_workers([sockets[index]], [processes[index]])
+                return address
+
+            try:
+                wait_for_workers(sockets, processes)
+                aggregate = coordinate(
+                    filename,
+                    list(sockets),
+                    authkey,
+                    engine,
+                    num_shards,
+                    config,
+                    failure_rate,
+                    seed,
+                    respawn,
+                )
+            finally:
+                for address, process in zip(sockets, processes):
+                    if process.is_alive():
+                        try:
+                            send_task(address, authkey, None)
+                        except OSError:
+                            process.terminate()
+                    process.join()
+
+    with phase("output"):
+        columns = aggregate.to_columns()
+        final_results: Dict[str, Tuple[float, float, float]] = {
+            station: (float(min_value), float(max_value), float(mean_value))
+            for station, min_value, max_value, mean_value in zip(
+                columns["station"], columns["min"], columns["max"], columns["mean"]
+            )
+        }
+
+    return final_results
+
+
+@register_engine("sharded", streaming=True, parallel=True, tunable=("concurrency",))
+def run_sharded(
+    filename: Path, rows: int, config: Dict[str, Any]
+) -> Dict[str, Tuple[float, float, float]]:
+    """
+    Executa `create_df_with_shards` com a assinatura do registro.
+
+    Além dos parâmetros da solução de cada shard, `config` aceita `engine`,
+    `concurrency` (workers locais), `shards`, `failure_rate`, `seed` e
+    `addresses` (endereços separados por vírgula).
+    """
+    shard_config = dict(config)
+    engine: str = shard_config.pop("engine", DEFAULT_ENGINE)
+    num_workers: int = shard_config.pop("concurrency", CONCURRENCY)
+    num_shards: Optional[int] = shard_config.pop("shards", None)
+    failure_rate: float = float(shard_config.pop("failure_rate", 0.0))
+    seed: int = shard_config.pop("seed", 0)
+    addresses: str = shard_config.pop("addresses", "")
+    return create_df_with_shards(
+        filename,
+        engine,
+        num_workers,
+        num_shards,
+        shard_config,
+        failure_rate,
+        seed,
+        [parse_address(address) for address in addresses.split(",") if address],
+    )
+
+
+if __name__ == "__main__":
+    # `python sharded.py worker ENDEREÇO` inicia um worker remoto;
+    # `python sharded.py [solução workers failure_rate]` executa localmente
+    if sys.argv[1:2] == ["worker"]:
+        print(f"Worker escutando em {sys.argv[2]}.")
+        serve_worker(parse_address(sys.argv[2]), os.environ[AUTHKEY_ENV].encode())
+    else:
+        from verification import preview_result
+
+        shard_engine: str = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ENGINE
+        workers: int = int(sys.argv[2]) if len(sys.argv) > 2 else CONCURRENCY
+        rate: float = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+
+        print("Iniciando o processamento do arquivo.")
+        start_time: float = time.time()
+        results = create_df_with_shards(
+            FILENAME_OUTPUT, shard_engine, workers, failure_rate=rate
+        )
+        took: float = time.time() - start_time
+
+        print(preview_result(results))
+        print(f"Shards com {shard_engine} demorou: {took:.2f} sec")
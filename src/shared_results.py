@@ -0,0 +1,199 @@
+"""Agregados densos por estação em blocos de memória compartilhada."""
+
+import sys
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, NamedTuple, Sequence
+
+import numpy as np
+
+from aggregate import StationAggregate
+
+# Bytes de cada estação em um bloco: mínimo, máximo e soma (float64) e contagem
+# (int64), em quatro arrays consecutivos
+BYTES_PER_STATION: int = 32
+
+
+class ResultArrays(NamedTuple):
+    """
+    Arrays densos com o agregado de cada estação, indexados pelo identificador.
+
+    Attributes
+    ----------
+    min_values, max_values, sums : np.ndarray
+        Mínimo, máximo e soma das medições (float64). Estações sem medições têm
+        `inf`, `-inf` e 0.
+    counts : np.ndarray
+        Número de medições (int64).
+    """
+
+    min_values: np.ndarray
+    max_values: np.ndarray
+    sums: np.ndarray
+    counts: np.ndarray
+
+
+def block_arrays(buffer: memoryview, num_stations: int) -> ResultArrays:
+    """Cria os arrays de um bloco como views do buffer, sem cópia."""
+    return ResultArrays(
+        *(
+            np.ndarray(
+                num_stations,
+                dtype=np.int64 if field == 3 else np.float64,
+                buffer=buffer,
+                offset=field * num_stations * 8,
+            )
+            for field in range(4)
+        )
+    )
+
+
+def reset_arrays(arrays: ResultArrays) -> None:
+    """Preenche os arrays com o elemento neutro de cada agregação."""
+    arrays.min_values.fill(np.inf)
+    arrays.max_values.fill(-np.inf)
+    arrays.sums.fill(0.0)
+    arrays.counts.fill(0)
+
+
+def attach_block(name: str) -> SharedMemory:
+    """
+    Abre em um worker um bloco criado pelo processo principal.
+
+    Parameters
+    ----------
+    name : str
+        Nome do bloco.
+
+    Returns
+    -------
+    SharedMemory
+        Bloco aberto, que deve ser fechado pelo worker sem removê-lo.
+
+    Notes
+    -----
+    Até o Python 3.12, abrir um bloco também o registra no `resource_tracker`,
+    que o removeria quando o worker terminasse; o registro é desfeito, pois o
+    bloco pertence ao processo principal.
+    """
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name, track=False)
+    block = SharedMemory(name)
+    resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+def write_block(
+    name: str,
+    num_stations: int,
+    station_ids: np.ndarray,
+    min_values: np.ndarray,
+    max_values: np.ndarray,
+    sums: np.ndarray,
+    counts: np.ndarray,
+) -> None:
+    """
+    Grava o agregado de um intervalo em um bloco compartilhado.
+
+    Parameters
+    ----------
+    name : str
+        Nome do bloco, reservado para a tarefa pelo processo principal.
+    num_stations : int
+        Número de estações do dicionário (tamanho dos arrays do bloco).
+    station_ids : np.ndarray
+        Identificador de cada estação agregada, sem repetições.
+    min_values, max_values, sums, counts : np.ndarray
+        Agregado de cada estação de `station_ids`.
+
+    Notes
+    -----
+    O bloco inteiro é reiniciado antes da gravação, pois ele é reaproveitado
+    por outras tarefas.
+    """
+    block = attach_block(name)
+    try:
+        arrays = block_arrays(block.buf, num_stations)
+        reset_arrays(arrays)
+        arrays.min_values[station_ids] = min_values
+        arrays.max_values[station_ids] = max_values
+        arrays.sums[station_ids] = sums
+        arrays.counts[station_ids] = counts
+        # As views precisam ser liberadas antes de fechar o bloco
+        del arrays
+    finally:
+        block.close()
+
+
+class SharedResults:
+    """
+    Blocos compartilhados em que os workers gravam os agregados densos.
+
+    O processo principal cria `num_blocks` blocos, um por tarefa pendente, e
+    combina cada bloco nos totais com NumPy, sem serializar os resultados. Um
+    bloco pode ser reaproveitado assim que for combinado.
+
+    Examples
+    --------
+    >>> with SharedResults(len(stations), 4) as shared:
+    ...     write_block(shared.names[0], len(stations), ids, mins, maxs, sums, counts)
+    ...     shared.reduce(0)
+    ...     aggregate = shared.to_aggregate(stations)
+    """
+
+    def __init__(self, num_stations: int, num_blocks: int) -> None:
+        """Cria os blocos e os totais, ainda vazios."""
+        self.num_stations: int = num_stations
+        self._blocks: List[SharedMemory] = [
+            SharedMemory(create=True, size=max(num_stations * BYTES_PER_STATION, 1))
+            for _ in range(num_blocks)
+        ]
+        self._views: List[ResultArrays] = [
+            block_arrays(block.buf, num_stations) for block in self._blocks
+        ]
+        self.totals: ResultArrays = ResultArrays(
+            np.full(num_stations, np.inf),
+            np.full(num_stations, -np.inf),
+            np.zeros(num_stations),
+            np.zeros(num_stations, dtype=np.int64),
+        )
+
+    @property
+    def names(self) -> List[str]:
+        """Nomes dos blocos, enviados aos workers."""
+        return [block.name for block in self._blocks]
+
+    def reduce(self, index: int) -> None:
+        """Combina o bloco `index` nos totais, no próprio array dos totais."""
+        block, totals = self._views[index], self.totals
+        np.minimum(totals.min_values, block.min_values, out=totals.min_values)
+        np.maximum(totals.max_values, block.max_values, out=totals.max_values)
+        np.add(totals.sums, block.sums, out=totals.sums)
+        np.add(totals.counts, block.counts, out=totals.counts)
+
+    def to_aggregate(self, stations: Sequence[str]) -> StationAggregate:
+        """Monta um `StationAggregate` com os totais das estações com medições."""
+        present = self.totals.counts > 0
+        return StationAggregate.from_columns(
+            np.asarray(stations, dtype=object)[present],
+            self.totals.min_values[present],
+            self.totals.max_values[present],
+            self.totals.sums[present],
+            self.totals.counts[present],
+        )
+
+    def close(self) -> None:
+        """Libera e remove os blocos."""
+        self._views = []
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self) -> "SharedResults":
+        """Retorna os blocos criados."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Remove os blocos."""
+        self.close()
@@ -1,17 +1,161 @@
 """Processando os dados com datatable."""
 
-from multiprocessing import cpu_count
+import mmap
+from multiprocessing import Pool, cpu_count
 from pathlib import Path
+from typing import Any, Dict, List, Tuple
 
 import datatable as dt
+import numpy as np
 
-from create_measurements import FILENAME_OUTPUT, NUM_ROWS_TO_CREATE
+from aggregate import StationAggregate
+from binary_columns import open_binary
+from binary_format import is_binary_file
+from fixed_point import SCALE
+from phase_timer import phase, timed, worker_function, worker_result
+from registry import register_engine, register_partial
+from settings import FILENAME_OUTPUT, NUM_ROWS_TO_CREATE
+from solution_mmap import find_chunk_boundaries
 
 CONCURRENCY: int = cpu_count()
 
 CHUNKSIZE: int = int(NUM_ROWS_TO_CREATE * 0.1)
 
 
+@timed("aggregate")
+def aggregate_chunk(df: dt.Frame) -> StationAggregate:
+    """
+    Agrega um chunk de medições por estação.
+
+    Parameters
+    ----------
+    df : dt.Frame
+        Chunk com as colunas `station` e `measure`.
+
+    Returns
+    -------
+    StationAggregate
+        Os resultados parciais com mínimo, máximo, soma e contagem por estação.
+    """
+    df_parcial_aggregated: dt.Frame = df[
+        :,
+        {
+            "min": dt.min(dt.f.measure),
+            "max": dt.max(dt.f.measure),
+            "sum": dt.sum(dt.f.measure),
+            "count": dt.count(),
+        },
+        dt.by("station"),
+    ]
+
+    return StationAggregate.from_columns(
+        df_parcial_aggregated["station"].to_list()[0],
+        *(
+            df_parcial_aggregated[column].to_numpy().ravel()
+            for column in ("min", "max", "sum", "count")
+        ),
+    )
+
+
+@timed("aggregate")
+def aggregate_binary_chunk(df: dt.Frame, stations: np.ndarray) -> StationAggregate:
+    """
+    Agrega um chunk das colunas binárias pelo identificador da estação.
+
+    Parameters
+    ----------
+    df : dt.Frame
+        Chunk com as colunas `station_id` e `tenths`.
+    stations : np.ndarray
+        Dicionário de estações do arquivo, indexado pelo identificador.
+
+    Returns
+    -------
+    StationAggregate
+        Os resultados parciais em décimos de grau (`scale = fixed_point.SCALE`).
+    """
+    df_parcial_aggregated: dt.Frame = df[
+        :,
+        {
+            "min": dt.min(dt.f.tenths),
+            "max": dt.max(dt.f.tenths),
+            "sum": dt.sum(dt.f.tenths),
+            "count": dt.count(),
+        },
+        dt.by("station_id"),
+    ]
+
+    return StationAggregate.from_columns(
+        stations[df_parcial_aggregated["station_id"].to_numpy().ravel()],
+        *(
+            df_parcial_aggregated[column].to_numpy().ravel()
+            for column in ("min", "max", "sum", "count")
+        ),
+        scale=SCALE,
+    )
+
+
+def aggregate_binary_datatable(
+    filename: Path, chunksize: int = CHUNKSIZE
+) -> StationAggregate:
+    """
+    Agrega um arquivo binário colunar em chunks de `dt.Frame`.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo no formato binário colunar.
+    chunksize : int, optional
+        Número de linhas de cada chunk. O padrão é `CHUNKSIZE`.
+
+    Returns
+    -------
+    StationAggregate
+        Agregado em décimos de grau (`scale = fixed_point.SCALE`).
+
+    Notes
+    -----
+    O datatable não tem inteiros sem sinal, portanto o identificador da estação
+    (uint16) é convertido para int32 ao montar cada chunk.
+    """
+    measurements = open_binary(filename)
+    stations = np.asarray(measurements.stations, dtype=object)
+    aggregate: StationAggregate = StationAggregate.empty()
+    for start in range(0, len(measurements.tenths), max(chunksize, 1)):
+        with phase("read"):
+            df = dt.Frame(
+                station_id=np.asarray(
+                    measurements.station_ids[start : start + chunksize],
+                    dtype=np.int32,
+                ),
+                tenths=np.asarray(measurements.tenths[start : start + chunksize]),
+            )
+        partial = aggregate_binary_chunk(df, stations)
+        with phase("merge"):
+            aggregate = aggregate.merge(partial)
+    return aggregate
+
+
+@timed("output")
+def finalize_results(aggregate: StationAggregate) -> dt.Frame:
+    """
+    Calcula a média global a partir da soma e da contagem.
+
+    Parameters
+    ----------
+    aggregate : StationAggregate
+        Resultados combinados de todos os chunks.
+
+    Returns
+    -------
+    dt.Frame
+        Frame com as colunas `station`, `min`, `max` e `mean`.
+    """
+    columns = aggregate.to_columns()
+    columns["station"] = columns["station"].tolist()
+    return dt.Frame(columns)
+
+
 def create_df_with_datatable(
     filename: Path, total_linhas: int, chunksize: int = CHUNKSIZE
 ) -> dt.Frame:
@@ -28,7 +172,7 @@ def create_df_with_datatable(
     ----------
     filename : Path
         Caminho para o arquivo CSV a ser processado. O arquivo deve conter as colunas
-        `station` e `measure`.
+        `station` e `measure`. Também aceita um arquivo no formato binário colunar.
     total_linhas : int
         Número total de linhas no arquivo CSV. Usado para controlar o loop de chunks.
     chunksize : int, optional
@@ -57,82 +201,194 @@ def create_df_with_datatable(
       com o número de CPUs disponíveis.
     - A soma e a contagem são utilizadas para calcular a média global corretamente.
     - O uso de chunks permite processar grandes volumes de dados sem sobrecarregar a memória.
+    - Se `filename` estiver no formato binário colunar, as colunas são agregadas
+      em chunks de `dt.Frame` com `aggregate_binary_datatable`, sem leitura de
+      texto.
     """
-    parcial_data: list = []
+    if is_binary_file(filename):
+        return finalize_results(aggregate_binary_datatable(filename, chunksize))
+
+    aggregate: StationAggregate = StationAggregate.empty()
     rows_to_skip: int = 0
     while rows_to_skip < total_linhas:
-        # Lendo o arquivo em chunks
+        # Lendo o arquivo em chunks (o `fread` lê e converte as colunas)
+        with phase("read"):
+            df: dt.Frame = dt.fread(
+                file=filename,
+                nthreads=CONCURRENCY,
+                columns=["station", "measure"],
+                skip_to_line=rows_to_skip,
+                max_nrows=chunksize,
+            )
+        # Caso tenhamos linhas, processamentos o chunk
+        if df.nrows > 0:
+            # Combinando os resultados parciais para reduzir a memória utilizada
+            partial: StationAggregate = aggregate_chunk(df)
+            with phase("merge"):
+                aggregate = aggregate.merge(partial)
+
+        rows_to_skip = rows_to_skip + chunksize
+
+    return finalize_results(aggregate)
+
+
+def read_byte_range(args: Tuple[Path, int, int, int]) -> StationAggregate:
+    """
+    Lê e agrega um intervalo de bytes do arquivo com `fread`.
+
+    Parameters
+    ----------
+    args : Tuple[Path, int, int, int]
+        Tupla com o caminho do arquivo, os deslocamentos de início e fim do
+        intervalo e o número de threads usados pelo `fread`.
+
+    Returns
+    -------
+    StationAggregate
+        Resultado de `aggregate_chunk`. Vazio se o intervalo não tiver linhas.
+    """
+    filename, start, end, nthreads = args
+
+    with phase("read"):
+        with open(filename, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                text: bytes = mm[start:end]
+
+    with phase("parse"):
         df: dt.Frame = dt.fread(
-            file=filename,
-            nthreads=CONCURRENCY,
+            text=text,
+            sep=";",
+            header=False,
+            nthreads=nthreads,
             columns=["station", "measure"],
-            skip_to_line=rows_to_skip,
-            max_nrows=chunksize,
         )
-        # Caso tenhamos linhas, processamentos o chunk
-        if df.nrows > 0:
-            df_parcial_aggregated: dt.Frame = df[
-                :,
-                {
-                    "min": dt.min(dt.f.measure),
-                    "max": dt.max(dt.f.measure),
-                    "sum": dt.sum(dt.f.measure),
-                    "count": dt.count(),
-                },
-                dt.by("station"),
-            ]
 
-            parcial_data.append(df_parcial_aggregated)
+    if df.nrows == 0:
+        return StationAggregate.empty()
 
-            # Combinando os resultados parciais para reduzir a memória utilizada
-            df_process: dt.Frame = dt.rbind(parcial_data, force=True)
-
-            # Processando os resultados parciais
-            df_process = df_process[
-                :,
-                {
-                    "min": dt.min(dt.f.min),
-                    "max": dt.max(dt.f.max),
-                    "sum": dt.sum(dt.f.sum),
-                    "count": dt.sum(dt.f.count),
-                },
-                dt.by("station"),
+    return aggregate_chunk(df)
+
+
+def create_df_with_datatable_offsets(
+    filename: Path,
+    total_linhas: int,
+    chunksize: int = CHUNKSIZE,
+    parallel: bool = False,
+) -> dt.Frame:
+    """
+    Processa o arquivo com datatable a partir de deslocamentos em bytes.
+
+    Os deslocamentos de cada chunk, alinhados com as quebras de linha, são
+    calculados uma única vez e cada chunk é entregue ao `fread` como uma fatia de
+    bytes. Assim, nenhum chunk precisa varrer o arquivo desde o início para
+    encontrar a sua primeira linha, como ocorre com `skip_to_line` em
+    `create_df_with_datatable`, e o custo total cresce linearmente com o tamanho
+    do arquivo.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho para o arquivo CSV a ser processado ou de um arquivo no formato
+        binário colunar.
+    total_linhas : int
+        Número total de linhas no arquivo. Usado apenas para definir o número de
+        chunks.
+    chunksize : int, optional
+        Número aproximado de linhas por chunk. O padrão é definido como 10% do
+        total de linhas.
+    parallel : bool, optional
+        Se verdadeiro, os chunks são lidos em paralelo por um pool de processos,
+        cada um usando uma fração dos threads disponíveis. O padrão é falso.
+
+    Returns
+    -------
+    dt.Frame
+        Um DataFrame do datatable com as colunas `station`, `min`, `max` e `mean`.
+
+    Notes
+    -----
+    - Os chunks têm tamanhos aproximados em bytes, não em linhas.
+    - Em modo paralelo, somente os resultados parciais agregados são enviados
+      entre os processos.
+    - Se `filename` estiver no formato binário colunar, as colunas são agregadas
+      em chunks de `dt.Frame` com `aggregate_binary_datatable`, sem leitura de
+      texto.
+    """
+    if is_binary_file(filename):
+        return finalize_results(aggregate_binary_datatable(filename, chunksize))
+
+    num_chunks: int = max(-(-total_linhas // chunksize), 1)
+    boundaries = find_chunk_boundaries(filename, num_chunks)
+
+    if parallel:
+        workers: int = max(min(CONCURRENCY, len(boundaries)), 1)
+        nthreads: int = max(CONCURRENCY // workers, 1)
+        tasks = [(filename, start, end, nthreads) for start, end in boundaries]
+        with Pool(workers) as pool, phase("wait"):
+            parcial_data: List[StationAggregate] = [
+                worker_result(result)
+                for result in pool.map(worker_function(read_byte_range), tasks)
             ]
+        with phase("merge"):
+            aggregate: StationAggregate = StationAggregate.merge_all(parcial_data)
+    else:
+        aggregate = StationAggregate.empty()
+        for start, end in boundaries:
+            # Combinando os resultados parciais para reduzir a memória utilizada
+            partial = read_byte_range((filename, start, end, CONCURRENCY))
+            with phase("merge"):
+                aggregate = aggregate.merge(partial)
 
-            # Preparando os dados para a próxima iteração
-            parcial_data = [df_process]
+    return finalize_results(aggregate)
 
-        rows_to_skip = rows_to_skip + chunksize
 
-    final_aggregated_df: dt.Frame = df_process[
-        :,
-        {
-            "min": dt.min(dt.f.min),
-            "max": dt.max(dt.f.max),
-            "sum": dt.sum(dt.f.sum),
-            "count": dt.sum(dt.f.count),
-        },
-        dt.by("station"),
-    ]
+@register_engine(
+    "datatable",
+    streaming=True,
+    parallel=True,
+    needs_row_count=True,
+    tunable=("chunksize",),
+)
+def run_datatable(filename: Path, rows: int, config: Dict[str, Any]) -> dt.Frame:
+    """Executa `create_df_with_datatable` com a assinatura do registro."""
+    return create_df_with_datatable(filename, rows, config.get("chunksize", CHUNKSIZE))
 
-    final_aggregated_df = final_aggregated_df[
-        :,
-        {
-            "station": dt.f.station,
-            "min": dt.f.min,
-            "max": dt.f.max,
-            "mean": dt.f.sum / dt.f.count,
-        },
-    ]
 
-    print(final_aggregated_df)
+@register_engine(
+    "datatable_offsets",
+    streaming=True,
+    parallel=True,
+    needs_row_count=True,
+    tunable=("chunksize",),
+)
+def run_datatable_offsets(
+    filename: Path, rows: int, config: Dict[str, Any]
+) -> dt.Frame:
+    """Executa `create_df_with_datatable_offsets` com a assinatura do registro."""
+    return create_df_with_datatable_offsets(
+        filename,
+        rows,
+        config.get("chunksize", CHUNKSIZE),
+        parallel=config.get("parallel", True),
+    )
+
 
-    return final_aggregated_df
+@register_partial("datatable")
+@register_partial("datatable_offsets")
+def run_datatable_partial(
+    filename: Path, start: int, end: int, config: Dict[str, Any]
+) -> StationAggregate:
+    """Agrega um intervalo de bytes com `read_byte_range`."""
+    return read_byte_range(
+        (filename, start, end, config.get("concurrency", CONCURRENCY))
+    )
 
 
 if __name__ == "__main__":
     import time
 
+    from verification import preview_result
+
     print("Iniciando o processamento do arquivo.")
 
     start_time: float = time.time()
@@ -141,4 +397,17 @@ if __name__ == "__main__":
     )
     took: float = time.time() - start_time
 
+    print(preview_result(df))
     print(f"Datatable demorou: {took:.4f} sec")
+
+    start_time = time.time()
+    df = create_df_with_datatable_offsets(
+        filename=FILENAME_OUTPUT,
+        total_linhas=NUM_ROWS_TO_CREATE,
+        chunksize=CHUNKSIZE,
+        parallel=True,
+    )
+    took = time.time() - start_time
+
+    print(preview_result(df))
+    print(f"Datatable com deslocamentos em bytes demorou: {took:.4f} sec")
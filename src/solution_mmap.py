@@ -0,0 +1,459 @@
+"""Processando os dados com mmap e multiprocessing, sem dependências externas."""
+
+import mmap
+import os
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Optional, Tuple
+
+from binary_format import ITEM_SIZE, is_binary_file, read_header
+from fixed_point import SCALE, TENTHS_TABLE, parse_tenths
+from phase_timer import phase, worker_function, worker_result
+from registry import register_engine, register_partial
+from settings import FILENAME_OUTPUT
+
+if TYPE_CHECKING:
+    from aggregate import StationAggregate
+
+CONCURRENCY: int = cpu_count()
+
+# Tamanho máximo do bloco copiado do mmap de cada vez por um worker
+BLOCK_SIZE: int = 64 * 1024 * 1024
+
+# Estatísticas parciais de uma estação: [mínimo, máximo, soma, contagem]
+StationStats = List[float]
+
+
+def find_chunk_boundaries(
+    filename: Path, num_chunks: int, start: int = 0, end: Optional[int] = None
+) -> List[Tuple[int, int]]:
+    """
+    Divide o arquivo em intervalos de bytes alinhados com o fim das linhas.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho do arquivo a ser dividido.
+    num_chunks : int
+        Número desejado de intervalos. O número efetivo pode ser menor em arquivos
+        pequenos.
+    start : int, optional
+        Deslocamento inicial, que deve estar no início de uma linha. O padrão é 0.
+    end : int, optional
+        Deslocamento final. O padrão é o tamanho do arquivo.
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        Lista de tuplas `(início, fim)` com os deslocamentos em bytes de cada
+        intervalo. Todo intervalo termina logo após uma quebra de linha (ou em
+        `end`).
+
+    Notes
+    -----
+    Somente os bytes próximos de cada fronteira são lidos, portanto o custo da
+    divisão não depende do tamanho do arquivo.
+    """
+    range_end: int = os.path.getsize(filename) if end is None else end
+    if range_end <= start:
+        return []
+
+    chunk_size: int = max((range_end - start) // max(num_chunks, 1), 1)
+    boundaries: List[Tuple[int, int]] = []
+
+    with open(filename, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            chunk_start: int = start
+            while chunk_start < range_end:
+                chunk_end: int = min(chunk_start + chunk_size, range_end)
+                if chunk_end < range_end:
+                    # Avança até o próximo fim de linha
+                    newline: int = mm.find(b"\n", chunk_end - 1, range_end)
+                    chunk_end = range_end if newline == -1 else newline + 1
+                boundaries.append((chunk_start, chunk_end))
+                chunk_start = chunk_end
+
+    return boundaries
+
+
+def aggregate_lines_float(
+    lines: List[bytes], results: Dict[bytes, StationStats]
+) -> None:
+    """
+    Acumula as linhas em `results`, lendo as medições com `float`.
+
+    Parameters
+    ----------
+    lines : List[bytes]
+        Linhas no formato `<estação>;<medição>`.
+    results : Dict[bytes, StationStats]
+        Dicionário de estatísticas atualizado no lugar.
+    """
+    get_stats = results.get
+    for line in lines:
+        if not line:
+            continue
+        station, _, measure = line.partition(b";")
+        value: float = float(measure)
+        stats = get_stats(station)
+        if stats is None:
+            results[station] = [value, value, value, 1]
+        else:
+            if value < stats[0]:
+                stats[0] = value
+            if value > stats[1]:
+                stats[1] = value
+            stats[2] += value
+            stats[3] += 1
+
+
+def aggregate_lines_tenths(
+    lines: List[bytes], results: Dict[bytes, StationStats]
+) -> None:
+    """
+    Acumula as linhas em `results`, lendo as medições como décimos de grau.
+
+    Parameters
+    ----------
+    lines : List[bytes]
+        Linhas no formato `<estação>;<medição>`.
+    results : Dict[bytes, StationStats]
+        Dicionário de estatísticas atualizado no lugar. Mínimo, máximo e soma são
+        inteiros em décimos de grau.
+
+    Notes
+    -----
+    A medição é convertida com uma consulta a `TENTHS_TABLE`, sem `float`. Só as
+    medições fora do formato esperado passam por `parse_tenths`.
+    """
+    get_stats = results.get
+    get_tenths = TENTHS_TABLE.get
+    for line in lines:
+        if not line:
+            continue
+        station, _, measure = line.partition(b";")
+        value = get_tenths(measure)
+        if value is None:
+            value = parse_tenths(measure)
+        stats = get_stats(station)
+        if stats is None:
+            results[station] = [value, value, value, 1]
+        else:
+            if value < stats[0]:
+                stats[0] = value
+            if value > stats[1]:
+                stats[1] = value
+            stats[2] += value
+            stats[3] += 1
+
+
+def process_byte_range(args: Tuple[Path, int, int, bool]) -> Dict[bytes, StationStats]:
+    """
+    Agrega as medições de um intervalo de bytes do arquivo.
+
+    Parameters
+    ----------
+    args : Tuple[Path, int, int, bool]
+        Tupla com o caminho do arquivo, os deslocamentos de início e fim do
+        intervalo, conforme retornado por `find_chunk_boundaries`, e se as
+        medições devem ser lidas como inteiros em décimos de grau.
+
+    Returns
+    -------
+    Dict[bytes, StationStats]
+        Dicionário com o nome da estação (em bytes) como chave e a lista
+        `[mínimo, máximo, soma, contagem]` como valor.
+
+    Notes
+    -----
+    - O intervalo é lido em blocos de até `BLOCK_SIZE` bytes para limitar a memória
+      usada por cada worker.
+    - Os nomes das estações só são decodificados no processo principal.
+    """
+    filename, start, end, fixed_point = args
+    results: Dict[bytes, StationStats] = {}
+    aggregate_lines = aggregate_lines_tenths if fixed_point else aggregate_lines_float
+
+    with open(filename, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            position: int = start
+            while position < end:
+                block_end: int = min(position + BLOCK_SIZE, end)
+                if block_end < end:
+                    # Recua até o último fim de linha do bloco
+                    block_end = mm.rfind(b"\n", position, block_end) + 1
+                    if block_end == 0:
+                        block_end = mm.find(b"\n", position, end) + 1 or end
+
+                with phase("read"):
+                    block: bytes = mm[position:block_end]
+                with phase("parse"):
+                    lines: List[bytes] = block.splitlines()
+                # A conversão das medições é feita junto com a agregação
+                with phase("aggregate"):
+                    aggregate_lines(lines, results)
+
+                position = block_end
+
+    return results
+
+
+def process_binary_rows(args: Tuple[Path, int, int]) -> Dict[int, StationStats]:
+    """
+    Agrega as medições de um intervalo de linhas de um arquivo binário colunar.
+
+    Parameters
+    ----------
+    args : Tuple[Path, int, int]
+        Tupla com o caminho do arquivo binário e as linhas de início e fim do
+        intervalo.
+
+    Returns
+    -------
+    Dict[int, StationStats]
+        Dicionário com o identificador da estação como chave e a lista
+        `[mínimo, máximo, soma, contagem]`, em décimos de grau, como valor.
+
+    Notes
+    -----
+    As colunas são lidas do mmap com `memoryview.cast`, sem cópia e sem
+    dependências externas. Assume uma máquina little-endian, como o formato.
+    """
+    filename, start_row, end_row = args
+    header = read_header(filename)
+    start: int = start_row * ITEM_SIZE
+    end: int = end_row * ITEM_SIZE
+    results: Dict[int, StationStats] = {}
+    get_stats = results.get
+
+    with open(filename, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                ids_offset: int = header.station_ids_offset
+                tenths_offset: int = header.tenths_offset
+                station_ids = view[ids_offset + start : ids_offset + end].cast("H")
+                tenths = view[tenths_offset + start : tenths_offset + end].cast("h")
+
+                for station_id, value in zip(station_ids, tenths):
+                    stats = get_stats(station_id)
+                    if stats is None:
+                        results[station_id] = [value, value, value, 1]
+                    else:
+                        if value < stats[0]:
+                            stats[0] = value
+                        if value > stats[1]:
+                            stats[1] = value
+                        stats[2] += value
+                        stats[3] += 1
+
+                station_ids.release()
+                tenths.release()
+
+    return results
+
+
+def merge_results(
+    partial_results: List[Dict[Hashable, StationStats]]
+) -> Dict[Hashable, StationStats]:
+    """
+    Combina os resultados parciais dos workers.
+
+    Parameters
+    ----------
+    partial_results : List[Dict[Hashable, StationStats]]
+        Resultados retornados por `process_byte_range` ou `process_binary_rows`.
+
+    Returns
+    -------
+    Dict[Hashable, StationStats]
+        Dicionário com as estatísticas globais de cada estação.
+    """
+    merged: Dict[Hashable, StationStats] = {}
+    for partial in partial_results:
+        for station, stats in partial.items():
+            current = merged.get(station)
+            if current is None:
+                merged[station] = stats
+            else:
+                if stats[0] < current[0]:
+                    current[0] = stats[0]
+                if stats[1] > current[1]:
+                    current[1] = stats[1]
+                current[2] += stats[2]
+                current[3] += stats[3]
+    return merged
+
+
+def create_df_with_mmap(
+    filename: Path, concurrency: int = CONCURRENCY, fixed_point: bool = False
+) -> Dict[str, Tuple[float, float, float]]:
+    """
+    Processa o arquivo mapeado em memória com múltiplos processos.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho do arquivo de medições, em texto ou no formato binário colunar.
+    concurrency : int, optional
+        Número de processos usados. O padrão é o número de CPUs disponíveis.
+    fixed_point : bool, optional
+        Se verdadeiro, as medições são lidas como inteiros em décimos de grau e os
+        acumuladores são inteiros, convertidos para graus apenas no resultado
+        final. O padrão é falso. Arquivos binários são sempre lidos em décimos de
+        grau.
+
+    Returns
+    -------
+    Dict[str, Tuple[float, float, float]]
+        Dicionário ordenado pelo nome da estação com a tupla
+        `(mínimo, máximo, média)` de cada estação.
+
+    Notes
+    -----
+    - O arquivo é dividido em um intervalo de bytes por processo e cada worker lê
+      o seu intervalo diretamente do mmap, sem DataFrames e sem enviar os dados
+      entre processos.
+    - Somente os dicionários com as estatísticas parciais são serializados.
+    - Usa apenas a biblioteca padrão do Python.
+    - Com `fixed_point`, a soma é exata e a média não depende da ordem em que os
+      intervalos são combinados.
+    - No formato binário, cada processo agrega um intervalo de linhas das colunas.
+    """
+    if is_binary_file(filename):
+        header = read_header(filename)
+        rows_per_task: int = max(-(-header.num_rows // concurrency), 1)
+        tasks = [
+            (filename, start, min(start + rows_per_task, header.num_rows))
+            for start in range(0, header.num_rows, rows_per_task)
+        ]
+        with Pool(concurrency) as pool, phase("wait"):
+            partial_results = [
+                worker_result(result)
+                for result in pool.map(worker_function(process_binary_rows), tasks)
+            ]
+        scale: int = SCALE
+        names = {
+            station_id: header.stations[station_id]
+            for partial in partial_results
+            for station_id in partial
+        }
+    else:
+        boundaries = find_chunk_boundaries(filename, concurrency)
+        tasks = [(filename, start, end, fixed_point) for start, end in boundaries]
+        with Pool(concurrency) as pool, phase("wait"):
+            partial_results = [
+                worker_result(result)
+                for result in pool.map(worker_function(process_byte_range), tasks)
+            ]
+        scale = SCALE if fixed_point else 1
+        names = {
+            station: station.decode("utf-8")
+            for partial in partial_results
+            for station in partial
+        }
+
+    with phase("merge"):
+        merged = merge_results(partial_results)
+
+    with phase("output"):
+        final_results: Dict[str, Tuple[float, float, float]] = {
+            station: (
+                stats[0] / scale,
+                stats[1] / scale,
+                stats[2] / (stats[3] * scale),
+            )
+            for station, stats in sorted(
+                (names[station], stats) for station, stats in merged.items()
+            )
+        }
+
+    return final_results
+
+
+@register_engine("mmap", streaming=True, parallel=True, tunable=("concurrency",))
+def run_mmap(
+    filename: Path, rows: int, config: Dict[str, Any]
+) -> Dict[str, Tuple[float, float, float]]:
+    """Executa `create_df_with_mmap` com a assinatura do registro."""
+    return create_df_with_mmap(
+        filename,
+        config.get("concurrency", CONCURRENCY),
+        config.get("fixed_point", False),
+    )
+
+
+@register_engine(
+    "mmap_fixed_point", streaming=True, parallel=True, tunable=("concurrency",)
+)
+def run_mmap_fixed_point(
+    filename: Path, rows: int, config: Dict[str, Any]
+) -> Dict[str, Tuple[float, float, float]]:
+    """Executa `create_df_with_mmap` em décimos de grau com a assinatura do registro."""
+    return create_df_with_mmap(
+        filename, config.get("concurrency", CONCURRENCY), fixed_point=True
+    )
+
+
+def aggregate_byte_range(
+    filename: Path, start: int, end: int, fixed_point: bool = False
+) -> "StationAggregate":
+    """
+    Agrega um intervalo de bytes em um único processo.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho do arquivo de medições em texto.
+    start, end : int
+        Intervalo de bytes, alinhado com o fim das linhas.
+    fixed_point : bool, optional
+        Se verdadeiro, lê as medições em décimos de grau. O padrão é falso.
+
+    Returns
+    -------
+    StationAggregate
+        Agregado parcial do intervalo, que pode ser combinado com os de outros
+        intervalos.
+
+    Notes
+    -----
+    O `StationAggregate` usa NumPy, por isso é importado somente aqui; as
+    demais funções do módulo continuam sem dependências externas.
+    """
+    from aggregate import StationAggregate
+
+    results = process_byte_range((filename, start, end, fixed_point))
+    return StationAggregate.from_mapping(
+        {station.decode("utf-8"): stats for station, stats in results.items()},
+        scale=SCALE if fixed_point else 1,
+    )
+
+
+@register_partial("mmap")
+def run_mmap_partial(
+    filename: Path, start: int, end: int, config: Dict[str, Any]
+) -> "StationAggregate":
+    """Executa `aggregate_byte_range` com a assinatura do registro."""
+    return aggregate_byte_range(filename, start, end, config.get("fixed_point", False))
+
+
+@register_partial("mmap_fixed_point")
+def run_mmap_fixed_point_partial(
+    filename: Path, start: int, end: int, config: Dict[str, Any]
+) -> "StationAggregate":
+    """Executa `aggregate_byte_range` em décimos de grau com a assinatura do registro."""
+    return aggregate_byte_range(filename, start, end, fixed_point=True)
+
+
+if __name__ == "__main__":
+    import time
+
+    from verification import preview_result
+
+    print("Iniciando o processamento do arquivo.")
+    start_time: float = time.time()
+    results = create_df_with_mmap(FILENAME_OUTPUT, CONCURRENCY)
+    took: float = time.time() - start_time
+
+    print(preview_result(results))
+    print(f"mmap demorou: {took:.2f} sec")
@@ -0,0 +1,441 @@
+"""Processando os dados com NumPy, com os nomes das estações em um hash perfeito."""
+
+import mmap
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from aggregate import StationAggregate
+from binary_columns import (
+    aggregate_binary,
+    decode_tenths,
+    hash_names,
+    iter_text_blocks,
+    split_lines,
+)
+from binary_format import is_binary_file
+from fixed_point import SCALE
+from phase_timer import phase, timed_iter, worker_function, worker_result
+from registry import register_engine, register_partial
+from settings import FILENAME_OUTPUT
+from solution_mmap import find_chunk_boundaries
+from station_dictionary import (
+    DICTIONARY_FILE,
+    UNKNOWN_STATION,
+    StationDictionary,
+    load_station_dictionary,
+    lookup_station_ids,
+)
+
+CONCURRENCY: int = cpu_count()
+
+# Tamanho dos blocos de texto processados de cada vez. `hash_names` usa cerca de
+# 32 bytes de memória temporária por byte do bloco
+TEXT_BLOCK_SIZE: int = 4 * 1024 * 1024
+
+# Mínimo, máximo, soma e contagem de cada estação do dicionário, em décimos
+Columns = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def aggregate_unknown(
+    block: np.ndarray,
+    starts: np.ndarray,
+    semicolons: np.ndarray,
+    hashes: np.ndarray,
+    tenths: np.ndarray,
+) -> StationAggregate:
+    """
+    Agrega as linhas cujas estações não estão no dicionário (caminho lento).
+
+    Parameters
+    ----------
+    block : np.ndarray
+        Bloco de texto como array uint8.
+    starts, semicolons : np.ndarray
+        Posição do início e do `;` de cada linha desconhecida.
+    hashes : np.ndarray
+        Hash do nome de cada linha desconhecida.
+    tenths : np.ndarray
+        Medição de cada linha desconhecida, em décimos de grau.
+
+    Returns
+    -------
+    StationAggregate
+        Agregado das linhas desconhecidas, em décimos de grau. Somente o primeiro
+        nome de cada hash distinto é decodificado.
+    """
+    unique_hashes, first_rows, inverse = np.unique(
+        hashes, return_index=True, return_inverse=True
+    )
+    names: List[str] = [
+        bytes(block[starts[row] : semicolons[row]]).decode("utf-8")
+        for row in first_rows
+    ]
+    num_names: int = len(unique_hashes)
+
+    min_values = np.full(num_names, np.iinfo(np.int16).max, dtype=np.int16)
+    max_values = np.full(num_names, np.iinfo(np.int16).min, dtype=np.int16)
+    np.minimum.at(min_values, inverse, tenths)
+    np.maximum.at(max_values, inverse, tenths)
+    return StationAggregate.from_columns(
+        names,
+        min_values,
+        max_values,
+        np.bincount(inverse, weights=tenths, minlength=num_names).astype(np.int64),
+        np.bincount(inverse, minlength=num_names),
+        scale=SCALE,
+    )
+
+
+def empty_columns(num_stations: int) -> Columns:
+    """Cria as colunas densas de `num_stations` estações, ainda sem medições."""
+    return (
+        np.full(num_stations, np.iinfo(np.int16).max, dtype=np.int16),
+        np.full(num_stations, np.iinfo(np.int16).min, dtype=np.int16),
+        np.zeros(num_stations, dtype=np.int64),
+        np.zeros(num_stations, dtype=np.int64),
+    )
+
+
+def merge_columns(target: Columns, source: Columns) -> None:
+    """Combina as colunas `source` em `target`, no próprio `target`."""
+    np.minimum(target[0], source[0], out=target[0])
+    np.maximum(target[1], source[1], out=target[1])
+    np.add(target[2], source[2], out=target[2])
+    np.add(target[3], source[3], out=target[3])
+
+
+def columns_to_aggregate(
+    dictionary: StationDictionary, columns: Columns, unknown: List[StationAggregate]
+) -> StationAggregate:
+    """Monta o agregado das estações com medições e das estações desconhecidas."""
+    min_values, max_values, sums, counts = columns
+    present = counts > 0
+    known_aggregate = StationAggregate.from_columns(
+        np.asarray(dictionary.stations, dtype=object)[present],
+        min_values[present],
+        max_values[present],
+        sums[present],
+        counts[present],
+        scale=SCALE,
+    )
+    return StationAggregate.merge_all([known_aggregate] + unknown)
+
+
+def accumulate_text_range(
+    mm: mmap.mmap,
+    dictionary: StationDictionary,
+    start: int,
+    end: int,
+    columns: Columns,
+) -> List[StationAggregate]:
+    """
+    Agrega um intervalo de bytes do arquivo mapeado nas colunas densas.
+
+    Parameters
+    ----------
+    mm : mmap.mmap
+        Arquivo de texto mapeado em memória.
+    dictionary : StationDictionary
+        Dicionário de estações com hash perfeito.
+    start, end : int
+        Intervalo de bytes, alinhado com o fim das linhas.
+    columns : Columns
+        Colunas de `empty_columns`, atualizadas no próprio array.
+
+    Returns
+    -------
+    List[StationAggregate]
+        Agregados das linhas com estações fora do dicionário, um por bloco que
+        tenha alguma, em décimos de grau.
+
+    Notes
+    -----
+    - Em cada bloco, o hash de todos os nomes é calculado de uma vez e o hash
+      perfeito leva cada linha diretamente à posição da sua estação nos arrays
+      de mínimo, máximo, soma e contagem, sem criar strings do Python.
+    - Linhas com estações fora do dicionário seguem pelo caminho lento de
+      `aggregate_unknown`.
+    - Fora a cópia de cada bloco, o trabalho é feito por operações do NumPy
+      que liberam o GIL, portanto várias threads podem agregar intervalos do
+      mesmo arquivo mapeado em colunas separadas.
+    """
+    min_values, max_values, sums, counts = columns
+    num_stations: int = len(min_values)
+    unknown: List[StationAggregate] = []
+
+    blocks = iter_text_blocks(mm, TEXT_BLOCK_SIZE, start, end)
+    for block in timed_iter(blocks, "read"):
+        with phase("parse"):
+            starts, semicolons, newlines = split_lines(block)
+            tenths = decode_tenths(block, semicolons, newlines)
+            hashes = hash_names(block, starts, semicolons)
+            station_ids = lookup_station_ids(dictionary, hashes)
+
+        with phase("aggregate"):
+            known = station_ids != UNKNOWN_STATION
+            if not known.all():
+                missing = ~known
+                unknown.append(
+                    aggregate_unknown(
+                        block,
+                        starts[missing],
+                        semicolons[missing],
+                        hashes[missing],
+                        tenths[missing],
+                    )
+                )
+                station_ids, tenths = station_ids[known], tenths[known]
+
+            counts += np.bincount(station_ids, minlength=num_stations)
+            sums += np.bincount(
+                station_ids, weights=tenths, minlength=num_stations
+            ).astype(np.int64)
+            np.minimum.at(min_values, station_ids, tenths)
+            np.maximum.at(max_values, station_ids, tenths)
+
+    return unknown
+
+
+def aggregate_text_range(
+    args: Tuple[Path, int, int], dictionary: StationDictionary
+) -> StationAggregate:
+    """
+    Agrega um intervalo de bytes do arquivo de texto com operações vetorizadas.
+
+    Parameters
+    ----------
+    args : Tuple[Path, int, int]
+        Tupla `(filename, início, fim)` com o caminho do arquivo e o intervalo de
+        bytes, alinhado com o fim das linhas, a ser processado.
+    dictionary : StationDictionary
+        Dicionário de estações com hash perfeito.
+
+    Returns
+    -------
+    StationAggregate
+        Agregado do intervalo, em décimos de grau (`scale = fixed_point.SCALE`),
+        calculado por `accumulate_text_range`.
+    """
+    filename, start, end = args
+    columns: Columns = empty_columns(len(dictionary.stations))
+    with open(filename, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            unknown = accumulate_text_range(mm, dictionary, start, end, columns)
+    return columns_to_aggregate(dictionary, columns, unknown)
+
+
+def aggregate_to_results(
+    aggregate: StationAggregate,
+) -> Dict[str, Tuple[float, float, float]]:
+    """Monta o dicionário `{estação: (mínimo, máximo, média)}` do agregado."""
+    columns = aggregate.to_columns()
+    return {
+        station: (float(min_value), float(max_value), float(mean_value))
+        for station, min_value, max_value, mean_value in zip(
+            columns["station"], columns["min"], columns["max"], columns["mean"]
+        )
+    }
+
+
+def create_df_with_numpy(
+    filename: Path,
+    concurrency: int = CONCURRENCY,
+    dictionary_file: Path = DICTIONARY_FILE,
+) -> Dict[str, Tuple[float, float, float]]:
+    """
+    Processa o arquivo mapeado em memória com NumPy e múltiplos processos.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho do arquivo de medições, em texto ou no formato binário colunar.
+    concurrency : int, optional
+        Número de processos usados. O padrão é o número de CPUs disponíveis.
+    dictionary_file : Path, optional
+        Arquivo do dicionário de estações, gerado na primeira execução. O padrão
+        é `station_dictionary.DICTIONARY_FILE`.
+
+    Returns
+    -------
+    Dict[str, Tuple[float, float, float]]
+        Dicionário ordenado pelo nome da estação com a tupla
+        `(mínimo, máximo, média)` de cada estação.
+
+    Notes
+    -----
+    Arquivos binários já têm as estações codificadas como inteiros e são
+    agregados diretamente por `aggregate_binary`.
+    """
+    if is_binary_file(filename):
+        aggregate: StationAggregate = aggregate_binary(filename)
+    else:
+        dictionary: StationDictionary = load_station_dictionary(dictionary_file)
+        tasks = [
+            (filename, start, end)
+            for start, end in find_chunk_boundaries(filename, concurrency)
+        ]
+        function = worker_function(partial(aggregate_text_range, dictionary=dictionary))
+        with Pool(concurrency) as pool, phase("wait"):
+            partials = [worker_result(result) for result in pool.map(function, tasks)]
+        with phase("merge"):
+            aggregate = StationAggregate.merge_all(partials)
+
+    with phase("output"):
+        return aggregate_to_results(aggregate)
+
+
+def create_df_with_numpy_threads(
+    filename: Path,
+    concurrency: int = CONCURRENCY,
+    dictionary_file: Path = DICTIONARY_FILE,
+) -> Dict[str, Tuple[float, float, float]]:
+    """
+    Processa o arquivo mapeado em memória com NumPy e múltiplas threads.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho do arquivo de medições, em texto ou no formato binário colunar.
+    concurrency : int, optional
+        Número de threads usadas. O padrão é o número de CPUs disponíveis.
+    dictionary_file : Path, optional
+        Arquivo do dicionário de estações. O padrão é
+        `station_dictionary.DICTIONARY_FILE`.
+
+    Returns
+    -------
+    Dict[str, Tuple[float, float, float]]
+        Dicionário ordenado pelo nome da estação com a tupla
+        `(mínimo, máximo, média)` de cada estação.
+
+    Notes
+    -----
+    - Mesmo processamento de `create_df_with_numpy`, mas com um
+      `ThreadPoolExecutor` no lugar do pool de processos: o arquivo é mapeado
+      uma única vez, cada thread agrega um intervalo de bytes com
+      `accumulate_text_range` nas suas próprias colunas densas, e as colunas
+      são combinadas no próprio array ao final, sem serialização nem cópia
+      dos resultados.
+    - Com o GIL, o ganho depende da fração do tempo gasta dentro do NumPy, que
+      libera o GIL; em um Python sem GIL (3.13t), as threads rodam em paralelo
+      também no código Python entre as chamadas.
+    """
+    if is_binary_file(filename):
+        aggregate: StationAggregate = aggregate_binary(filename)
+    else:
+        ranges = find_chunk_boundaries(filename, concurrency)
+        # Um arquivo vazio não tem intervalos e não pode ser mapeado em memória
+        if not ranges:
+            return {}
+        dictionary: StationDictionary = load_station_dictionary(dictionary_file)
+        columns: List[Columns] = [
+            empty_columns(len(dictionary.stations)) for _ in ranges
+        ]
+        with open(filename, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                function = worker_function(
+                    partial(accumulate_text_range, mm, dictionary)
+                )
+                with ThreadPoolExecutor(concurrency) as executor, phase("wait"):
+                    unknown: List[StationAggregate] = [
+                        partial_unknown
+                        for result in executor.map(
+                            function,
+                            [start for start, _ in ranges],
+                            [end for _, end in ranges],
+                            columns,
+                        )
+                        for partial_unknown in worker_result(result)
+                    ]
+
+        with phase("merge"):
+            for other in columns[1:]:
+                merge_columns(columns[0], other)
+            aggregate = columns_to_aggregate(dictionary, columns[0], unknown)
+
+    with phase("output"):
+        return aggregate_to_results(aggregate)
+
+
+@register_engine(
+    "numpy_interned", streaming=True, parallel=True, tunable=("concurrency",)
+)
+def run_numpy_interned(
+    filename: Path, rows: int, config: Dict[str, Any]
+) -> Dict[str, Tuple[float, float, float]]:
+    """Executa `create_df_with_numpy` com a assinatura do registro."""
+    dictionary_file: Optional[str] = config.get("dictionary_file")
+    return create_df_with_numpy(
+        filename,
+        config.get("concurrency", CONCURRENCY),
+        Path(dictionary_file) if dictionary_file else DICTIONARY_FILE,
+    )
+
+
+@register_engine(
+    "numpy_threads", streaming=True, parallel=True, tunable=("concurrency",)
+)
+def run_numpy_threads(
+    filename: Path, rows: int, config: Dict[str, Any]
+) -> Dict[str, Tuple[float, float, float]]:
+    """Executa `create_df_with_numpy_threads` com a assinatura do registro."""
+    dictionary_file: Optional[str] = config.get("dictionary_file")
+    return create_df_with_numpy_threads(
+        filename,
+        config.get("concurrency", CONCURRENCY),
+        Path(dictionary_file) if dictionary_file else DICTIONARY_FILE,
+    )
+
+
+@register_partial("numpy_interned")
+@register_partial("numpy_threads")
+def run_numpy_interned_partial(
+    filename: Path, start: int, end: int, config: Dict[str, Any]
+) -> StationAggregate:
+    """Agrega um intervalo de bytes com `aggregate_text_range`, em um processo."""
+    dictionary_file: Optional[str] = config.get("dictionary_file")
+    dictionary: StationDictionary = load_station_dictionary(
+        Path(dictionary_file) if dictionary_file else DICTIONARY_FILE
+    )
+    return aggregate_text_range((filename, start, end), dictionary)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from autotune import concurrency_candidates
+    from verification import compare_results, normalize_result, preview_result
+
+    # Compara threads e processos: `python solution_numpy.py [arquivo]`
+    filename = Path(sys.argv[1]) if len(sys.argv) > 1 else FILENAME_OUTPUT
+    gil: bool = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'ativo' if gil else 'desativado'}.")
+
+    reference = None
+    for concurrency in concurrency_candidates():
+        timings: Dict[str, float] = {}
+        for name, function in (
+            ("processos", create_df_with_numpy),
+            ("threads", create_df_with_numpy_threads),
+        ):
+            start_time: float = time.perf_counter()
+            results = function(filename, concurrency)
+            timings[name] = time.perf_counter() - start_time
+            if reference is None:
+                reference = normalize_result(results)
+                print(preview_result(results))
+            else:
+                verification = compare_results(reference, normalize_result(results))
+                if not verification.passed:
+                    print(f"{name} com {concurrency}: {verification.message}")
+        print(
+            f"{concurrency} workers: processos {timings['processos']:.3f}s, "
+            f"threads {timings['threads']:.3f}s "
+            f"({timings['processos'] / timings['threads']:.2f}x)"
+        )
@@ -1,20 +1,50 @@
 """Processando os dados com Pandas paralelizado."""
 
+import io
+import pickle
+from collections import deque
+from functools import lru_cache, partial
 from multiprocessing import Pool, cpu_count
+from multiprocessing.pool import AsyncResult
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
-from create_measurements import FILENAME_OUTPUT, NUM_ROWS_TO_CREATE
+from aggregate import StationAggregate
+from binary_columns import AGGREGATE_BLOCK_ROWS, open_binary
+from binary_format import is_binary_file
+from fixed_point import SCALE
+from histogram import build_histograms, measures_to_tenths
+from phase_timer import phase, timed, timed_iter, worker_function, worker_result
+from quantile_sketch import bucket_index, bucket_index_tenths, build_sketches
+from registry import register_engine, register_partial
+from settings import FILENAME_OUTPUT, NUM_ROWS_TO_CREATE
+from shared_results import SharedResults, write_block
+from solution_mmap import find_chunk_boundaries
+from station_dictionary import (
+    DICTIONARY_FILE,
+    load_station_dictionary,
+    read_station_dictionary,
+)
 
 CONCURRENCY: int = cpu_count()
 
 CHUNKSIZE: int = int(NUM_ROWS_TO_CREATE * 0.1)
 
+# Limite fixo de chunks enviados e ainda não combinados. Não cresce com o número
+# de CPUs, portanto o pico de memória é de no máximo `MAX_IN_FLIGHT` chunks
+MAX_IN_FLIGHT: int = 4
 
-def process_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+TUNABLE: Tuple[str, ...] = ("chunksize", "concurrency")
+
+
+@timed("aggregate")
+def process_chunk(
+    chunk: pd.DataFrame, sketch: bool = False, histogram: bool = False
+) -> StationAggregate:
     """
     Processa um chunk de dados, agregando as medições.
 
@@ -22,21 +52,380 @@ def process_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
     ----------
     chunk : pd.DataFrame
         O chunk de dados a ser processado.
+    sketch : bool, optional
+        Se verdadeiro, também monta o sketch de quantis de cada estação. O padrão
+        é falso.
+    histogram : bool, optional
+        Se verdadeiro, também monta o histograma exato de cada estação. O padrão
+        é falso.
 
     Returns
     -------
-    pd.DataFrame
-        Um DataFrame com os resultados agregados, contendo as colunas
-        'station', 'min', 'max' e 'mean'.
+    StationAggregate
+        Os resultados parciais com mínimo, máximo, soma e contagem por estação.
+    """
+    aggregated = chunk.groupby("station")["measure"].agg(["min", "max", "sum", "count"])
+
+    sketches: Optional[np.ndarray] = None
+    histograms: Optional[np.ndarray] = None
+    if sketch or histogram:
+        station_ids, stations = pd.factorize(chunk["station"])
+        measures: np.ndarray = chunk["measure"].to_numpy(dtype=np.float64)
+        # Mesmo critério do groupby: linhas sem estação ou sem medição são ignoradas
+        valid = (station_ids >= 0) & ~np.isnan(measures)
+        station_ids, measures = station_ids[valid], measures[valid]
+        order = stations.get_indexer(aggregated.index)
+        if sketch:
+            sketches = build_sketches(
+                station_ids, bucket_index(measures), len(stations)
+            )[order]
+        if histogram:
+            histograms = build_histograms(
+                station_ids, measures_to_tenths(measures), len(stations)
+            )[order]
+
+    return StationAggregate.from_columns(
+        aggregated.index,
+        aggregated["min"].to_numpy(),
+        aggregated["max"].to_numpy(),
+        aggregated["sum"].to_numpy(),
+        aggregated["count"].to_numpy(),
+        sketches=sketches,
+        histograms=histograms,
+    )
+
+
+def process_byte_range(
+    args: Tuple[Path, int, int], sketch: bool = False, histogram: bool = False
+) -> StationAggregate:
+    """
+    Lê e agrega um intervalo de bytes do arquivo de medições.
+
+    Parameters
+    ----------
+    args : Tuple[Path, int, int]
+        Tupla `(filename, início, fim)` com o caminho do arquivo e o intervalo de
+        bytes, alinhado com o fim das linhas, a ser processado.
+    sketch : bool, optional
+        Se verdadeiro, também monta o sketch de quantis de cada estação. O padrão
+        é falso.
+    histogram : bool, optional
+        Se verdadeiro, também monta o histograma exato de cada estação. O padrão
+        é falso.
+
+    Returns
+    -------
+    StationAggregate
+        Os resultados parciais com mínimo, máximo, soma e contagem por estação.
+
+    Notes
+    -----
+    Cada worker abre o arquivo por conta própria, portanto somente o intervalo e
+    o agregado parcial trafegam entre os processos.
+    """
+    return process_chunk(read_byte_range(*args), sketch, histogram)
+
+
+@timed("aggregate")
+def process_binary_block(
+    block: pd.DataFrame,
+    stations: np.ndarray,
+    sketch: bool = False,
+    histogram: bool = False,
+) -> StationAggregate:
     """
-    aggregated = (
-        chunk.groupby("station")["measure"].agg(["min", "max", "mean"]).reset_index()
+    Agrega um bloco das colunas binárias com `groupby` do Pandas.
+
+    Parameters
+    ----------
+    block : pd.DataFrame
+        Bloco com as colunas `station_id` (uint16) e `tenths` (int16).
+    stations : np.ndarray
+        Dicionário de estações do arquivo, indexado pelo identificador.
+    sketch : bool, optional
+        Se verdadeiro, também monta o sketch de quantis de cada estação. O padrão
+        é falso.
+    histogram : bool, optional
+        Se verdadeiro, também monta o histograma exato de cada estação. O padrão
+        é falso.
+
+    Returns
+    -------
+    StationAggregate
+        Os resultados parciais em décimos de grau (`scale = fixed_point.SCALE`).
+    """
+    aggregated = block.groupby("station_id")["tenths"].agg(
+        ["min", "max", "sum", "count"]
+    )
+    station_ids: np.ndarray = aggregated.index.to_numpy()
+
+    sketches: Optional[np.ndarray] = None
+    histograms: Optional[np.ndarray] = None
+    if sketch:
+        sketches = build_sketches(
+            block["station_id"].to_numpy(),
+            bucket_index_tenths(block["tenths"].to_numpy()),
+            len(stations),
+        )[station_ids]
+    if histogram:
+        histograms = build_histograms(
+            block["station_id"].to_numpy(), block["tenths"].to_numpy(), len(stations)
+        )[station_ids]
+
+    return StationAggregate.from_columns(
+        stations[station_ids],
+        aggregated["min"].to_numpy(),
+        aggregated["max"].to_numpy(),
+        aggregated["sum"].to_numpy(),
+        aggregated["count"].to_numpy(),
+        scale=SCALE,
+        sketches=sketches,
+        histograms=histograms,
     )
-    return aggregated
+
+
+def aggregate_binary_pandas(
+    filename: Path,
+    block_rows: int = AGGREGATE_BLOCK_ROWS,
+    sketch: bool = False,
+    histogram: bool = False,
+) -> StationAggregate:
+    """
+    Agrega um arquivo binário colunar em blocos de DataFrames do Pandas.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo no formato binário colunar.
+    block_rows : int, optional
+        Número de linhas de cada bloco. O padrão é
+        `binary_columns.AGGREGATE_BLOCK_ROWS`.
+    sketch : bool, optional
+        Se verdadeiro, também monta o sketch de quantis de cada estação. O padrão
+        é falso.
+    histogram : bool, optional
+        Se verdadeiro, também monta o histograma exato de cada estação. O padrão
+        é falso.
+
+    Returns
+    -------
+    StationAggregate
+        Agregado em décimos de grau (`scale = fixed_point.SCALE`).
+
+    Notes
+    -----
+    Cada bloco das colunas mapeadas em memória vira um `pd.DataFrame` agrupado
+    pelo identificador da estação, portanto os nomes só são associados aos
+    grupos, nunca às linhas.
+    """
+    measurements = open_binary(filename)
+    stations = np.asarray(measurements.stations, dtype=object)
+
+    aggregates: List[StationAggregate] = []
+    for start in range(0, len(measurements.tenths), block_rows):
+        with phase("read"):
+            block = pd.DataFrame(
+                {
+                    "station_id": np.asarray(
+                        measurements.station_ids[start : start + block_rows]
+                    ),
+                    "tenths": np.asarray(
+                        measurements.tenths[start : start + block_rows]
+                    ),
+                }
+            )
+        aggregates.append(process_binary_block(block, stations, sketch, histogram))
+
+    with phase("merge"):
+        return StationAggregate.merge_all(aggregates)
+
+
+def read_byte_range(filename: Path, start: int, end: int) -> pd.DataFrame:
+    """Lê um intervalo de bytes, alinhado com o fim das linhas, com `pd.read_csv`."""
+    with phase("read"):
+        with open(filename, "rb") as file:
+            file.seek(start)
+            data: bytes = file.read(end - start)
+
+    with phase("parse"):
+        return pd.read_csv(
+            io.BytesIO(data), sep=";", header=None, names=["station", "measure"]
+        )
+
+
+@lru_cache(maxsize=None)
+def station_index(dictionary_file: Path) -> pd.Index:
+    """Lê os nomes das estações do dicionário uma única vez em cada processo."""
+    dictionary = read_station_dictionary(dictionary_file)
+    if dictionary is None:
+        raise FileNotFoundError(f"Dicionário de estações ausente: {dictionary_file}")
+    return pd.Index(dictionary.stations)
+
+
+def process_byte_range_shared(
+    args: Tuple[Path, int, int, int, str], dictionary_file: Path = DICTIONARY_FILE
+) -> Tuple[int, Optional[StationAggregate]]:
+    """
+    Agrega um intervalo de bytes em um bloco de memória compartilhada.
+
+    Parameters
+    ----------
+    args : Tuple[Path, int, int, int, str]
+        Tupla `(filename, início, fim, bloco, nome do bloco)` com o intervalo de
+        bytes, alinhado com o fim das linhas, e o bloco de `SharedResults`
+        reservado para a tarefa.
+    dictionary_file : Path, optional
+        Arquivo do dicionário de estações, que define a posição de cada estação
+        no bloco. O padrão é `station_dictionary.DICTIONARY_FILE`.
+
+    Returns
+    -------
+    Tuple[int, Optional[StationAggregate]]
+        O índice do bloco gravado e o agregado das estações fora do dicionário
+        (`None` se não houver), o único dado serializado na volta.
+    """
+    filename, start, end, block, block_name = args
+    chunk: pd.DataFrame = read_byte_range(filename, start, end)
+
+    with phase("aggregate"):
+        stations: pd.Index = station_index(dictionary_file)
+        station_ids: np.ndarray = stations.get_indexer(chunk["station"])
+        known = station_ids >= 0
+        aggregated = (
+            chunk["measure"][known]
+            .groupby(station_ids[known])
+            .agg(["min", "max", "sum", "count"])
+        )
+        write_block(
+            block_name,
+            len(stations),
+            aggregated.index.to_numpy(),
+            aggregated["min"].to_numpy(),
+            aggregated["max"].to_numpy(),
+            aggregated["sum"].to_numpy(),
+            aggregated["count"].to_numpy(),
+        )
+
+    unknown: Optional[StationAggregate] = None
+    if not known.all():
+        unknown = process_chunk(chunk[~known])
+    return block, unknown
+
+
+def in_flight_window(concurrency: int) -> int:
+    """
+    Calcula o número padrão de tarefas pendentes no pool.
+
+    Parameters
+    ----------
+    concurrency : int
+        Número de processos do pool.
+
+    Returns
+    -------
+    int
+        `concurrency + 1`, limitado a `MAX_IN_FLIGHT`.
+
+    Notes
+    -----
+    Uma tarefa a mais que o número de processos mantém um worker ocupado
+    enquanto o resultado mais antigo é combinado. O limite fixo impede que a
+    janela, e com ela o pico de memória (cerca de `MAX_IN_FLIGHT` chunks mais o
+    que está sendo lido), cresça com o número de CPUs.
+    """
+    return max(min(concurrency + 1, MAX_IN_FLIGHT), 1)
+
+
+def call_pickled(payload: bytes) -> Any:
+    """Executa `function(task)` a partir da tupla `(function, task)` serializada."""
+    function, task = pickle.loads(payload)
+    return function(task)
+
+
+def reduce_bounded(
+    pool: Pool,
+    function: Callable[[Any], StationAggregate],
+    tasks: Iterable[Any],
+    total: int,
+    max_in_flight: int = MAX_IN_FLIGHT,
+    merge: Optional[Callable[[StationAggregate, Any], StationAggregate]] = None,
+) -> StationAggregate:
+    """
+    Aplica `function` às tarefas no pool, com no máximo `max_in_flight` pendentes.
+
+    Parameters
+    ----------
+    pool : Pool
+        Pool de processos que executa as tarefas.
+    function : Callable[[Any], StationAggregate]
+        Função aplicada a cada tarefa.
+    tasks : Iterable[Any]
+        Argumentos de cada tarefa. O iterável é consumido somente quando há espaço
+        na janela, portanto um leitor lento ou rápido não acumula tarefas.
+    total : int
+        Número de tarefas, usado na barra de progresso.
+    max_in_flight : int, optional
+        Número máximo de tarefas enviadas e ainda não combinadas. O padrão é
+        `MAX_IN_FLIGHT`.
+    merge : Callable[[StationAggregate, Any], StationAggregate], optional
+        Combina o agregado acumulado com o resultado de uma tarefa. O padrão é
+        `StationAggregate.merge`.
+
+    Returns
+    -------
+    StationAggregate
+        Combinação dos resultados de todas as tarefas.
+
+    Notes
+    -----
+    - Os resultados são combinados na ordem de envio, assim que chegam, e a
+      memória fica limitada a `max_in_flight` tarefas, qualquer que seja o
+      tamanho do arquivo.
+    - Com as fases medidas, a obtenção de cada tarefa conta como `read` (no
+      leitor em chunks, inclui a leitura do CSV), o envio ao pool como
+      `dispatch`, a espera pelos workers como `wait` e a combinação como
+      `merge`; as fases dos workers são somadas com o prefixo `worker_`.
+    - A tarefa é serializada no processo principal, dentro de `dispatch`, e o
+      pool recebe apenas os bytes. Com `apply_async`, a serialização seria
+      feita pela thread do pool que envia as tarefas e não apareceria em
+      nenhuma fase.
+    """
+    aggregate: StationAggregate = StationAggregate.empty()
+    pending: Deque[AsyncResult] = deque()
+    function = worker_function(function)
+    merge = merge or StationAggregate.merge
+
+    def merge_oldest(aggregate: StationAggregate) -> StationAggregate:
+        with phase("wait"):
+            result = worker_result(pending.popleft().get())
+        with phase("merge"):
+            return merge(aggregate, result)
+
+    with tqdm(total=total, desc="Processando") as progress:
+        for task in timed_iter(tasks, "read"):
+            if len(pending) >= max(max_in_flight, 1):
+                aggregate = merge_oldest(aggregate)
+                progress.update()
+            with phase("dispatch"):
+                payload: bytes = pickle.dumps(
+                    (function, task), protocol=pickle.HIGHEST_PROTOCOL
+                )
+                pending.append(pool.apply_async(call_pickled, (payload,)))
+
+        while pending:
+            aggregate = merge_oldest(aggregate)
+            progress.update()
+
+    return aggregate
 
 
 def create_df_with_pandas(
-    filename: Path, total_linhas: int, chunksize: int = CHUNKSIZE
+    filename: Path,
+    total_linhas: int,
+    chunksize: int = CHUNKSIZE,
+    concurrency: int = CONCURRENCY,
+    sketch: bool = False,
+    histogram: bool = False,
 ) -> pd.DataFrame:
     """
     Processa o arquivo em chunks, aplicando agregação paralelizada.
@@ -44,29 +433,54 @@ def create_df_with_pandas(
     Parameters
     ----------
     filename : Path
-        O caminho para o arquivo de entrada.
+        O caminho para o arquivo de entrada, em texto ou no formato binário
+        colunar.
     total_linhas : int
         O número total de linhas no arquivo.
     chunksize : int, optional
         O tamanho de cada chunk a ser processado (padrão é 10% do total).
+    concurrency : int, optional
+        Número de processos usados. O padrão é o número de CPUs disponíveis.
+    sketch : bool, optional
+        Se verdadeiro, calcula também os quantis aproximados de cada estação
+        (colunas `p50`, `p95` e `p99`) na mesma leitura. O padrão é falso.
+    histogram : bool, optional
+        Se verdadeiro, calcula os quantis exatos e a moda de cada estação
+        (colunas `p50`, `p95`, `p99` e `mode`) a partir de histogramas com um
+        contador por décimo de grau. Tem prioridade sobre `sketch`. O padrão é
+        falso.
 
     Returns
     -------
     pd.DataFrame
         Um DataFrame final com as medições agregadas, contendo as colunas
-        'station', 'min', 'max' e 'mean'. Além disso, as primeiras linhas
-        do DataFrame são impressas.
+        'station', 'min', 'max' e 'mean'.
 
     Notes
     -----
     - O arquivo é lido em chunks para evitar sobrecarga de memória.
     - O processamento é paralelizado para melhorar a eficiência.
     - Um progresso visual é exibido usando `tqdm`.
+    - No máximo `in_flight_window(concurrency)` chunks ficam pendentes no pool
+      (nunca mais que `MAX_IN_FLIGHT`); o leitor espera o chunk mais antigo
+      antes de enviar outro, portanto o pico de memória é de cerca de
+      `MAX_IN_FLIGHT + 1` chunks, qualquer que seja o número de CPUs.
+    - Cada chunk retorna mínimo, máximo, soma e contagem, e a média é calculada
+      somente após combinar todos os chunks.
+    - Se `filename` estiver no formato binário colunar, as colunas mapeadas em
+      memória são agrupadas em blocos com `groupby` do Pandas, sem leitura de
+      texto.
     """
+    if is_binary_file(filename):
+        aggregate_file: StationAggregate = aggregate_binary_pandas(
+            filename, sketch=sketch, histogram=histogram
+        )
+        with phase("output"):
+            return pd.DataFrame(aggregate_file.to_columns())
+
     total_chunks: int = total_linhas // chunksize + (
         1 if total_linhas % chunksize else 0
     )
-    results: List[pd.DataFrame] = []
 
     with pd.read_csv(
         filename,
@@ -75,33 +489,276 @@ def create_df_with_pandas(
         names=["station", "measure"],
         chunksize=chunksize,
     ) as reader:
-        # Envolvendo o iterador com tqdm para visualizar o progresso
-        with Pool(CONCURRENCY) as pool:
-            for chunk in tqdm(reader, total=total_chunks, desc="Processando"):
-                # Processa cada chunk em paralelo
-                result = pool.apply_async(process_chunk, (chunk,))
-                results.append(result)
-
-            results = [result.get() for result in results]
-
-    final_df: pd.DataFrame = pd.concat(results, ignore_index=True)
-
-    final_aggregated_df: pd.DataFrame = (
-        final_df.groupby("station")
-        .agg({"min": "min", "max": "max", "mean": "mean"})
-        .reset_index()
-        .sort_values("station")
-    )
+        with Pool(concurrency) as pool:
+            # Processa cada chunk em paralelo, combinando os resultados à medida
+            # que chegam
+            aggregate: StationAggregate = reduce_bounded(
+                pool,
+                partial(process_chunk, sketch=sketch, histogram=histogram),
+                reader,
+                total_chunks,
+                in_flight_window(concurrency),
+            )
+
+    with phase("output"):
+        final_aggregated_df: pd.DataFrame = pd.DataFrame(aggregate.to_columns())
+
+    return final_aggregated_df
+
+
+def create_df_with_pandas_pipeline(
+    filename: Path,
+    total_linhas: int,
+    chunksize: int = CHUNKSIZE,
+    concurrency: int = CONCURRENCY,
+    max_in_flight: Optional[int] = None,
+    sketch: bool = False,
+    histogram: bool = False,
+) -> pd.DataFrame:
+    """
+    Processa o arquivo em intervalos de bytes lidos pelos próprios workers.
+
+    Parameters
+    ----------
+    filename : Path
+        O caminho para o arquivo de entrada, em texto ou no formato binário
+        colunar.
+    total_linhas : int
+        O número total de linhas no arquivo.
+    chunksize : int, optional
+        O número aproximado de linhas de cada intervalo (padrão é 10% do total).
+    concurrency : int, optional
+        Número de processos usados. O padrão é o número de CPUs disponíveis.
+    max_in_flight : int, optional
+        Número máximo de intervalos pendentes no pool. O padrão é
+        `in_flight_window(concurrency)`.
+    sketch : bool, optional
+        Se verdadeiro, calcula também os quantis aproximados de cada estação
+        (colunas `p50`, `p95` e `p99`) na mesma leitura. O padrão é falso.
+    histogram : bool, optional
+        Se verdadeiro, calcula os quantis exatos e a moda de cada estação
+        (colunas `p50`, `p95`, `p99` e `mode`) a partir de histogramas com um
+        contador por décimo de grau. Tem prioridade sobre `sketch`. O padrão é
+        falso.
+
+    Returns
+    -------
+    pd.DataFrame
+        Um DataFrame final com as medições agregadas, contendo as colunas
+        'station', 'min', 'max' e 'mean'.
+
+    Notes
+    -----
+    - Diferente de `create_df_with_pandas`, o processo principal não lê o
+      arquivo: ele envia apenas `(filename, início, fim)` e cada worker lê o
+      intervalo com `pd.read_csv`, sem serializar DataFrames entre processos.
+    - Os intervalos têm cerca de `chunksize` linhas, estimadas pelo tamanho médio
+      das linhas do arquivo, e terminam sempre em uma quebra de linha.
+    - O pico de memória é de cerca de `max_in_flight` intervalos (no padrão, no
+      máximo `MAX_IN_FLIGHT`), qualquer que seja o tamanho do arquivo ou o
+      número de CPUs.
+    """
+    if is_binary_file(filename):
+        return create_df_with_pandas(
+            filename, total_linhas, chunksize, concurrency, sketch, histogram
+        )
+
+    num_chunks: int = max(-(-total_linhas // chunksize), 1)
+    ranges = find_chunk_boundaries(filename, num_chunks)
+    tasks = ((filename, start, end) for start, end in ranges)
+
+    if max_in_flight is None:
+        max_in_flight = in_flight_window(concurrency)
+
+    with Pool(concurrency) as pool:
+        aggregate: StationAggregate = reduce_bounded(
+            pool,
+            partial(process_byte_range, sketch=sketch, histogram=histogram),
+            tasks,
+            len(ranges),
+            max_in_flight,
+        )
+
+    with phase("output"):
+        final_aggregated_df: pd.DataFrame = pd.DataFrame(aggregate.to_columns())
+
+    return final_aggregated_df
+
 
-    print(final_aggregated_df.head())
+def create_df_with_pandas_shared(
+    filename: Path,
+    total_linhas: int,
+    chunksize: int = CHUNKSIZE,
+    concurrency: int = CONCURRENCY,
+    max_in_flight: Optional[int] = None,
+    dictionary_file: Path = DICTIONARY_FILE,
+) -> pd.DataFrame:
+    """
+    Processa o arquivo com os resultados dos workers em memória compartilhada.
+
+    Parameters
+    ----------
+    filename : Path
+        O caminho para o arquivo de entrada, em texto ou no formato binário
+        colunar.
+    total_linhas : int
+        O número total de linhas no arquivo.
+    chunksize : int, optional
+        O número aproximado de linhas de cada intervalo (padrão é 10% do total).
+    concurrency : int, optional
+        Número de processos usados. O padrão é o número de CPUs disponíveis.
+    max_in_flight : int, optional
+        Número máximo de intervalos pendentes no pool, que é também o número de
+        blocos compartilhados. O padrão é `in_flight_window(concurrency)`.
+    dictionary_file : Path, optional
+        Arquivo do dicionário de estações. O padrão é
+        `station_dictionary.DICTIONARY_FILE`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Um DataFrame final com as medições agregadas, contendo as colunas
+        'station', 'min', 'max' e 'mean'.
+
+    Notes
+    -----
+    - Como em `create_df_with_pandas_pipeline`, cada worker lê o seu intervalo
+      do arquivo. Em vez de devolver um `StationAggregate` serializado, ele
+      grava mínimo, máximo, soma e contagem de cada estação, na posição dada
+      pelo dicionário de estações, em um bloco de `SharedResults`, e o processo
+      principal combina o bloco nos totais com NumPy.
+    - Há um bloco por tarefa pendente (cerca de 32 bytes por estação do
+      dicionário em cada um). Como `reduce_bounded` combina as tarefas em ordem
+      e limita as pendentes a `max_in_flight`, a tarefa anterior com o mesmo
+      bloco já foi combinada quando ele é reaproveitado.
+    - Somente as estações fora do dicionário voltam serializadas.
+    """
+    if is_binary_file(filename):
+        return create_df_with_pandas(filename, total_linhas, chunksize, concurrency)
+
+    dictionary = load_station_dictionary(dictionary_file)
+    num_chunks: int = max(-(-total_linhas // chunksize), 1)
+    ranges = find_chunk_boundaries(filename, num_chunks)
+
+    if max_in_flight is None:
+        max_in_flight = in_flight_window(concurrency)
+    max_in_flight = max(max_in_flight, 1)
+
+    with SharedResults(len(dictionary.stations), max_in_flight) as shared:
+        names = shared.names
+        tasks = (
+            (filename, start, end, task % max_in_flight, names[task % max_in_flight])
+            for task, (start, end) in enumerate(ranges)
+        )
+
+        def merge_block(
+            aggregate: StationAggregate,
+            result: Tuple[int, Optional[StationAggregate]],
+        ) -> StationAggregate:
+            block, unknown = result
+            shared.reduce(block)
+            return aggregate if unknown is None else aggregate.merge(unknown)
+
+        with Pool(concurrency) as pool:
+            unknown: StationAggregate = reduce_bounded(
+                pool,
+                partial(process_byte_range_shared, dictionary_file=dictionary_file),
+                tasks,
+                len(ranges),
+                max_in_flight,
+                merge_block,
+            )
+
+        with phase("merge"):
+            aggregate: StationAggregate = shared.to_aggregate(
+                dictionary.stations
+            ).merge(unknown)
+
+    with phase("output"):
+        final_aggregated_df: pd.DataFrame = pd.DataFrame(aggregate.to_columns())
 
     return final_aggregated_df
 
 
+@register_engine(
+    "pandas", streaming=True, parallel=True, needs_row_count=True, tunable=TUNABLE
+)
+def run_pandas(filename: Path, rows: int, config: Dict[str, Any]) -> pd.DataFrame:
+    """Executa `create_df_with_pandas` com a assinatura do registro."""
+    return create_df_with_pandas(
+        filename,
+        rows,
+        config.get("chunksize", CHUNKSIZE),
+        config.get("concurrency", CONCURRENCY),
+        config.get("sketch", False),
+        config.get("histogram", False),
+    )
+
+
+@register_engine(
+    "pandas_pipeline",
+    streaming=True,
+    parallel=True,
+    needs_row_count=True,
+    tunable=TUNABLE,
+)
+def run_pandas_pipeline(
+    filename: Path, rows: int, config: Dict[str, Any]
+) -> pd.DataFrame:
+    """Executa `create_df_with_pandas_pipeline` com a assinatura do registro."""
+    return create_df_with_pandas_pipeline(
+        filename,
+        rows,
+        config.get("chunksize", CHUNKSIZE),
+        config.get("concurrency", CONCURRENCY),
+        config.get("max_in_flight"),
+        config.get("sketch", False),
+        config.get("histogram", False),
+    )
+
+
+@register_engine(
+    "pandas_shared",
+    streaming=True,
+    parallel=True,
+    needs_row_count=True,
+    tunable=TUNABLE,
+)
+def run_pandas_shared(
+    filename: Path, rows: int, config: Dict[str, Any]
+) -> pd.DataFrame:
+    """Executa `create_df_with_pandas_shared` com a assinatura do registro."""
+    dictionary_file: Optional[str] = config.get("dictionary_file")
+    return create_df_with_pandas_shared(
+        filename,
+        rows,
+        config.get("chunksize", CHUNKSIZE),
+        config.get("concurrency", CONCURRENCY),
+        config.get("max_in_flight"),
+        Path(dictionary_file) if dictionary_file else DICTIONARY_FILE,
+    )
+
+
+@register_partial("pandas")
+@register_partial("pandas_pipeline")
+@register_partial("pandas_shared")
+def run_pandas_partial(
+    filename: Path, start: int, end: int, config: Dict[str, Any]
+) -> StationAggregate:
+    """Agrega um intervalo de bytes com `process_byte_range`, em um processo."""
+    return process_byte_range(
+        (filename, start, end),
+        config.get("sketch", False),
+        config.get("histogram", False),
+    )
+
+
 if __name__ == "__main__":
 
     import time
 
+    from verification import preview_result
+
     print("Iniciando o processamento do arquivo.")
     start_time: float = time.time()
     df: pd.DataFrame = create_df_with_pandas(
@@ -109,4 +766,5 @@ if __name__ == "__main__":
     )
     took: float = time.time() - start_time
 
+    print(preview_result(df))
     print(f"Processing took: {took:.2f} sec")
@@ -1,10 +1,23 @@
 """Processando os dados com Polars."""
 
+import io
+import os
+import warnings
+from multiprocessing import cpu_count, get_context
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
 
+import numpy as np
 import polars as pl
 
-from create_measurements import FILENAME_OUTPUT, NUM_ROWS_TO_CREATE
+from aggregate import StationAggregate
+from binary_columns import BinaryMeasurements, open_binary
+from binary_format import is_binary_file
+from create_measurements import build_weather_station_name_list
+from fixed_point import SCALE
+from phase_timer import phase, timed
+from registry import register_engine, register_partial
+from settings import FILENAME_OUTPUT, NUM_ROWS_TO_CREATE
 
 """
 Esse código criado por Roen Vossen, porém, alterado por Gregory Oliveira
@@ -19,6 +32,174 @@ como estudo de programação.
 # Tamanho do chunk baseado em 10% do total de linhas
 CHUNKSIZE: int = int(NUM_ROWS_TO_CREATE * 0.1)
 
+CONCURRENCY: int = cpu_count()
+
+# Número de lotes pedidos de cada vez ao leitor de `pl.read_csv_batched`
+BATCHES_PER_READ: int = 4
+
+# Variantes registradas, comparadas por `python src/solution_polars.py`
+POLARS_VARIANTS: List[str] = [
+    "polars",
+    "polars_new_streaming",
+    "polars_threads",
+    "polars_batched",
+    "polars_enum",
+]
+
+
+def scan_measurements(filename: Path) -> pl.LazyFrame:
+    """Cria o LazyFrame do arquivo de medições, com as colunas `station` e `measure`."""
+    return pl.scan_csv(
+        filename,
+        separator=";",
+        has_header=False,
+        new_columns=["station", "measure"],
+        schema={"station": pl.String, "measure": pl.Float64},
+    )
+
+
+def aggregate_measurements(measurements: pl.LazyFrame) -> pl.LazyFrame:
+    """Agrupa as medições por estação, com máximo, mínimo e média, ordenadas."""
+    return (
+        measurements.group_by("station")
+        .agg(
+            [
+                pl.col("measure").max().alias("max"),
+                pl.col("measure").min().alias("min"),
+                pl.col("measure").mean().alias("mean"),
+            ]
+        )
+        .sort("station")
+    )
+
+
+@timed("aggregate")
+def aggregate_batch(batch: pl.DataFrame) -> StationAggregate:
+    """Agrega um lote de medições em mínimo, máximo, soma e contagem por estação."""
+    partial = batch.group_by("station").agg(
+        pl.col("measure").min().alias("min"),
+        pl.col("measure").max().alias("max"),
+        pl.col("measure").sum().alias("sum"),
+        pl.col("measure").count().alias("count"),
+    )
+    return StationAggregate.from_columns(
+        partial["station"].to_numpy(),
+        partial["min"].to_numpy(),
+        partial["max"].to_numpy(),
+        partial["sum"].to_numpy(),
+        partial["count"].to_numpy(),
+    )
+
+
+def binary_frame(
+    measurements: BinaryMeasurements, start: int = 0, end: Optional[int] = None
+) -> pl.DataFrame:
+    """Monta um DataFrame com as linhas `[start, end)` das colunas binárias."""
+    return pl.DataFrame(
+        {
+            "station_id": np.asarray(measurements.station_ids[start:end]),
+            "tenths": np.asarray(measurements.tenths[start:end]),
+        }
+    )
+
+
+def aggregate_binary_columns(measurements: pl.LazyFrame) -> pl.LazyFrame:
+    """Agrupa as colunas binárias pelo identificador da estação, em décimos de grau."""
+    return measurements.group_by("station_id").agg(
+        pl.col("tenths").min().alias("min"),
+        pl.col("tenths").max().alias("max"),
+        pl.col("tenths").cast(pl.Int64).sum().alias("sum"),
+        pl.col("tenths").count().alias("count"),
+    )
+
+
+def binary_partial_to_aggregate(
+    partial: pl.DataFrame, stations: np.ndarray
+) -> StationAggregate:
+    """Monta um `StationAggregate` com o resultado de `aggregate_binary_columns`."""
+    return StationAggregate.from_columns(
+        stations[partial["station_id"].to_numpy()],
+        partial["min"].to_numpy(),
+        partial["max"].to_numpy(),
+        partial["sum"].to_numpy(),
+        partial["count"].to_numpy(),
+        scale=SCALE,
+    )
+
+
+def create_polars_df_binary(
+    filename: Path, chunksize: Optional[int] = None, new_streaming: bool = False
+) -> pl.DataFrame:
+    """
+    Agrega um arquivo binário colunar com `group_by` do Polars.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo no formato binário colunar.
+    chunksize : int, optional
+        Se informado, a consulta é executada pelo engine de streaming antigo com
+        lotes desse tamanho. O padrão é executá-la em memória.
+    new_streaming : bool, optional
+        Se verdadeiro, usa o novo engine de streaming. O padrão é falso.
+
+    Returns
+    -------
+    pl.DataFrame
+        DataFrame com `station`, `max`, `min` e `mean`, ordenado pela estação.
+
+    Notes
+    -----
+    As colunas mapeadas em memória viram um DataFrame agrupado pelo
+    identificador da estação (uint16), portanto os nomes só são associados aos
+    grupos, nunca às linhas.
+    """
+    measurements = open_binary(filename)
+    stations = np.asarray(measurements.stations, dtype=object)
+    with phase("read"):
+        query = aggregate_binary_columns(binary_frame(measurements).lazy())
+
+    with phase("aggregate"):
+        if new_streaming:
+            partial = collect_new_streaming(query)
+        elif chunksize is not None:
+            with pl.Config(streaming_chunk_size=chunksize):
+                partial = query.collect(streaming=True)
+        else:
+            partial = query.collect()
+        aggregate = binary_partial_to_aggregate(partial, stations)
+
+    with phase("output"):
+        return pl.DataFrame(aggregate.to_columns()).select(
+            ["station", "max", "min", "mean"]
+        )
+
+
+def collect_new_streaming(query: pl.LazyFrame) -> pl.DataFrame:
+    """
+    Executa a consulta com o novo engine de streaming do Polars.
+
+    Parameters
+    ----------
+    query : pl.LazyFrame
+        Consulta a ser executada.
+
+    Returns
+    -------
+    pl.DataFrame
+        Resultado da consulta.
+
+    Notes
+    -----
+    Versões recentes do Polars escolhem o engine com `engine="streaming"`; nas
+    anteriores (como a 1.24), o novo engine é ativado com `new_streaming=True`.
+    O argumento `engine` é validado antes de qualquer leitura.
+    """
+    try:
+        return query.collect(engine="streaming")
+    except ValueError:
+        return query.collect(new_streaming=True)
+
 
 def create_polars_df_streaming(
     filename: Path, chunksize: int = CHUNKSIZE
@@ -33,7 +214,8 @@ def create_polars_df_streaming(
     Parameters
     ----------
     filename : Path
-        Caminho do arquivo CSV a ser processado.
+        Caminho do arquivo CSV a ser processado ou de um arquivo no formato
+        binário colunar.
     chunksize : int, optional
         Tamanho do chunk para processamento em streaming. O valor padrão é
         10% do número total de linhas (CHUNKSIZE).
@@ -56,45 +238,346 @@ def create_polars_df_streaming(
     - O arquivo CSV deve ter um separador de campo `;` e não possuir cabeçalho.
     - As colunas esperadas no CSV são renomeadas para `station` e `measure`.
     - O schema especificado espera que `station` seja string e `measure` seja float64.
+    - Se `filename` estiver no formato binário colunar, as colunas são agregadas
+      com `create_polars_df_binary`, sem leitura de texto.
+    """
+    if is_binary_file(filename):
+        return create_polars_df_binary(filename, chunksize)
+
+    # Lê o CSV em streaming e processa os dados por chunks. O tamanho do chunk
+    # só vale dentro do bloco, sem alterar a configuração global do Polars. A
+    # consulta une leitura, parsing e agregação, medidas juntas como `aggregate`
+    aggregated = aggregate_measurements(scan_measurements(filename))
+    with pl.Config(streaming_chunk_size=chunksize), phase("aggregate"):
+        df = aggregated.collect(streaming=True)
+
+    return df
+
+
+def create_polars_df_new_streaming(filename: Path) -> pl.DataFrame:
+    """
+    Processa o arquivo com o novo engine de streaming do Polars.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho do arquivo CSV ou de um arquivo no formato binário colunar.
+
+    Returns
+    -------
+    pl.DataFrame
+        DataFrame com `station`, `max`, `min` e `mean`, ordenado pela estação.
+
+    Notes
+    -----
+    O novo engine escolhe sozinho o tamanho dos lotes, portanto não usa
+    `chunksize` nem `pl.Config.set_streaming_chunk_size`.
+    """
+    if is_binary_file(filename):
+        return create_polars_df_binary(filename, new_streaming=True)
+
+    with phase("aggregate"):
+        return collect_new_streaming(
+            aggregate_measurements(scan_measurements(filename))
+        )
+
+
+def collect_in_process(filename: Path, new_streaming: bool) -> pl.DataFrame:
+    """Executa a consulta do arquivo no processo atual, com ou sem streaming."""
+    if is_binary_file(filename):
+        return create_polars_df_binary(filename, new_streaming=new_streaming)
+    query = aggregate_measurements(scan_measurements(filename))
+    return collect_new_streaming(query) if new_streaming else query.collect()
+
+
+def create_polars_df_threads(
+    filename: Path, concurrency: int = CONCURRENCY, new_streaming: bool = False
+) -> pl.DataFrame:
+    """
+    Processa o arquivo com um número fixo de threads do Polars.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho do arquivo CSV ou de um arquivo no formato binário colunar.
+    concurrency : int, optional
+        Número de threads do Polars. O padrão é o número de CPUs disponíveis.
+    new_streaming : bool, optional
+        Se verdadeiro, usa o novo engine de streaming; senão, o engine em
+        memória. O padrão é falso.
+
+    Returns
+    -------
+    pl.DataFrame
+        DataFrame com `station`, `max`, `min` e `mean`, ordenado pela estação.
+
+    Notes
+    -----
+    O pool de threads do Polars é criado na importação, com o tamanho de
+    `POLARS_MAX_THREADS`, e não pode ser alterado depois. Se o tamanho pedido
+    for diferente do atual, a consulta é executada em um processo novo
+    (`spawn`) com a variável de ambiente definida, e o tempo de iniciar o
+    processo e importar o Polars entra na medição.
     """
-    pl.Config.set_streaming_chunk_size(chunksize)
+    if concurrency == pl.thread_pool_size():
+        with phase("aggregate"):
+            df = collect_in_process(filename, new_streaming)
+    else:
+        previous: Optional[str] = os.environ.get("POLARS_MAX_THREADS")
+        os.environ["POLARS_MAX_THREADS"] = str(concurrency)
+        try:
+            with get_context("spawn").Pool(1) as pool, phase("wait"):
+                df = pool.apply(collect_in_process, (filename, new_streaming))
+        finally:
+            if previous is None:
+                del os.environ["POLARS_MAX_THREADS"]
+            else:
+                os.environ["POLARS_MAX_THREADS"] = previous
+
+    return df
+
+
+def create_polars_df_batched(
+    filename: Path, chunksize: int = CHUNKSIZE
+) -> pl.DataFrame:
+    """
+    Lê o arquivo em lotes com `pl.read_csv_batched` e combina os agregados.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho do arquivo CSV ou de um arquivo no formato binário colunar.
+    chunksize : int, optional
+        Número de linhas de cada lote. O padrão é `CHUNKSIZE`.
 
-    # Lê o CSV em streaming
-    df_stream = pl.scan_csv(
+    Returns
+    -------
+    pl.DataFrame
+        DataFrame com `station`, `min`, `max` e `mean`, ordenado pela estação.
+
+    Notes
+    -----
+    Cada lote é agregado pelo Polars (mínimo, máximo, soma e contagem) e
+    combinado com os anteriores em um `StationAggregate`, portanto a memória
+    depende do tamanho do lote e do número de estações, não do arquivo.
+    """
+    if is_binary_file(filename):
+        return create_polars_df_binary_batched(filename, chunksize)
+
+    reader = pl.read_csv_batched(
         filename,
         separator=";",
         has_header=False,
         new_columns=["station", "measure"],
-        schema={"station": pl.String, "measure": pl.Float64},
+        schema_overrides={"station": pl.String, "measure": pl.Float64},
+        batch_size=chunksize,
     )
+    aggregate: StationAggregate = StationAggregate.empty()
+    while True:
+        # Leitura e parsing dos lotes, feitos juntos pelo leitor do Polars
+        with phase("read"):
+            batches = reader.next_batches(BATCHES_PER_READ)
+        if not batches:
+            break
+        for batch in batches:
+            partial = aggregate_batch(batch)
+            with phase("merge"):
+                aggregate = aggregate.merge(partial)
 
-    # Processa os dados por chunks
-    aggregated = (
-        df_stream.group_by("station")
-        .agg(
-            [
-                pl.col("measure").max().alias("max"),
-                pl.col("measure").min().alias("min"),
-                pl.col("measure").mean().alias("mean"),
-            ]
-        )
-        .sort("station")
-    )
+    with phase("output"):
+        return pl.DataFrame(aggregate.to_columns())
 
-    df = aggregated.collect(streaming=True)
 
-    print(df)
+def create_polars_df_binary_batched(
+    filename: Path, chunksize: int = CHUNKSIZE
+) -> pl.DataFrame:
+    """
+    Agrega um arquivo binário colunar em lotes de `chunksize` linhas.
+
+    Parameters
+    ----------
+    filename : Path
+        Arquivo no formato binário colunar.
+    chunksize : int, optional
+        Número de linhas de cada lote. O padrão é `CHUNKSIZE`.
+
+    Returns
+    -------
+    pl.DataFrame
+        DataFrame com `station`, `min`, `max` e `mean`, ordenado pela estação.
+
+    Notes
+    -----
+    Como em `create_polars_df_batched`, cada lote é agregado pelo Polars e
+    combinado com os anteriores em um `StationAggregate`.
+    """
+    measurements = open_binary(filename)
+    stations = np.asarray(measurements.stations, dtype=object)
+    aggregate: StationAggregate = StationAggregate.empty()
+    for start in range(0, len(measurements.tenths), max(chunksize, 1)):
+        with phase("read"):
+            batch = binary_frame(measurements, start, start + chunksize)
+        with phase("aggregate"):
+            partial = binary_partial_to_aggregate(
+                aggregate_binary_columns(batch.lazy()).collect(), stations
+            )
+        with phase("merge"):
+            aggregate = aggregate.merge(partial)
+
+    with phase("output"):
+        return pl.DataFrame(aggregate.to_columns())
+
+
+def create_polars_df_enum(
+    filename: Path,
+    stations: Optional[Sequence[str]] = None,
+    new_streaming: bool = True,
+) -> pl.DataFrame:
+    """
+    Processa o arquivo com a estação como `pl.Enum` das estações conhecidas.
+
+    Parameters
+    ----------
+    filename : Path
+        Caminho do arquivo CSV ou de um arquivo no formato binário colunar.
+    stations : Sequence[str], optional
+        Estações conhecidas. O padrão é `build_weather_station_name_list()`.
+    new_streaming : bool, optional
+        Se verdadeiro (padrão), usa o novo engine de streaming.
+
+    Returns
+    -------
+    pl.DataFrame
+        DataFrame com `station`, `max`, `min` e `mean`, ordenado pela estação.
+
+    Notes
+    -----
+    - As categorias do Enum estão em ordem alfabética, portanto a ordenação
+      final compara os códigos inteiros das estações, e o agrupamento usa os
+      códigos em vez de hashes de strings.
+    - O `scan_csv` não aplica um Enum declarado no schema, por isso a coluna é
+      convertida com `cast`, que falha se aparecer uma estação desconhecida;
+      nesse caso, o arquivo é processado de novo com a estação como texto e um
+      `RuntimeWarning` é emitido, sem imprimir nada durante a medição.
+    """
+    if is_binary_file(filename):
+        return create_polars_df_binary(filename, new_streaming=new_streaming)
+
+    stations = build_weather_station_name_list() if stations is None else stations
+    station_enum = pl.Enum(sorted(set(stations)))
+    query = aggregate_measurements(
+        scan_measurements(filename).with_columns(pl.col("station").cast(station_enum))
+    )
+    with phase("aggregate"):
+        try:
+            df = collect_new_streaming(query) if new_streaming else query.collect()
+            df = df.with_columns(pl.col("station").cast(pl.String))
+        except pl.exceptions.InvalidOperationError:
+            warnings.warn(
+                "Há estações fora da lista conhecida; processando como texto.",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+            df = collect_in_process(filename, new_streaming)
 
     return df
 
 
+@register_engine("polars", streaming=True, parallel=True, tunable=("chunksize",))
+def run_polars(filename: Path, rows: int, config: Dict[str, Any]) -> pl.DataFrame:
+    """Executa `create_polars_df_streaming` com a assinatura do registro."""
+    return create_polars_df_streaming(filename, config.get("chunksize", CHUNKSIZE))
+
+
+@register_engine("polars_new_streaming", streaming=True, parallel=True)
+def run_polars_new_streaming(
+    filename: Path, rows: int, config: Dict[str, Any]
+) -> pl.DataFrame:
+    """Executa `create_polars_df_new_streaming` com a assinatura do registro."""
+    return create_polars_df_new_streaming(filename)
+
+
+@register_engine(
+    "polars_threads", streaming=True, parallel=True, tunable=("concurrency",)
+)
+def run_polars_threads(
+    filename: Path, rows: int, config: Dict[str, Any]
+) -> pl.DataFrame:
+    """Executa `create_polars_df_threads` com a assinatura do registro."""
+    return create_polars_df_threads(
+        filename,
+        config.get("concurrency", CONCURRENCY),
+        config.get("new_streaming", False),
+    )
+
+
+@register_engine(
+    "polars_batched", streaming=True, parallel=True, tunable=("chunksize",)
+)
+def run_polars_batched(
+    filename: Path, rows: int, config: Dict[str, Any]
+) -> pl.DataFrame:
+    """Executa `create_polars_df_batched` com a assinatura do registro."""
+    return create_polars_df_batched(filename, config.get("chunksize", CHUNKSIZE))
+
+
+@register_engine("polars_enum", streaming=True, parallel=True)
+def run_polars_enum(filename: Path, rows: int, config: Dict[str, Any]) -> pl.DataFrame:
+    """Executa `create_polars_df_enum` com a assinatura do registro."""
+    return create_polars_df_enum(
+        filename, new_streaming=config.get("new_streaming", True)
+    )
+
+
+@register_partial("polars")
+@register_partial("polars_new_streaming")
+@register_partial("polars_batched")
+def run_polars_partial(
+    filename: Path, start: int, end: int, config: Dict[str, Any]
+) -> StationAggregate:
+    """Agrega um intervalo de bytes lido com `pl.read_csv` com `aggregate_batch`."""
+    with phase("read"):
+        with open(filename, "rb") as file:
+            file.seek(start)
+            data: bytes = file.read(end - start)
+    with phase("parse"):
+        batch = pl.read_csv(
+            io.BytesIO(data),
+            separator=";",
+            has_header=False,
+            new_columns=["station", "measure"],
+            schema_overrides={"station": pl.String, "measure": pl.Float64},
+        )
+    return aggregate_batch(batch)
+
+
 if __name__ == "__main__":
-    import time
+    import sys
 
-    start_time = time.time()
+    from record_result import load_results, record_engine
+    from registry import get_engine
+    from verification import normalize_result
 
-    # Chama a função para criar o DataFrame processado
-    df = create_polars_df_streaming(FILENAME_OUTPUT, CHUNKSIZE)
-    took = time.time() - start_time
+    # Compara as variantes: `python solution_polars.py [arquivo linhas]`
+    filename = Path(sys.argv[1]) if len(sys.argv) > 1 else FILENAME_OUTPUT
+    rows: int = int(sys.argv[2]) if len(sys.argv) > 2 else NUM_ROWS_TO_CREATE
 
-    print(f"Polars Took: {took:.2f} sec")
+    reference = None
+    for variant in POLARS_VARIANTS:
+        result = record_engine(get_engine(variant), filename, rows, reference=reference)
+        if reference is None:
+            reference = normalize_result(result)
+
+    latest = {
+        record["library"]: record
+        for record in load_results()
+        if record["schema_version"] >= 2
+        and record["rows"] == rows
+        and record["library"] in POLARS_VARIANTS
+    }
+    for variant in sorted(latest, key=lambda name: latest[name]["wall_s_median"]):
+        record = latest[variant]
+        print(
+            f"{variant}: {record['wall_s_median']:.3f}s, "
+            f"pico de memória {record.get('peak_rss_bytes', 0) / 2**20:,.0f} MiB"
+        )
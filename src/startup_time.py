@@ -0,0 +1,197 @@
+"""Medição do tempo de importação dos módulos com `python -X importtime`."""
+
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from registry import ENGINE_MODULES
+from settings import BASE_DIR
+
+# Linha do `-X importtime`: "import time: <self us> | <cumulativo us> | <módulo>",
+# com o nome do módulo indentado conforme a profundidade da importação
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+# Número de pacotes mais lentos mostrados em cada relatório
+TOP_PACKAGES: int = 5
+
+
+class ImportTiming(NamedTuple):
+    """
+    Tempo de importação de um módulo, como reportado por `-X importtime`.
+
+    Attributes
+    ----------
+    module : str
+        Nome completo do módulo.
+    self_s : float
+        Tempo gasto no próprio módulo, em segundos.
+    cumulative_s : float
+        Tempo do módulo e de tudo que ele importou pela primeira vez.
+    depth : int
+        Nível de aninhamento da importação (0 para importações diretas).
+    """
+
+    module: str
+    self_s: float
+    cumulative_s: float
+    depth: int
+
+
+class StartupReport(NamedTuple):
+    """
+    Custo de inicialização de um módulo em um interpretador novo.
+
+    Attributes
+    ----------
+    module : str
+        Módulo importado.
+    import_s : float
+        Tempo cumulativo de importação do módulo, em segundos.
+    process_s : float
+        Tempo total do processo, incluindo a inicialização do interpretador.
+    packages : List[Tuple[str, float]]
+        Pacotes de nível superior que mais contribuíram, com o tempo próprio
+        somado de todos os seus submódulos, do mais lento para o mais rápido.
+    """
+
+    module: str
+    import_s: float
+    process_s: float
+    packages: List[Tuple[str, float]]
+
+
+def parse_import_time(output: str) -> List[ImportTiming]:
+    """
+    Lê a saída de `python -X importtime`.
+
+    Parameters
+    ----------
+    output : str
+        Texto escrito pelo interpretador na saída de erros.
+
+    Returns
+    -------
+    List[ImportTiming]
+        Uma entrada por módulo importado, na ordem da saída. O cabeçalho e as
+        demais linhas são ignorados.
+    """
+    timings: List[ImportTiming] = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            timings.append(
+                ImportTiming(
+                    module,
+                    int(self_us) / 1e6,
+                    int(cumulative_us) / 1e6,
+                    len(indent) // 2,
+                )
+            )
+    return timings
+
+
+def measure_import_time(module: str, python: Optional[str] = None) -> StartupReport:
+    """
+    Mede o tempo de importação de um módulo de `src` em um interpretador novo.
+
+    Parameters
+    ----------
+    module : str
+        Nome do módulo, por exemplo `solution_polars`.
+    python : str, optional
+        Interpretador usado. O padrão é o interpretador atual.
+
+    Returns
+    -------
+    StartupReport
+        Tempo de importação do módulo, tempo total do processo e os pacotes mais
+        lentos.
+
+    Raises
+    ------
+    RuntimeError
+        Se a importação falhar, por exemplo por falta de uma biblioteca.
+
+    Notes
+    -----
+    Cada medição usa um processo separado, portanto nenhum módulo já está em
+    `sys.modules` e o tempo medido é o de uma execução pela linha de comando.
+    """
+    start_time: float = time.perf_counter()
+    completed = subprocess.run(
+        [python or sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    process_s: float = time.perf_counter() - start_time
+    if completed.returncode != 0:
+        raise RuntimeError(
+            f"Falha ao importar {module}: {completed.stderr.strip().splitlines()[-1]}"
+        )
+
+    timings = parse_import_time(completed.stderr)
+    top_level: List[int] = [
+        position for position, timing in enumerate(timings) if timing.depth == 0
+    ]
+    # Os submódulos aparecem antes de quem os importou, portanto as importações
+    # feitas por `module` são as linhas desde a importação direta anterior
+    end: int = max(
+        position for position in top_level if timings[position].module == module
+    )
+    start: int = max((position for position in top_level if position < end), default=-1)
+
+    by_package: Dict[str, float] = defaultdict(float)
+    for timing in timings[start + 1 : end + 1]:
+        by_package[timing.module.split(".")[0]] += timing.self_s
+    packages = sorted(by_package.items(), key=lambda item: item[1], reverse=True)
+
+    return StartupReport(
+        module, timings[end].cumulative_s, process_s, packages[:TOP_PACKAGES]
+    )
+
+
+def engine_startup_time(engine_name: str) -> StartupReport:
+    """
+    Mede o tempo de importação do módulo de uma solução do registro.
+
+    Parameters
+    ----------
+    engine_name : str
+        Nome da solução, presente em `registry.ENGINE_MODULES`.
+
+    Returns
+    -------
+    StartupReport
+        Custo de inicialização do módulo que registra a solução.
+    """
+    return measure_import_time(ENGINE_MODULES[engine_name])
+
+
+def format_report(report: StartupReport) -> str:
+    """Formata o relatório em uma linha."""
+    packages: str = ", ".join(
+        f"{package} {seconds * 1000:.0f} ms" for package, seconds in report.packages
+    )
+    return (
+        f"{report.module}: importação {report.import_s * 1000:.0f} ms, "
+        f"processo {report.process_s * 1000:.0f} ms ({packages})"
+    )
+
+
+if __name__ == "__main__":
+    # Mede os pontos de entrada e os módulos de todas as soluções
+    modules: List[str] = sys.argv[1:] or [
+        "run_tests",
+        "record_result",
+        *dict.fromkeys(ENGINE_MODULES.values()),
+    ]
+    for module_name in modules:
+        try:
+            print(format_report(measure_import_time(module_name)))
+        except RuntimeError as e:
+            print(e)
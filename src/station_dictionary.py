@@ -0,0 +1,365 @@
+"""Dicionário de estações com hash perfeito, gerado a partir da lista de estações."""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from binary_columns import hash_names, hash_powers
+from create_measurements import build_weather_station_name_list
+from settings import BASE_DIR
+
+DICTIONARY_FILE: Path = BASE_DIR / "../data/station_dictionary.npz"
+DICTIONARY_VERSION: int = 1
+
+# Número médio de nomes por bucket do primeiro nível do hash perfeito
+KEYS_PER_BUCKET: int = 4
+
+# Ocupação máxima da tabela de slots. Com mais folga, os deslocamentos são
+# encontrados em menos tentativas
+MAX_LOAD_FACTOR: float = 0.8
+
+# Número máximo de deslocamentos testados por bucket antes de desistir
+MAX_DISPLACEMENT: int = 1 << 20
+
+# Constantes ímpares que espalham os bits do hash dos nomes
+BUCKET_MULTIPLIER: int = 0x9E3779B97F4A7C15
+SLOT_MULTIPLIER: int = 0xC2B2AE3D27D4EB4F
+
+# Identificador das linhas cuja estação não está no dicionário
+UNKNOWN_STATION: int = -1
+
+
+class StationDictionary(NamedTuple):
+    """
+    Tabela de hash perfeito dos nomes das estações conhecidas.
+
+    Attributes
+    ----------
+    stations : List[str]
+        Nomes das estações, em ordem alfabética. O identificador de uma estação é
+        a sua posição nesta lista.
+    hashes : np.ndarray
+        Hash de 64 bits (`binary_columns.hash_names`) do nome de cada estação.
+    displacements : np.ndarray
+        Deslocamento (uint64) de cada bucket do primeiro nível.
+    slot_ids : np.ndarray
+        Identificador (int32) da estação em cada slot, ou `UNKNOWN_STATION` nos
+        slots vazios.
+    source_digest : str
+        Hash SHA-256 da lista de estações usada para gerar a tabela.
+    """
+
+    stations: List[str]
+    hashes: np.ndarray
+    displacements: np.ndarray
+    slot_ids: np.ndarray
+    source_digest: str
+
+
+def names_digest(names: Sequence[str]) -> str:
+    """Calcula o hash SHA-256 de uma lista de nomes, sem depender da ordem."""
+    return hashlib.sha256("\n".join(sorted(names)).encode("utf-8")).hexdigest()
+
+
+def hash_station_names(names: Sequence[str]) -> np.ndarray:
+    """
+    Calcula o hash de 64 bits de cada nome, igual ao das linhas do arquivo.
+
+    Parameters
+    ----------
+    names : Sequence[str]
+        Nomes das estações.
+
+    Returns
+    -------
+    np.ndarray
+        Hash (uint64) de cada nome, calculado por `binary_columns.hash_names`.
+    """
+    encoded: List[bytes] = [name.encode("utf-8") for name in names]
+    ends = np.cumsum([len(name) for name in encoded], dtype=np.int64)
+    starts = ends - [len(name) for name in encoded]
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return hash_names(data, starts, ends)
+
+
+def bucket_of(hashes: np.ndarray, num_buckets: int) -> np.ndarray:
+    """Calcula o bucket do primeiro nível de cada hash."""
+    bits: int = num_buckets.bit_length() - 1
+    return (hashes * np.uint64(BUCKET_MULTIPLIER)) >> np.uint64(64 - bits)
+
+
+def slot_of(hashes: np.ndarray, displacements: np.ndarray, num_slots: int):
+    """Calcula o slot de cada hash, dado o deslocamento do seu bucket."""
+    bits: int = num_slots.bit_length() - 1
+    return ((hashes ^ displacements) * np.uint64(SLOT_MULTIPLIER)) >> np.uint64(
+        64 - bits
+    )
+
+
+def build_station_dictionary(names: Sequence[str]) -> StationDictionary:
+    """
+    Gera a tabela de hash perfeito de uma lista de estações.
+
+    Parameters
+    ----------
+    names : Sequence[str]
+        Nomes das estações. Nomes repetidos são ignorados.
+
+    Returns
+    -------
+    StationDictionary
+        Tabela em que cada nome ocupa um slot diferente.
+
+    Raises
+    ------
+    ValueError
+        Se dois nomes diferentes tiverem o mesmo hash de 64 bits, ou se algum
+        bucket não couber na tabela após `MAX_DISPLACEMENT` tentativas.
+
+    Notes
+    -----
+    Usa o método "hash and displace" (CHD): os nomes são distribuídos em
+    buckets de cerca de `KEYS_PER_BUCKET` nomes e, dos buckets maiores para os
+    menores, cada bucket recebe o primeiro deslocamento que leva todos os seus
+    nomes para slots livres. A consulta custa dois acessos a arrays por linha,
+    sem comparações de strings.
+    """
+    stations: List[str] = sorted(set(names))
+    hashes = hash_station_names(stations)
+    if len(np.unique(hashes)) != len(hashes):
+        raise ValueError("Há nomes de estações diferentes com o mesmo hash.")
+
+    num_buckets: int = 1 << max((len(stations) // KEYS_PER_BUCKET).bit_length(), 1)
+    num_slots: int = 1 << max(
+        int(np.ceil(np.log2(max(len(stations), 1) / MAX_LOAD_FACTOR))), 1
+    )
+
+    buckets = bucket_of(hashes, num_buckets)
+    order = np.argsort(buckets, kind="stable")
+    bucket_ids, bucket_starts, bucket_sizes = np.unique(
+        buckets[order], return_index=True, return_counts=True
+    )
+
+    displacements = np.zeros(num_buckets, dtype=np.uint64)
+    slot_ids = np.full(num_slots, UNKNOWN_STATION, dtype=np.int32)
+    for position in np.argsort(-bucket_sizes, kind="stable"):
+        start: int = bucket_starts[position]
+        members = order[start : start + bucket_sizes[position]]
+        for displacement in range(MAX_DISPLACEMENT):
+            slots = slot_of(hashes[members], np.uint64(displacement), num_slots)
+            if (slot_ids[slots] == UNKNOWN_STATION).all() and len(
+                np.unique(slots)
+            ) == len(slots):
+                break
+        else:
+            raise ValueError("Não foi possível gerar o hash perfeito das estações.")
+        displacements[bucket_ids[position]] = displacement
+        slot_ids[slots] = members
+
+    return StationDictionary(
+        stations, hashes, displacements, slot_ids, names_digest(stations)
+    )
+
+
+def lookup_station_ids(dictionary: StationDictionary, hashes: np.ndarray) -> np.ndarray:
+    """
+    Retorna o identificador da estação de cada hash.
+
+    Parameters
+    ----------
+    dictionary : StationDictionary
+        Tabela de hash perfeito.
+    hashes : np.ndarray
+        Hash de 64 bits do nome de cada linha (`binary_columns.hash_names`).
+
+    Returns
+    -------
+    np.ndarray
+        Identificador (int32) de cada linha, ou `UNKNOWN_STATION` para nomes
+        que não estão no dicionário.
+
+    Notes
+    -----
+    Um nome desconhecido também cai em algum slot; ele é reconhecido porque o
+    hash guardado para a estação daquele slot é diferente. Um nome
+    desconhecido com exatamente o mesmo hash de 64 bits de uma estação
+    conhecida seria confundido com ela, com probabilidade desprezível.
+    """
+    displacements = dictionary.displacements[
+        bucket_of(hashes, len(dictionary.displacements))
+    ]
+    ids = dictionary.slot_ids[slot_of(hashes, displacements, len(dictionary.slot_ids))]
+    known = (ids != UNKNOWN_STATION) & (dictionary.hashes[ids] == hashes)
+    return np.where(known, ids, UNKNOWN_STATION).astype(np.int32)
+
+
+def save_station_dictionary(
+    dictionary: StationDictionary, dictionary_file: Path = DICTIONARY_FILE
+) -> None:
+    """
+    Grava a tabela de forma atômica.
+
+    Parameters
+    ----------
+    dictionary : StationDictionary
+        Tabela a ser gravada.
+    dictionary_file : Path, optional
+        Arquivo `.npz` de destino. O padrão é `DICTIONARY_FILE`.
+    """
+    os.makedirs(dictionary_file.parent, exist_ok=True)
+    temporary_file: Path = dictionary_file.with_suffix(".tmp.npz")
+    np.savez(
+        temporary_file,
+        version=DICTIONARY_VERSION,
+        stations=np.frombuffer(
+            "\n".join(dictionary.stations).encode("utf-8"), dtype=np.uint8
+        ),
+        hashes=dictionary.hashes,
+        displacements=dictionary.displacements,
+        slot_ids=dictionary.slot_ids,
+        source_digest=dictionary.source_digest,
+    )
+    os.replace(temporary_file, dictionary_file)
+
+
+def read_station_dictionary(dictionary_file: Path) -> Optional[StationDictionary]:
+    """
+    Lê a tabela gravada por `save_station_dictionary`.
+
+    Parameters
+    ----------
+    dictionary_file : Path
+        Arquivo `.npz` da tabela.
+
+    Returns
+    -------
+    StationDictionary, optional
+        A tabela, ou `None` se o arquivo não existir ou for de outra versão.
+    """
+    try:
+        with np.load(dictionary_file) as data:
+            if int(data["version"]) != DICTIONARY_VERSION:
+                return None
+            stations: List[str] = bytes(data["stations"]).decode("utf-8").split("\n")
+            return StationDictionary(
+                stations,
+                data["hashes"],
+                data["displacements"],
+                data["slot_ids"],
+                str(data["source_digest"]),
+            )
+    except (FileNotFoundError, KeyError, ValueError):
+        return None
+
+
+def load_station_dictionary(
+    dictionary_file: Path = DICTIONARY_FILE, names: Optional[Sequence[str]] = None
+) -> StationDictionary:
+    """
+    Lê a tabela do arquivo, gerando-a novamente se estiver ausente ou desatualizada.
+
+    Parameters
+    ----------
+    dictionary_file : Path, optional
+        Arquivo `.npz` da tabela. O padrão é `DICTIONARY_FILE`.
+    names : Sequence[str], optional
+        Nomes das estações. O padrão é `build_weather_station_name_list()`.
+
+    Returns
+    -------
+    StationDictionary
+        Tabela correspondente à lista de estações atual.
+    """
+    names = build_weather_station_name_list() if names is None else names
+    dictionary: Optional[StationDictionary] = read_station_dictionary(dictionary_file)
+    if dictionary is None or dictionary.source_digest != names_digest(set(names)):
+        print(f"Gerando o dicionário de estações em {dictionary_file}.")
+        dictionary = build_station_dictionary(names)
+        save_station_dictionary(dictionary, dictionary_file)
+    return dictionary
+
+
+def benchmark_lookup(
+    dictionary: StationDictionary, rows: int, seed: int = 42
+) -> List[Tuple[str, float]]:
+    """
+    Mede o custo por linha de identificar a estação de cada linha.
+
+    Parameters
+    ----------
+    dictionary : StationDictionary
+        Tabela de hash perfeito.
+    rows : int
+        Número de linhas sorteadas.
+    seed : int, optional
+        Semente do sorteio das estações. O padrão é 42.
+
+    Returns
+    -------
+    List[Tuple[str, float]]
+        Nome de cada método e o seu custo em nanossegundos por linha.
+    """
+    import time
+
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    names: List[bytes] = [
+        dictionary.stations[i].encode("utf-8")
+        for i in rng.integers(len(dictionary.stations), size=rows)
+    ]
+    ends = np.cumsum([len(name) for name in names], dtype=np.int64)
+    starts = ends - [len(name) for name in names]
+    data = np.frombuffer(b"".join(names), dtype=np.uint8)
+    python_index = {
+        name.encode("utf-8"): i for i, name in enumerate(dictionary.stations)
+    }
+
+    timings: List[Tuple[str, float]] = []
+
+    # Nas soluções, as potências do hash são calculadas uma vez por processo
+    hash_powers(len(data))
+    start_time: float = time.perf_counter()
+    hashes = hash_names(data, starts, ends)
+    timings.append(("hash dos nomes", time.perf_counter() - start_time))
+
+    start_time = time.perf_counter()
+    ids = lookup_station_ids(dictionary, hashes)
+    timings.append(("consulta no hash perfeito", time.perf_counter() - start_time))
+
+    start_time = time.perf_counter()
+    expected = [python_index[name] for name in names]
+    timings.append(("dict do Python (bytes)", time.perf_counter() - start_time))
+
+    start_time = time.perf_counter()
+    pd.factorize(pd.Series([name.decode("utf-8") for name in names]))
+    timings.append(("decode + pd.factorize", time.perf_counter() - start_time))
+
+    if not np.array_equal(ids, expected):
+        raise ValueError("O hash perfeito retornou identificadores errados.")
+    return [(method, took / rows * 1e9) for method, took in timings]
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    start_time: float = time.perf_counter()
+    station_dictionary: StationDictionary = build_station_dictionary(
+        build_weather_station_name_list()
+    )
+    save_station_dictionary(station_dictionary)
+    took: float = time.perf_counter() - start_time
+    print(
+        f"{len(station_dictionary.stations):,} estações em "
+        f"{len(station_dictionary.slot_ids):,} slots e "
+        f"{len(station_dictionary.displacements):,} buckets, gerado em {took:.2f}s: "
+        f"{DICTIONARY_FILE}"
+    )
+
+    benchmark_rows: int = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    for method, nanoseconds in benchmark_lookup(station_dictionary, benchmark_rows):
+        print(f"{method}: {nanoseconds:.1f} ns por linha")
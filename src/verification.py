@@ -0,0 +1,191 @@
+"""Verificação cruzada dos resultados das soluções."""
+
+from itertools import islice
+from typing import Any, Dict, NamedTuple
+
+import numpy as np
+
+from aggregate import StationAggregate
+
+# Diferença máxima aceita entre os valores de duas soluções (meio décimo de grau,
+# o erro de arredondamento para uma casa decimal)
+ROUNDING_TOLERANCE: float = 0.05
+
+# Número de estações mostradas por `preview_result`
+PREVIEW_ROWS: int = 5
+
+NormalizedResult = Dict[str, np.ndarray]
+
+
+class VerificationResult(NamedTuple):
+    """
+    Resultado da comparação de uma solução com a referência.
+
+    Attributes
+    ----------
+    passed : bool
+        Se todas as estações e valores conferem dentro da tolerância.
+    mismatched_stations : int
+        Número de estações ausentes, sobrando ou com valores fora da tolerância.
+    max_abs_diff : float
+        Maior diferença absoluta entre os valores das estações em comum.
+    message : str
+        Descrição legível do resultado.
+    """
+
+    passed: bool
+    mismatched_stations: int
+    max_abs_diff: float
+    message: str
+
+
+def normalize_result(result: Any) -> NormalizedResult:
+    """
+    Normaliza o resultado de qualquer solução para um formato comum.
+
+    Parameters
+    ----------
+    result : Any
+        Resultado de uma solução: DataFrame do pandas, DataFrame ou LazyFrame do
+        Polars, Frame do datatable, dicionário da solução com `mmap` ou
+        `StationAggregate`.
+
+    Returns
+    -------
+    NormalizedResult
+        Dicionário com as colunas `station`, `min`, `max` e `mean` como arrays
+        NumPy, ordenadas pelo nome da estação.
+
+    Raises
+    ------
+    TypeError
+        Se o tipo do resultado não for reconhecido.
+
+    Notes
+    -----
+    O tipo é identificado pelo módulo da classe, sem importar as bibliotecas das
+    outras soluções.
+    """
+    module: str = type(result).__module__.split(".")[0]
+
+    if isinstance(result, StationAggregate):
+        columns = result.to_columns()
+    elif isinstance(result, dict):
+        columns = {
+            "station": list(result),
+            "min": [values[0] for values in result.values()],
+            "max": [values[1] for values in result.values()],
+            "mean": [values[2] for values in result.values()],
+        }
+    elif module == "polars":
+        if hasattr(result, "collect"):
+            result = result.collect()
+        columns = result.select(["station", "min", "max", "mean"]).to_dict(
+            as_series=False
+        )
+    elif module == "pandas":
+        columns = {
+            name: result[name].to_numpy() for name in ("station", "min", "max", "mean")
+        }
+    elif module == "datatable":
+        columns = result[:, ["station", "min", "max", "mean"]].to_dict()
+    else:
+        raise TypeError(f"Tipo de resultado não suportado: {type(result)!r}")
+
+    stations = np.asarray(columns["station"], dtype=object)
+    order = np.argsort(stations, kind="stable")
+    normalized: NormalizedResult = {"station": stations[order]}
+    for name in ("min", "max", "mean"):
+        normalized[name] = np.asarray(columns[name], dtype=np.float64)[order]
+    return normalized
+
+
+def compare_results(
+    reference: NormalizedResult,
+    candidate: NormalizedResult,
+    tolerance: float = ROUNDING_TOLERANCE,
+) -> VerificationResult:
+    """
+    Compara o resultado de uma solução com o da referência.
+
+    Parameters
+    ----------
+    reference : NormalizedResult
+        Resultado normalizado da solução de referência.
+    candidate : NormalizedResult
+        Resultado normalizado da solução verificada.
+    tolerance : float, optional
+        Diferença máxima aceita em `min`, `max` e `mean`. O padrão é
+        `ROUNDING_TOLERANCE`.
+
+    Returns
+    -------
+    VerificationResult
+        Resultado da comparação.
+    """
+    common, reference_index, candidate_index = np.intersect1d(
+        reference["station"], candidate["station"], return_indices=True
+    )
+    missing: int = len(reference["station"]) - len(common)
+    extra: int = len(candidate["station"]) - len(common)
+
+    differences = np.zeros(len(common))
+    for name in ("min", "max", "mean"):
+        differences = np.maximum(
+            differences,
+            np.abs(reference[name][reference_index] - candidate[name][candidate_index]),
+        )
+
+    # NaN (por exemplo, média de uma estação sem medições) conta como divergência
+    out_of_tolerance: int = int(np.count_nonzero(~(differences <= tolerance + 1e-9)))
+    max_abs_diff: float = float(np.nanmax(differences)) if len(common) else 0.0
+    mismatched: int = missing + extra + out_of_tolerance
+    passed: bool = mismatched == 0
+
+    if passed:
+        message = f"OK: {len(common)} estações, diferença máxima {max_abs_diff:.2g}."
+    else:
+        message = (
+            f"FALHOU: {missing} estações ausentes, {extra} estações a mais e "
+            f"{out_of_tolerance} estações com diferença acima de {tolerance} "
+            f"(diferença máxima {max_abs_diff:.2g})."
+        )
+
+    return VerificationResult(passed, mismatched, max_abs_diff, message)
+
+
+def preview_result(result: Any, limit: int = PREVIEW_ROWS) -> str:
+    """
+    Formata as primeiras estações do resultado de qualquer solução.
+
+    Parameters
+    ----------
+    result : Any
+        Resultado de uma solução, em qualquer formato aceito por
+        `normalize_result`.
+    limit : int, optional
+        Número de estações mostradas. O padrão é `PREVIEW_ROWS`.
+
+    Returns
+    -------
+    str
+        Uma linha `estação;mínimo;máximo;média` por estação, em ordem alfabética.
+
+    Notes
+    -----
+    As soluções não imprimem o resultado; `record_result` chama esta função
+    depois de medir o tempo, para que a impressão fique fora da medição.
+    """
+    normalized = normalize_result(result)
+    return "\n".join(
+        f"{station};{min_value:.1f};{max_value:.1f};{mean_value:.1f}"
+        for station, min_value, max_value, mean_value in islice(
+            zip(
+                normalized["station"],
+                normalized["min"],
+                normalized["max"],
+                normalized["mean"],
+            ),
+            limit,
+        )
+    )
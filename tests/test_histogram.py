@@ -0,0 +1,89 @@
+"""Testes dos quantis e da moda exatos calculados com histogramas."""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from fixed_point import MAX_TENTHS, MIN_TENTHS  # noqa: E402
+from histogram import build_histograms  # noqa: E402
+from quantile_sketch import QUANTILES, quantile_column_names  # noqa: E402
+from solution_pandas import create_df_with_pandas_pipeline  # noqa: E402
+
+ROWS_PER_STATION: int = 1_000
+
+
+def write_measurements(filename: Path, seed: int = 0) -> int:
+    """Grava um arquivo de medições pequeno e retorna o número de linhas."""
+    rng = np.random.default_rng(seed)
+    measures = {
+        "Abha": rng.normal(18, 10, ROWS_PER_STATION),
+        "Accra": rng.normal(-20, 30, ROWS_PER_STATION),
+        # Duas modas empatadas; vale a menor
+        "Empate": np.repeat([0.2, -0.1, 0.3], [400, 400, 200]),
+        "Pequena": rng.normal(5, 1, 7),
+    }
+    rows = [
+        (station, value)
+        for station, values in measures.items()
+        for value in np.clip(np.round(values, 1), -99.9, 99.9)
+    ]
+    rng.shuffle(rows)
+    with open(filename, "w", encoding="utf-8") as file:
+        for station, value in rows:
+            file.write(f"{station};{value + 0.0:.1f}\n")
+    return len(rows)
+
+
+class HistogramQuantilesTest(unittest.TestCase):
+    """Quantis e moda de `create_df_with_pandas_pipeline(..., histogram=True)`."""
+
+    def test_quantiles_and_mode_match_numpy(self) -> None:
+        """p50, p95, p99 e a moda são iguais aos calculados sobre as medições."""
+        with tempfile.TemporaryDirectory() as directory:
+            filename = Path(directory) / "measurements.txt"
+            rows = write_measurements(filename)
+            result = create_df_with_pandas_pipeline(
+                filename, rows, rows // 4, concurrency=2, histogram=True
+            ).set_index("station")
+            measurements = pd.read_csv(
+                filename, sep=";", header=None, names=["station", "measure"]
+            )
+
+        names = quantile_column_names(QUANTILES)
+        for station, group in measurements.groupby("station")["measure"]:
+            values = np.sort(group.to_numpy())
+            # Interpolação linear entre vizinhos, como `quantile(q, "linear")` e
+            # `median()` do Polars
+            for quantile, name in names.items():
+                self.assertEqual(
+                    result.loc[station, name],
+                    np.quantile(values, quantile, method="linear"),
+                    f"{station} {name}",
+                )
+            self.assertEqual(result.loc[station, "p50"], np.median(values))
+            # Em caso de empate, a menor temperatura, como `mode().min()`
+            unique, counts = np.unique(values, return_counts=True)
+            self.assertEqual(
+                result.loc[station, "mode"], unique[np.argmax(counts)], station
+            )
+
+    def test_out_of_range_tenths(self) -> None:
+        """Medições fora de `[MIN_TENTHS, MAX_TENTHS]` são rejeitadas."""
+        station_ids = np.zeros(2, dtype=np.intp)
+        for value in (MIN_TENTHS - 1, MAX_TENTHS + 1):
+            with self.assertRaises(ValueError):
+                build_histograms(station_ids, np.array([0, value]), 1)
+        histograms = build_histograms(
+            station_ids, np.array([MIN_TENTHS, MAX_TENTHS]), 1
+        )
+        self.assertEqual(histograms.sum(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Testes dos quantis aproximados do sketch por estação."""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from quantile_sketch import (  # noqa: E402
+    MIN_INDEXABLE,
+    QUANTILES,
+    RELATIVE_ACCURACY,
+    quantile_column_names,
+)
+from solution_pandas import create_df_with_pandas_pipeline  # noqa: E402
+
+ROWS_PER_STATION: int = 1_000
+
+
+def write_measurements(filename: Path, seed: int = 0) -> int:
+    """
+    Grava um arquivo de medições pequeno e retorna o número de linhas.
+
+    Notes
+    -----
+    `Zero` tem a maioria das medições iguais a 0,0, para que a mediana caia no
+    bucket do zero, e `Perto` tem medições de poucos décimos em torno de zero.
+    """
+    rng = np.random.default_rng(seed)
+    measures = {
+        "Abha": rng.normal(18, 10, ROWS_PER_STATION),
+        "Accra": rng.normal(-20, 30, ROWS_PER_STATION),
+        "Zero": np.where(
+            rng.random(ROWS_PER_STATION) < 0.7,
+            0.0,
+            rng.normal(0, 5, ROWS_PER_STATION),
+        ),
+        "Perto": rng.integers(-3, 4, ROWS_PER_STATION) / 10,
+    }
+    rows = [
+        (station, value)
+        for station, values in measures.items()
+        for value in np.clip(np.round(values, 1), -99.9, 99.9)
+    ]
+    rng.shuffle(rows)
+    with open(filename, "w", encoding="utf-8") as file:
+        for station, value in rows:
+            file.write(f"{station};{value + 0.0:.1f}\n")
+    return len(rows)
+
+
+class SketchQuantilesTest(unittest.TestCase):
+    """Quantis de `create_df_with_pandas_pipeline(..., sketch=True)`."""
+
+    def test_relative_error_against_exact_quantiles(self) -> None:
+        """p50, p95 e p99 ficam a até `RELATIVE_ACCURACY` dos quantis exatos."""
+        with tempfile.TemporaryDirectory() as directory:
+            filename = Path(directory) / "measurements.txt"
+            rows = write_measurements(filename)
+            result = create_df_with_pandas_pipeline(
+                filename, rows, rows // 4, concurrency=2, sketch=True
+            ).set_index("station")
+            measurements = pd.read_csv(
+                filename, sep=";", header=None, names=["station", "measure"]
+            )
+
+        exact = (
+            measurements.groupby("station")["measure"]
+            .quantile(list(QUANTILES), interpolation="lower")
+            .unstack()
+            .reindex(result.index)
+        )
+        # O bucket do zero precisa aparecer em pelo menos um quantil
+        self.assertEqual(exact.loc["Zero", 0.5], 0.0)
+
+        for quantile, name in quantile_column_names(QUANTILES).items():
+            expected = exact[quantile].to_numpy()
+            estimated = result[name].to_numpy()
+            zero = np.abs(expected) < MIN_INDEXABLE
+            np.testing.assert_array_equal(estimated[zero], 0.0)
+            relative_error = np.abs(estimated - expected)[~zero] / np.abs(
+                expected[~zero]
+            )
+            self.assertLessEqual(relative_error.max(), RELATIVE_ACCURACY, name)
+
+
+if __name__ == "__main__":
+    unittest.main()
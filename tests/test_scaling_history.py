@@ -0,0 +1,124 @@
+"""Testes da seleção do histórico usado na detecção de regressões."""
+
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from record_result import load_results  # noqa: E402
+from scaling_benchmark import history_times  # noqa: E402
+
+
+def detailed_record(
+    library: str, rows: int, started_at: str, wall_s: float, **fields
+) -> dict:
+    """Monta um registro do formato detalhado com os campos usados no histórico."""
+    return {
+        "schema_version": 2,
+        "library": library,
+        "rows": rows,
+        "started_at": started_at,
+        "wall_s_median": wall_s,
+        **fields,
+    }
+
+
+class HistoryTimesTest(unittest.TestCase):
+    """Histórico lido de `solution_results.jsonl` e `solution_results.csv`."""
+
+    def setUp(self) -> None:
+        """Cria os dois arquivos de resultados em um diretório temporário."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.results = Path(directory.name) / "solution_results.csv"
+        self.detailed = Path(directory.name) / "solution_results.jsonl"
+
+    def write_results(self, detailed: List[dict], legacy: List[str]) -> None:
+        """Grava os registros detalhados, cada um com a cópia no formato original."""
+        with open(self.detailed, "w", encoding="utf-8") as file:
+            for record in detailed:
+                file.write(json.dumps(record) + "\n")
+        with open(self.results, "w", encoding="utf-8") as file:
+            for record in detailed:
+                file.write(
+                    f"{record['library']};{record['rows']};"
+                    f"{record['started_at']};{record['wall_s_median']:.2f}\n"
+                )
+            for line in legacy:
+                file.write(line + "\n")
+
+    def test_mirrored_rows_are_not_counted_twice(self) -> None:
+        """Uma execução gravada nos dois formatos entra uma única vez."""
+        self.write_results(
+            [detailed_record("pandas", 1000, "2026-10-01 10:00:00", 1.5, config={})],
+            [],
+        )
+        history = load_results(self.results, self.detailed)
+
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history_times(history, "pandas", 1000, {}), [1.5])
+
+    def test_mixed_records(self) -> None:
+        """Cópias de execuções com configuração não entram no histórico padrão."""
+        self.write_results(
+            [
+                detailed_record("pandas", 1000, "2026-10-01 10:00:00", 1.5, config={}),
+                detailed_record(
+                    "pandas",
+                    1000,
+                    "2026-10-01 10:01:00",
+                    0.7,
+                    config={"chunksize": 100},
+                ),
+            ],
+            ["Pandas;1000;2026-09-01 09:00:00;2.00"],
+        )
+        history = load_results(self.results, self.detailed)
+
+        self.assertEqual(len(history), 3)
+        self.assertEqual(history_times(history, "pandas", 1000, {}), [1.5, 2.0])
+        self.assertEqual(
+            history_times(history, "pandas", 1000, {"chunksize": 100}), [0.7]
+        )
+        self.assertEqual(history_times(history, "pandas", 2000, {}), [])
+
+    def test_profiles_are_kept_separate(self) -> None:
+        """Execuções de outros perfis, e as suas cópias, não entram no uniforme."""
+        self.write_results(
+            [
+                detailed_record(
+                    "polars", 1000, "2026-10-02 10:00:00", 0.4, dataset="uniform"
+                ),
+                # Registros anteriores aos perfis foram medidos com o uniforme
+                detailed_record("polars", 1000, "2026-09-02 10:00:00", 0.5),
+                detailed_record(
+                    "polars", 1000, "2026-10-02 10:01:00", 0.9, dataset="zipf"
+                ),
+                detailed_record(
+                    "polars",
+                    1000,
+                    "2026-10-02 10:02:00",
+                    0.6,
+                    dataset="all_stations",
+                ),
+            ],
+            [],
+        )
+        history = load_results(self.results, self.detailed)
+
+        self.assertEqual(history_times(history, "polars", 1000, {}), [0.4, 0.5])
+        self.assertEqual(
+            history_times(history, "polars", 1000, {}, dataset="zipf"), [0.9]
+        )
+        self.assertEqual(
+            history_times(history, "polars", 1000, {}, dataset="all_stations"),
+            [0.6],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()